@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Compare `encode_latex` with the former `remove_umlauts`, which called
+str.replace once per pattern, on a generated corpus of author strings.
+
+Example:
+
+    $ python3 benchmarks/accents.py --authors 200000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from revise_bibtex.latex import encode_latex  # noqa: E402
+
+
+LEGACY_PATTERNS = {
+    "ä": '\\"a', "ü": '\\"u', "ö": '\\"o', "Ä": '\\"A', "Ü": '\\"U',
+    "Ö": '\\"O', "é": "\\'e", "ă": "\\ua", "á": "\\'a", "ò": "\\`{o}",
+    "ó": "\\'{o}", "ô": "\\^{o}", "ő": "\\H{o}", "õ": "\\~{o}",
+    "ç": "\\c{c}", "ą": "\\k{a}", "ł": "\\l{} ", "ō": "\\={o}",
+    "ȯ": "\\.{o}", "ụ": "\\d{u}", "å": "\\r{a}", "ŏ": "\\u{o}",
+    "š": "\\v{s}", "ø": "\\o{}", "ı": "{\\i}", "o͡o": "\\t{oo}",
+}
+
+FIRST_NAMES = ['John', 'Anna', 'Chen', 'Mary', 'Peter', 'David', 'Laura']
+LAST_NAMES = ['Smith', 'Kowalski', 'Wang', 'Lee', 'Brown', 'Garcia']
+ACCENTED_FIRST_NAMES = ['Jörg', 'Zoë', 'Łukasz', 'María', 'François',
+                        'Søren', 'Pál', 'Ömer', 'Jiří', 'José']
+ACCENTED_LAST_NAMES = ['Müller', 'Erdős', 'Dvořák', 'Nguyễn', 'Åström',
+                       'Brontë', 'Öztürk']
+
+
+def legacy_remove_umlauts(string):
+    for k, v in LEGACY_PATTERNS.items():
+        string = string.replace(k, v)
+    return string
+
+
+def make_authors(count, accented_ratio, seed=0):
+    rng = random.Random(seed)
+
+    def name():
+        if rng.random() < accented_ratio:
+            return '%s, %s' % (rng.choice(ACCENTED_LAST_NAMES),
+                               rng.choice(ACCENTED_FIRST_NAMES))
+        return '%s, %s' % (rng.choice(LAST_NAMES), rng.choice(FIRST_NAMES))
+
+    return [' and '.join(name() for _ in range(rng.randint(1, 6)))
+            for _ in range(count)]
+
+
+def timed(function, corpus):
+    start = time.perf_counter()
+    for authors in corpus:
+        function(authors)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(__doc__)
+    parser.add_argument('--authors', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    for accented_ratio in (0, 0.2, 1):
+        corpus = make_authors(args.authors, accented_ratio, args.seed)
+        legacy = timed(legacy_remove_umlauts, corpus)
+        encoded = timed(encode_latex, corpus)
+        print('%3d%% accented names: remove_umlauts %.3f s, '
+              'encode_latex %.3f s (%.1fx)' % (
+                  accented_ratio * 100, legacy, encoded, legacy / encoded))
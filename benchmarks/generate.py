@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Generate a synthetic bib file and a matching bbl file.
+
+The output is determined by the seed and the options: the mix of entry
+types, the ratio of accented author names, of near-duplicate titles, of
+entries with a crossref to a @proceedings entry, and of entries with
+malformed fields (empty, misplaced years, bad pages, URLs without DOIs).
+
+Example:
+
+    $ python3 benchmarks/generate.py refs.bib refs.bbl --entries 100000
+"""
+import argparse
+from itertools import accumulate
+import random
+
+
+DEFAULT_TYPES = {
+    'article': 40,
+    'inproceedings': 35,
+    'book': 5,
+    'inbook': 3,
+    'phdthesis': 4,
+    'misc': 10,
+    'techreport': 3,
+}
+
+FIRST_NAMES = ['John', 'Anna', 'Chen', 'Mary', 'Peter', 'David', 'Laura',
+               'Wei', 'Ahmed', 'Sara', 'Tom', 'Yuki', 'Ivan', 'Nina']
+LAST_NAMES = ['Smith', 'Kowalski', 'Wang', 'Lee', 'Brown', 'Garcia',
+              'Ivanov', 'Tanaka', 'Hassan', 'Rossi', 'Novak', 'Kim']
+ACCENTED_FIRST_NAMES = ['Jörg', 'Zoë', 'Łukasz', 'María', 'François',
+                        'Søren', 'Pál', 'Ömer', 'Jiří', 'José']
+ACCENTED_LAST_NAMES = ['Müller', 'Erdős', 'Dvořák', 'Nguyễn', 'Åström',
+                       'Brontë', 'Öztürk', 'Gödel', 'Šimánek', 'Çelik']
+WORDS = [
+    'learning', 'deep', 'networks', 'neural', 'graph', 'efficient',
+    'scalable', 'robust', 'optimization', 'distributed', 'models',
+    'inference', 'bayesian', 'sparse', 'representation', 'attention',
+    'retrieval', 'systems', 'analysis', 'adaptive', 'stochastic',
+    'gradient', 'methods', 'recommendation', 'language', 'vision',
+    'reinforcement', 'federated', 'privacy', 'embeddings', 'kernel',
+    'clustering', 'online', 'approximate', 'causal', 'temporal', 'data',
+]
+# Letters of the made-up syllables that extend WORDS to a larger vocabulary.
+CONSONANTS = 'bcdfghklmnprstvz'
+VOWELS = 'aeiou'
+CONNECTIVES = ['for', 'of', 'with', 'in', 'on', 'and', 'via', 'using']
+JOURNALS = ['Journal of Machine Learning Research', 'Machine Learning',
+            'IEEE Transactions on Knowledge and Data Engineering',
+            'Information Retrieval Journal', 'Data Mining and Knowledge '
+            'Discovery']
+CONFERENCES = ['Conference on Neural Information Processing Systems',
+               'International Conference on Machine Learning',
+               'Conference on Information and Knowledge Management',
+               'International Conference on Web Search and Data Mining']
+PUBLISHERS = ['ACM', 'Springer', 'IEEE', 'Elsevier', 'PMLR']
+ADDRESSES = ['New York, NY, USA', 'Berlin, Germany', 'Vancouver, Canada',
+             'Long Beach, California, USA', 'Sydney, Australia',
+             'Paris, France, Europe', 'Tokyo']
+SCHOOLS = ['University of Somewhere', 'Institute of Technology']
+
+
+class Generator:
+    def __init__(self, seed=0, types=None, accented=0.2, duplicates=0.02,
+                 crossrefs=0.05, malformed=0.05, vocabulary=5000):
+        self.rng = random.Random(seed)
+        # The title words follow a Zipf distribution, as in real titles.
+        self.words = WORDS + [self.word() for _ in range(vocabulary)]
+        self.word_weights = list(accumulate(
+            1 / rank for rank in range(1, len(self.words) + 1)
+        ))
+        types = types or DEFAULT_TYPES
+        self.types = list(types)
+        self.weights = [types[name] for name in self.types]
+        self.accented = accented
+        self.duplicates = duplicates
+        self.crossrefs = crossrefs
+        self.malformed = malformed
+        self.titles = []
+        self.proceedings = []
+
+    def word(self):
+        rng = self.rng
+        return ''.join(
+            rng.choice(CONSONANTS) + rng.choice(VOWELS) +
+            (rng.choice(CONSONANTS) if rng.random() < 0.3 else '')
+            for _ in range(rng.randint(2, 4))
+        )
+
+    def name(self):
+        rng = self.rng
+        if rng.random() < self.accented:
+            first = rng.choice(ACCENTED_FIRST_NAMES)
+            last = rng.choice(ACCENTED_LAST_NAMES)
+        else:
+            first = rng.choice(FIRST_NAMES)
+            last = rng.choice(LAST_NAMES)
+        if rng.random() < 0.3:
+            first = first[0] + '.'
+        if rng.random() < 0.5:
+            return '%s, %s' % (last, first)
+        return '%s %s' % (first, last)
+
+    def authors(self):
+        return ' and '.join(self.name()
+                            for _ in range(self.rng.randint(1, 5)))
+
+    def title(self):
+        rng = self.rng
+        if self.titles and rng.random() < self.duplicates:
+            # A near-duplicate: another casing, a typo or a dropped word.
+            words = rng.choice(self.titles).split()
+            change = rng.randrange(3)
+            if change == 0:
+                words = [word.lower() for word in words]
+            elif change == 1 and len(words) > 4:
+                del words[rng.randrange(1, len(words))]
+            else:
+                i = rng.randrange(len(words))
+                words[i] = words[i][:-1] + 'x'
+            return ' '.join(words)
+        words = []
+        for i in range(rng.randint(4, 12)):
+            if i and rng.random() < 0.25:
+                words.append(rng.choice(CONNECTIVES))
+            word = rng.choices(self.words, cum_weights=self.word_weights)[0]
+            words.append(word.capitalize() if rng.random() < 0.7 else word)
+        words[0] = words[0].capitalize()
+        title = ' '.join(words)
+        if len(self.titles) < 10000:
+            self.titles.append(title)
+        else:
+            self.titles[rng.randrange(len(self.titles))] = title
+        return title
+
+    def pages(self):
+        start = self.rng.randint(1, 900)
+        return '%d--%d' % (start, start + self.rng.randint(5, 20))
+
+    def fields(self, entry_type, key):
+        rng = self.rng
+        year = str(rng.randint(1980, 2023))
+        fields = {'title': self.title(), 'author': self.authors(),
+                  'year': year}
+        if entry_type == 'article':
+            fields.update(journal=rng.choice(JOURNALS), pages=self.pages(),
+                          volume=str(rng.randint(1, 60)),
+                          publisher=rng.choice(PUBLISHERS))
+        elif entry_type == 'inproceedings':
+            if self.proceedings and rng.random() < self.crossrefs:
+                fields['crossref'] = rng.choice(self.proceedings)
+            else:
+                fields.update(booktitle=rng.choice(CONFERENCES),
+                              address=rng.choice(ADDRESSES),
+                              publisher=rng.choice(PUBLISHERS))
+            fields['pages'] = self.pages()
+        elif entry_type in ('book', 'inbook', 'techreport'):
+            fields.update(publisher=rng.choice(PUBLISHERS),
+                          address=rng.choice(ADDRESSES))
+            if entry_type == 'inbook':
+                fields['chapter'] = str(rng.randint(1, 20))
+        elif entry_type == 'phdthesis':
+            fields['school'] = rng.choice(SCHOOLS)
+        elif entry_type == 'misc':
+            number = '%02d%02d.%05d' % (int(year) % 100, rng.randint(1, 12),
+                                        rng.randrange(100000))
+            fields.update(journal='arXiv preprint arXiv:' + number,
+                          archiveprefix='arXiv', eprint=number)
+        if rng.random() < 0.5:
+            fields['doi'] = '10.%d/%s' % (rng.randint(1000, 9999), key)
+        if rng.random() < self.malformed:
+            self.malform(fields, year)
+        return fields
+
+    def malform(self, fields, year):
+        rng = self.rng
+        change = rng.randrange(5)
+        if change == 0:
+            fields[rng.choice(list(fields))] = ''
+        elif change == 1:
+            fields['title'] = '%s %s' % (fields['title'], year)
+            fields['journal'] = 'Proc. of %s' % year
+        elif change == 2:
+            fields['pages'] = '%d - ' % rng.randint(1, 100)
+        elif change == 3:
+            fields['url'] = 'https://example.org/%d' % rng.randrange(10 ** 6)
+            fields.pop('doi', None)
+        else:
+            fields['author'] = rng.choice(LAST_NAMES) + ' et al.'
+
+    def entries(self, count):
+        """Yield (key, bib text) for `count` entries, followed by the
+        @proceedings entries that they crossref."""
+        rng = self.rng
+        for number in range(count):
+            if rng.random() < self.crossrefs / 5:
+                key = 'proc%d' % len(self.proceedings)
+                self.proceedings.append(key)
+            entry_type = rng.choices(self.types, self.weights)[0]
+            key = '%s%s%d' % (rng.choice(LAST_NAMES).lower(),
+                              rng.randint(1980, 2023), number)
+            yield key, format_entry(entry_type, key,
+                                    self.fields(entry_type, key))
+        for key in self.proceedings:
+            yield key, format_entry('proceedings', key, {
+                'title': 'Proceedings of the %s' % rng.choice(CONFERENCES),
+                'booktitle': rng.choice(CONFERENCES),
+                'year': str(rng.randint(1980, 2023)),
+                'publisher': rng.choice(PUBLISHERS),
+                'address': rng.choice(ADDRESSES),
+            })
+
+
+def format_entry(entry_type, key, fields):
+    return '@%s{%s,\n%s\n}\n' % (entry_type, key, ',\n'.join(
+        '  %s = {%s}' % item for item in fields.items()
+    ))
+
+
+def generate(bib_path, bbl_path=None, entries=1000, cited=0.9, seed=0,
+             **options):
+    """Write `entries` generated entries to `bib_path`, and a bbl file
+    citing a random `cited` fraction of them, plus a few missing keys, to
+    `bbl_path`. Returns the number of bib entries written."""
+    generator = Generator(seed=seed, **options)
+    rng = random.Random(seed + 1)
+    keys = []
+    written = 0
+    with open(bib_path, 'w') as fl:
+        for key, text in generator.entries(entries):
+            fl.write(text)
+            fl.write('\n')
+            written += 1
+            if rng.random() < cited:
+                keys.append(key)
+    if bbl_path is not None:
+        keys.extend('missing%d' % i for i in range(max(1, entries // 1000)))
+        rng.shuffle(keys)
+        with open(bbl_path, 'w') as fl:
+            fl.write('\\begin{thebibliography}{%d}\n\n' % len(keys))
+            for key in keys:
+                fl.write('\\bibitem{%s}\nSome formatted reference.\n\n'
+                         % key)
+            fl.write('\\end{thebibliography}\n')
+    return written
+
+
+def parse_types(text):
+    types = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        types[name.strip()] = float(weight or 1)
+    return types
+
+
+def add_arguments(parser):
+    parser.add_argument('--entries', type=int, default=1000,
+                        help='number of entries (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cited', type=float, default=0.9,
+                        help='fraction of the entries cited in the bbl')
+    parser.add_argument('--types', type=parse_types,
+                        help='entry type weights, e.g. article=3,misc=1')
+    parser.add_argument('--accented', type=float, default=0.2,
+                        help='fraction of accented author names')
+    parser.add_argument('--duplicates', type=float, default=0.02,
+                        help='fraction of near-duplicate titles')
+    parser.add_argument('--crossrefs', type=float, default=0.05,
+                        help='fraction of inproceedings with a crossref')
+    parser.add_argument('--malformed', type=float, default=0.05,
+                        help='fraction of entries with a malformed field')
+    parser.add_argument('--vocabulary', type=int, default=5000,
+                        help='number of distinct title words')
+
+
+def options(args):
+    return dict(entries=args.entries, cited=args.cited, seed=args.seed,
+                types=args.types, accented=args.accented,
+                duplicates=args.duplicates, crossrefs=args.crossrefs,
+                malformed=args.malformed, vocabulary=args.vocabulary)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(__doc__)
+    parser.add_argument('bib_file')
+    parser.add_argument('bbl_file', nargs='?')
+    add_arguments(parser)
+    args = parser.parse_args()
+    count = generate(args.bib_file, args.bbl_file, **options(args))
+    print('%d entries written to %s' % (count, args.bib_file))
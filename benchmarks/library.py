@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Build a reference library index of a generated dump, and time the
+lookups of known titles, slightly changed titles and unknown titles.
+
+Example:
+
+    $ python3 benchmarks/library.py --records 1000000 --queries 2000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from generate import Generator  # noqa: E402
+from revise_bibtex.library import Library, build_library  # noqa: E402
+
+
+def make_dump(path, records, preprints=0.1, seed=0):
+    """Write `records` JSON records, a fraction of which also have a CoRR
+    version, and return their titles."""
+    generator = Generator(seed=seed, duplicates=0, malformed=0)
+    rng = generator.rng
+    titles = []
+    with open(path, 'w') as fl:
+        for number in range(records):
+            entry_type = rng.choice(['article', 'inproceedings'])
+            fields = generator.fields(entry_type, 'key%d' % number)
+            fields.pop('crossref', None)
+            fields['ENTRYTYPE'] = entry_type
+            titles.append(fields['title'])
+            if rng.random() < preprints:
+                fl.write(json.dumps({
+                    'ENTRYTYPE': 'article', 'title': fields['title'],
+                    'author': fields['author'], 'journal': 'CoRR',
+                    'year': fields['year'],
+                }) + '\n')
+            fl.write(json.dumps(fields) + '\n')
+    return titles
+
+
+def changed(title, rng):
+    words = title.split()
+    i = rng.randrange(len(words))
+    words[i] = words[i][:-1] + 'x'
+    return ' '.join(words).lower()
+
+
+def time_queries(library, titles):
+    times = []
+    found = 0
+    for title in titles:
+        start = time.perf_counter()
+        found += library.match(title) is not None
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return {
+        'queries': len(titles),
+        'found': found,
+        'median_ms': 1000 * statistics.median(times),
+        'p95_ms': 1000 * times[int(0.95 * (len(times) - 1))],
+        'max_ms': 1000 * times[-1],
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(__doc__)
+    parser.add_argument('--records', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--threshold', type=float, default=0.95,
+                        help='similarity of the matched titles')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        dump_path = os.path.join(directory, 'dump.jsonl')
+        index_path = os.path.join(directory, 'dump.idx')
+        titles = make_dump(dump_path, args.records, seed=args.seed)
+        start = time.perf_counter()
+        count = build_library(dump_path, index_path)
+        results = {
+            'records': count,
+            'build_seconds': time.perf_counter() - start,
+            'dump_bytes': os.path.getsize(dump_path),
+            'index_bytes': os.path.getsize(index_path),
+        }
+        known = rng.sample(titles, min(args.queries, len(titles)))
+        unknown = Generator(seed=args.seed + 1, duplicates=0)
+        with Library(index_path, args.threshold) as library:
+            results['known'] = time_queries(library, known)
+            results['changed'] = time_queries(
+                library, [changed(title, rng) for title in known]
+            )
+            results['unknown'] = time_queries(
+                library, [unknown.title() for _ in known]
+            )
+    json.dump(results, sys.stdout, indent=2)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Compare the memory held by the parsed entries of a large bib file, as
+plain dicts and as compact `Entry` objects, and the time to validate them,
+then measure the runs of the command line itself.
+
+Each representation is measured in a fresh process, which parses the file
+entry by entry and keeps all the entries, the resident memory after the
+parse minus the one before is reported. The command line runs are
+`python3 -m revise_bibtex bench.bib --skip`, with its default options and
+with --cache, which validates the entries block by block, and their peak
+resident memory is reported. Parsing 500k entries takes a while, use
+--entries for a quicker run.
+
+Example:
+
+    $ python3 benchmarks/memory.py --entries 500000
+"""
+import argparse
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from generate import add_arguments, generate, options  # noqa: E402
+from revise_bibtex.core import validate_bibs, validate_entry  # noqa: E402
+from revise_bibtex.stream import iter_entries, make_parser  # noqa: E402
+
+
+def rss():
+    """The current resident memory in bytes, or the peak one where /proc
+    is not available."""
+    try:
+        with open('/proc/self/statm') as fl:
+            return int(fl.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        scale = 1 if sys.platform == 'darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def measure(bib_path, compact):
+    gc.collect()
+    before = rss()
+    start = time.perf_counter()
+    entries = list(iter_entries(bib_path, make_parser(compact=compact)))
+    parse = time.perf_counter() - start
+    gc.collect()
+    held = rss() - before
+    start = time.perf_counter()
+    for entry in entries:
+        validate_entry(entry, True)
+    validate = time.perf_counter() - start
+    gc.collect()
+    return {
+        'entries': len(entries),
+        'held_bytes': held,
+        'bytes_per_entry': held / max(len(entries), 1),
+        'after_validation_bytes': rss() - before,
+        'parse_seconds': parse,
+        'validate_seconds': validate,
+    }
+
+
+def peak_rss():
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def measure_cli(bib_path, cache):
+    """The peak memory and the time of the validation of the command line,
+    the arguments are those of `python3 -m revise_bibtex bib_path --skip
+    --no-logs --out-bib-file ...`, with --cache-file for `cache`."""
+    import logging
+    logging.getLogger('revise_bibtex.logger').setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as directory:
+        before = peak_rss()
+        start = time.perf_counter()
+        validate_bibs(
+            bib_path, None, out_bib_file=os.path.join(directory, 'out.bib'),
+            skip=True, no_logs=True,
+            cache_file=os.path.join(directory, 'cache.sqlite')
+            if cache else None
+        )
+        return {
+            'peak_bytes': peak_rss(),
+            'peak_increase_bytes': peak_rss() - before,
+            'seconds': time.perf_counter() - start,
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(__doc__)
+    add_arguments(parser)
+    parser.set_defaults(entries=500000)
+    parser.add_argument('--bib', help='use this bib file instead of a '
+                        'generated one')
+    parser.add_argument('--measure',
+                        choices=['dict', 'compact', 'cli', 'cli-cache'],
+                        help=argparse.SUPPRESS)
+    parser.add_argument('-o', '--output', help='write the results here')
+    args = parser.parse_args()
+
+    if args.measure in ('cli', 'cli-cache'):
+        results = measure_cli(args.bib, args.measure == 'cli-cache')
+        sys.stdout.write('\n' + json.dumps(results) + '\n')
+        sys.exit()
+    if args.measure:
+        json.dump(measure(args.bib, args.measure == 'compact'), sys.stdout)
+        sys.exit()
+
+    with tempfile.TemporaryDirectory() as directory:
+        bib_path = args.bib
+        if bib_path is None:
+            bib_path = os.path.join(directory, 'bench.bib')
+            generate(bib_path, **options(args))
+        results = {}
+        for mode in ('dict', 'compact'):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--measure', mode,
+                 '--bib', bib_path],
+                stdout=subprocess.PIPE, universal_newlines=True, check=True
+            ).stdout
+            results[mode] = json.loads(output)
+            print('%-8s %8d entries %10.1f MiB %8.0f bytes/entry '
+                  'parse %7.2fs validate %6.2fs' % (
+                      mode, results[mode]['entries'],
+                      results[mode]['held_bytes'] / 2 ** 20,
+                      results[mode]['bytes_per_entry'],
+                      results[mode]['parse_seconds'],
+                      results[mode]['validate_seconds']
+                  ), file=sys.stderr)
+        for mode in ('cli', 'cli-cache'):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--measure', mode,
+                 '--bib', bib_path],
+                stdout=subprocess.PIPE, universal_newlines=True, check=True
+            ).stdout
+            # The run prints its logs before the results.
+            results[mode] = json.loads(output.splitlines()[-1])
+            print('%-9s peak %10.1f MiB (+%.1f MiB) %8.2fs' % (
+                mode, results[mode]['peak_bytes'] / 2 ** 20,
+                results[mode]['peak_increase_bytes'] / 2 ** 20,
+                results[mode]['seconds']
+            ), file=sys.stderr)
+    results['ratio'] = results['compact']['held_bytes'] / \
+        max(results['dict']['held_bytes'], 1)
+    if args.output:
+        with open(args.output, 'w') as fl:
+            json.dump(results, fl, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
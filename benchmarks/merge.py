@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Merge generated per-project bib files, which cite a shared pool of
+papers under their own keys, and time the merge.
+
+Example:
+
+    $ python3 benchmarks/merge.py --files 40 --entries 200000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from generate import Generator, format_entry  # noqa: E402
+from revise_bibtex.merge import merge_bibs  # noqa: E402
+
+
+def make_files(directory, files, entries, shared=0.2, seed=0):
+    """Write `files` bib files of `entries` entries in total, a `shared`
+    fraction of which are papers of a common pool, written with the key
+    of each file, and return their paths."""
+    rng = random.Random(seed)
+    pool = Generator(seed=seed, duplicates=0, malformed=0)
+    papers = []
+    for number in range(max(entries // 20, 1)):
+        entry_type = rng.choice(['article', 'inproceedings'])
+        papers.append((entry_type, pool.fields(entry_type, 'p%d' % number)))
+    paths = []
+    for number in range(files):
+        path = os.path.join(directory, 'project%d.bib' % number)
+        generator = Generator(seed=seed + number + 1)
+        with open(path, 'w') as fl:
+            count = entries // files
+            for key, text in generator.entries(int(count * (1 - shared))):
+                fl.write(text + '\n')
+            for i in range(count - int(count * (1 - shared))):
+                entry_type, fields = rng.choice(papers)
+                key = 'p%d_%d' % (number, i)
+                fl.write(format_entry(entry_type, key, fields) + '\n')
+        paths.append(path)
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(__doc__)
+    parser.add_argument('--files', type=int, default=40)
+    parser.add_argument('--entries', type=int, default=200000)
+    parser.add_argument('--shared', type=float, default=0.2,
+                        help='fraction of the entries from a shared pool')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = make_files(directory, args.files, args.entries, args.shared,
+                           args.seed)
+        start = time.perf_counter()
+        rows = merge_bibs(paths, os.path.join(directory, 'merged.bib'),
+                          os.path.join(directory, 'keys.tsv'))
+        elapsed = time.perf_counter() - start
+        reasons = {}
+        for row in rows:
+            reasons[row[3]] = reasons.get(row[3], 0) + 1
+        json.dump({
+            'files': args.files,
+            'entries': args.entries,
+            'input_bytes': sum(os.path.getsize(path) for path in paths),
+            'merge_seconds': elapsed,
+            'key_map': reasons,
+            'conflicting_fields': sum(bool(row[4]) for row in rows),
+        }, sys.stdout, indent=2)
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Resolve generated entries against a local stub of the Crossref API,
+which answers with a random latency and fails some requests, and compare
+the total time with the slowest requests.
+
+Example:
+
+    $ python3 benchmarks/resolve.py --entries 2000 --latency 0.05 0.5
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+from generate import Generator  # noqa: E402
+from revise_bibtex.resolve import CrossrefBackend, Resolver  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, value):
+        body = json.dumps(value).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        delay = server.rng.uniform(*server.latency)
+        with server.lock:
+            server.delays.append(delay)
+        time.sleep(delay)
+        if server.rng.random() < server.failures:
+            return self.send_json(503, {'status': 'error'})
+        url = urllib.parse.urlsplit(self.path)
+        if url.path.startswith('/works/'):
+            work = server.works.get(urllib.parse.unquote(url.path[7:]))
+            if work is None:
+                return self.send_json(404, {'status': 'error'})
+            return self.send_json(200, {'message': work})
+        title = urllib.parse.parse_qs(url.query).get(
+            'query.bibliographic', [''])[0]
+        work = server.titles.get(title)
+        self.send_json(200, {'message': {'items': [work] if work else []}})
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+def serve(works, latency, failures, seed=0):
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    server.works = works
+    server.titles = {work['title'][0].lower(): work
+                     for work in works.values()}
+    server.latency = latency
+    server.failures = failures
+    server.rng = random.Random(seed)
+    server.lock = threading.Lock()
+    server.delays = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_items(count, unknown=0.05, seed=0):
+    generator = Generator(seed=seed)
+    rng = random.Random(seed)
+    works = {}
+    items = []
+    for number in range(count):
+        title = generator.title()
+        doi = '10.5555/%d' % number
+        if rng.random() < unknown:
+            items.append((title, doi))  # not in the stub
+            continue
+        works[doi] = {
+            'DOI': doi, 'title': [title], 'type': 'proceedings-article',
+            'publisher': 'ACM', 'page': '%d-%d' % (number, number + 9),
+            'container-title': ['Proceedings of Something'],
+            'issued': {'date-parts': [[2020]]},
+        }
+        items.append((title, doi if rng.random() < 0.7 else None))
+    return items, works
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(__doc__)
+    parser.add_argument('--entries', type=int, default=2000)
+    parser.add_argument('--latency', type=float, nargs=2,
+                        default=[0.05, 0.5], help='min and max latency')
+    parser.add_argument('--failures', type=float, default=0.02,
+                        help='fraction of requests answered with a 503')
+    parser.add_argument('--concurrency', type=int, default=256)
+    parser.add_argument('--rate', type=float, default=0,
+                        help='requests per second, 0 for no limit')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    items, works = make_items(args.entries, seed=args.seed)
+    server = serve(works, args.latency, args.failures, args.seed)
+    resolver = Resolver(
+        CrossrefBackend('http://127.0.0.1:%d' % server.server_address[1]),
+        concurrency=args.concurrency, rate=args.rate or None
+    )
+    start = time.perf_counter()
+    results = resolver.resolve(items)
+    elapsed = time.perf_counter() - start
+    resolver.close()
+    server.shutdown()
+
+    found = sum(fields is not None for fields, _ in results)
+    problems = sum(problem is not None for _, problem in results)
+    delays = sorted(server.delays, reverse=True)
+    print(json.dumps({
+        'entries': len(items),
+        'requests': len(delays),
+        'found': found,
+        'problems': problems,
+        'elapsed': elapsed,
+        'sum_of_latencies': sum(delays),
+        'slowest_5_latencies': sum(delays[:5]),
+    }, indent=2))
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Time the stages of revise_bibtex on a generated bibliography, and
+compare the results with those of another commit.
+
+Every scenario runs --repeat times, and the minimum and median times are
+written as JSON, together with the commit and the generator options.
+
+Example:
+
+    $ git checkout main && python3 benchmarks/run.py -o main.json
+    $ git checkout topic && python3 benchmarks/run.py --compare main.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+import bibtexparser  # noqa: E402
+
+from generate import add_arguments, generate, options  # noqa: E402
+from revise_bibtex.core import get_bib_items_ids, validate_entry  # noqa
+from revise_bibtex.duplicates import find_duplicates  # noqa: E402
+from revise_bibtex.stream import (  # noqa: E402
+    EntryWriter, index_bib, iter_entries, rewrite_bib
+)
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def scenarios(bib_path, bbl_path, directory, pairwise=False):
+    """Yield (name, number of items, setup, function), the function is
+    timed on the value returned by setup, which is not timed. Files are
+    written in `directory`."""
+    with open(bib_path) as fl:
+        text = fl.read()
+    database = bibtexparser.loads(text)
+    entries = database.entries
+    yield 'parse', len(entries), lambda: text, bibtexparser.loads
+    yield 'parse_stream', len(entries), lambda: bib_path, \
+        lambda path: sum(1 for _ in iter_entries(path))
+    yield 'index', len(entries), lambda: bib_path, index_bib
+
+    def validate_all(copies):
+        for entry in copies:
+            validate_entry(entry, True)
+
+    yield 'validate_entry', len(entries), \
+        lambda: [dict(entry) for entry in entries], validate_all
+
+    validate_all(entries)
+    titles = [entry['title'] for entry in entries]
+    yield 'duplicates', len(titles), lambda: titles, \
+        lambda titles: sum(1 for _ in find_duplicates(titles))
+    if pairwise:
+        yield 'duplicates_pairwise', len(titles), lambda: titles, \
+            lambda titles: sum(1 for _ in find_duplicates(
+                titles, method='pairwise'))
+    if bbl_path is not None:
+        yield 'get_bib_items_ids', len(entries), lambda: bbl_path, \
+            get_bib_items_ids
+    yield 'write', len(entries), lambda: database, bibtexparser.dumps
+
+    def write_stream(entries):
+        writer = EntryWriter(io.StringIO())
+        for entry in entries:
+            writer.write(entry)
+
+    yield 'write_stream', len(entries), lambda: entries, write_stream
+
+    # One entry in a hundred changed, the items are the changed entries.
+    spans = index_bib(bib_path)[2]
+    changed = {entry['ID']: entry for entry in entries[::100]}
+    yield 'rewrite_minimal', len(changed), \
+        lambda: (bib_path, os.path.join(directory, 'out.bib'), spans,
+                 changed), \
+        lambda args: rewrite_bib(*args)
+
+
+def measure(setup, function, repeat):
+    times = []
+    for _ in range(repeat):
+        value = setup()
+        start = time.perf_counter()
+        function(value)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], cwd=ROOT,
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print the ratios of the median times to those of the baseline,
+    return the names of the scenarios slower than `threshold`."""
+    slower = []
+    print('%-22s %12s %12s %8s' % ('scenario', 'baseline', 'current',
+                                   'ratio'))
+    for name, result in results['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print('%-22s %12s %11.4fs' % (name, '-', result['median']))
+            continue
+        ratio = result['median'] / base['median']
+        print('%-22s %11.4fs %11.4fs %7.2fx' % (name, base['median'],
+                                                result['median'], ratio))
+        if ratio > threshold:
+            slower.append(name)
+    return slower
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(__doc__)
+    add_arguments(parser)
+    parser.add_argument('--bib', help='use this bib file instead of a '
+                        'generated one')
+    parser.add_argument('--bbl', help='bbl file to use with --bib')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', nargs='+', help='scenarios to run')
+    parser.add_argument('--pairwise', action='store_true',
+                        help='also time the pairwise duplicate scan, which '
+                        'is quadratic')
+    parser.add_argument('-o', '--output', help='write the results here')
+    parser.add_argument('--compare', help='results of a previous run')
+    parser.add_argument('--threshold', type=float, default=1.1,
+                        help='with --compare, exit with 1 if a scenario is '
+                        'slower by more than this ratio')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.bib:
+            bib_path, bbl_path = args.bib, args.bbl
+            generator = None
+        else:
+            bib_path = os.path.join(directory, 'bench.bib')
+            bbl_path = os.path.join(directory, 'bench.bbl')
+            generator = options(args)
+            generate(bib_path, bbl_path, **generator)
+        results = {
+            'meta': {
+                'commit': commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'bibtexparser': bibtexparser.__version__,
+                'generator': generator,
+                'bib': None if generator else os.path.abspath(bib_path),
+                'repeat': args.repeat,
+            },
+            'results': {},
+        }
+        for name, items, setup, function in scenarios(
+                bib_path, bbl_path, directory, args.pairwise):
+            if args.only and name not in args.only:
+                continue
+            times = measure(setup, function, args.repeat)
+            results['results'][name] = {
+                'items': items,
+                'times': times,
+                'min': min(times),
+                'median': statistics.median(times),
+                'per_item_us': 1e6 * min(times) / max(items, 1),
+            }
+            print('%-22s %8d items %10.4fs %10.2fus/item' % (
+                name, items, min(times), 1e6 * min(times) / max(items, 1)
+            ), file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as fl:
+            json.dump(results, fl, indent=2)
+    if args.compare:
+        with open(args.compare) as fl:
+            baseline = json.load(fl)
+        slower = compare(results, baseline, args.threshold)
+        if slower:
+            print('slower than the baseline: %s' % ', '.join(slower))
+            sys.exit(1)
+    elif not args.output:
+        json.dump(results, sys.stdout, indent=2)
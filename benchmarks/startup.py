@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Check that the imports of the command line, `python3 -m revise_bibtex
+--help`, stay within a time budget. The modules of the modes that are not
+used, e.g. --serve or --watch, should not be imported.
+
+Example:
+
+    $ python3 benchmarks/startup.py --budget 0.3
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(args, repeat):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime'] + args, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            universal_newlines=True, check=True
+        )
+        imports = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            imports.append((int(cumulative), name[1:]))
+        times.append((sum(t for t, name in imports
+                          if not name.startswith(' ')), imports))
+    return min(times)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(__doc__)
+    parser.add_argument('--budget', type=float, default=0.3,
+                        help='maximum import time in seconds')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10,
+                        help='number of slowest imports to show')
+    args = parser.parse_args()
+
+    baseline, _ = run(['-c', 'pass'], args.repeat)
+    total, imports = run(['-m', 'revise_bibtex', '--help'], args.repeat)
+    elapsed = (total - baseline) / 1e6
+    for cumulative, name in sorted(imports, reverse=True)[:args.top]:
+        print('%8.1f ms  %s' % (cumulative / 1e3, name.strip()))
+    print('python -m revise_bibtex --help: %.3f s (budget %.3f s)' %
+          (elapsed, args.budget))
+    sys.exit(0 if elapsed <= args.budget else 1)
@@ -1,5 +1,9 @@
+from .api import Result, revise
 from .core import validate_bibs
+from .rules import register_pattern
+from .titlecase import register_protected_terms
 
 
-__all__ = ['validate_bibs']
+__all__ = ['Result', 'register_pattern', 'register_protected_terms', 'revise',
+           'validate_bibs']
 __version__ = '0.1'
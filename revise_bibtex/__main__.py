@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 import argparse
 import os
+import re
 
-from revise_bibtex import validate_bibs
+from revise_bibtex import (
+    profiling, register_pattern, register_protected_terms, validate_bibs
+)
+from revise_bibtex.cache import default_cache_path
+from revise_bibtex.logger import logger
+from revise_bibtex.review import default_checkpoint
 
 
 help_msg = """
@@ -27,8 +33,13 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(help_msg)
     files_here = os.listdir()
 
-    parser.add_argument('bib_file', help='path to bib file')
-    parser.add_argument('--bbl-file', help='path to bbl file')
+    parser.add_argument('bib_file', nargs='?', help='path to bib file')
+    parser.add_argument(
+        '--bbl-file', nargs='+',
+        help='path to bbl file, or to the aux files of the paper, both '
+        'BibTeX and biblatex files are read, or to its root tex file, to '
+        'find the citations without compiling it'
+    )
     parser.add_argument('--out-bib-file', help='path to output bbl file')
     parser.add_argument(
         '--force-all-keys', action='store_true',
@@ -36,6 +47,12 @@ if __name__ == '__main__':
     )
     parser.add_argument('--skip', action='store_true',
                         help='Skip the one-by-one check')
+    parser.add_argument(
+        '--review-file',
+        help="where the one-by-one check saves its progress, a stopped "
+        "check resumes from it (default: .<bib file>.review.jsonl next to "
+        "the bib file)"
+    )
     parser.add_argument('--verbose', action='store_true',
                         help='Print also the good/skipped references')
     parser.add_argument('--no-logs', action='store_true',
@@ -46,15 +63,249 @@ if __name__ == '__main__':
         '--single-brace', action='store_true',
         help="print the bibTeX with single brace only in titles."
     )
+    parser.add_argument(
+        '--protect-words', action='store_true',
+        help="instead of the whole title, put in braces only the words "
+        "whose case is to be kept: acronyms, as \"BERT\" or \"CO2\", the "
+        "words in braces in the bib file and the protected terms"
+    )
+    parser.add_argument(
+        '--protected-terms', metavar='FILE',
+        help="with --protect-words, a file of more protected terms, one per "
+        "line, written as they should be, e.g. \"LaTeX\""
+    )
+    parser.add_argument(
+        '--duplicates', choices=['index', 'pairwise'], default='index',
+        help="how to find near-duplicate titles: an n-gram index that only "
+        "compares plausible pairs, or the exhaustive pairwise scan"
+    )
+    parser.add_argument(
+        '--authors', action='store_true',
+        help="also find the authors whose name is written in several forms "
+        "across the entries, e.g. \"J. Smith\" and \"Smith, John A.\""
+    )
+    parser.add_argument(
+        '--pattern', action='append', default=[], metavar='RULE=REGEX',
+        help="also warn about the required fields matching this regular "
+        "expression, reported under this rule name, can be repeated, e.g. "
+        "--pattern 'conf-abbreviation=\\bconf\\.'"
+    )
+    parser.add_argument('--ignore-case', action='store_true',
+                        help="match the --pattern's ignoring the case")
+    parser.add_argument(
+        '--stream', action='store_true',
+        help="process the bib file entry by entry with bounded memory, the "
+        "output keeps the order of the bib file"
+    )
+    parser.add_argument(
+        '--jobs', type=int, default=1,
+        help="number of processes validating the entries with --skip, or "
+        "serving the requests with --serve, 0 uses all the CPUs"
+    )
+    parser.add_argument(
+        '--cache', action='store_true',
+        help="keep the validated entries in a cache, reused across runs, "
+        "only the new or changed entries are validated again"
+    )
+    parser.add_argument(
+        '--cache-file',
+        help="path to the cache, implies --cache (default: %s)"
+        % default_cache_path()
+    )
+    parser.add_argument('--cache-size', type=int, default=100000,
+                        help="maximum number of cached entries")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="empty the cache before running")
+    parser.add_argument(
+        '--watch', action='store_true',
+        help="keep running, and revalidate the changed entries whenever the "
+        "bib or bbl files are saved"
+    )
+    parser.add_argument(
+        '--socket',
+        help="with --watch, answer queries about the entries on this unix "
+        "socket, one key or JSON request per line"
+    )
+    parser.add_argument('--poll-interval', type=float, default=0.5,
+                        help="seconds between checks of the files when "
+                        "inotify is not available")
+    parser.add_argument(
+        '--resolve', action='store_true',
+        help="look up the entries by DOI, or by title, in Crossref, fill "
+        "their missing required fields and report unknown DOIs"
+    )
+    parser.add_argument(
+        '--resolver-url', default='https://api.crossref.org',
+        help="base URL of the Crossref-compatible API (default: %(default)s)"
+    )
+    parser.add_argument('--resolve-concurrency', type=int, default=32,
+                        help="maximum number of requests in flight")
+    parser.add_argument(
+        '--resolve-rate', type=float, default=50,
+        help="maximum number of requests per second, 0 for no limit"
+    )
+    parser.add_argument(
+        '--mailto',
+        help="contact email sent to Crossref, to use its polite pool"
+    )
+    parser.add_argument(
+        '--library',
+        help="reference library index, built with --build-library, where "
+        "the entries are looked up by title, to fill their missing fields "
+        "and replace arXiv preprints by their peer-reviewed versions"
+    )
+    parser.add_argument(
+        '--build-library', metavar='DUMP',
+        help="build the --library index of this dump of references, a DBLP "
+        "XML file or a file of JSON records, one per line, maybe gzipped"
+    )
+    parser.add_argument(
+        '--merge', nargs='+', metavar='BIB', default=[],
+        help="merge these bib files, after the bib_file if given, dropping "
+        "the duplicate entries and renaming the conflicting IDs, then "
+        "validate the merged file into --out-bib-file"
+    )
+    parser.add_argument(
+        '--key-map',
+        help="with --merge, where to write the table of the dropped and "
+        "renamed IDs, and of the fields the dropped entries define "
+        "differently (default: the output path ending with -keys.tsv)"
+    )
+    parser.add_argument(
+        '--since', metavar='REV',
+        help="only validate the entries added or changed since this git "
+        "revision, and look for their duplicates among all the entries, "
+        "exit with 1 if they have new warnings, e.g. --since origin/main, "
+        "the index of the other entries is kept across runs next to the "
+        "cache"
+    )
+    parser.add_argument(
+        '--minimal-rewrite', action='store_true',
+        help="write the output as a copy of the bib file, where only the "
+        "entries changed by the validation are rewritten, the output file "
+        "can be the bib file itself"
+    )
+    parser.add_argument(
+        '--report',
+        help="write every warning, with its entry ID, rule and field, to "
+        "this file, with --skip they are not printed anymore"
+    )
+    parser.add_argument('--report-format', choices=['jsonl', 'sarif'],
+                        default='jsonl', help="format of the --report file")
+    parser.add_argument(
+        '--profile', action='store_true',
+        help="time the phases of the run and every validator, and print the "
+        "calls, total and 95th percentile times and the slowest entries, "
+        "the validators are only timed without --jobs"
+    )
+    parser.add_argument('--profile-json',
+                        help="also write the --profile timers as JSON here")
+    parser.add_argument(
+        '--serve', metavar='[HOST:]PORT',
+        help="instead of a bib file, validate the bib files of JSON requests "
+        "POSTed to this address, or of the JSON lines of stdin with '-', "
+        "on a pool of --jobs processes"
+    )
     # parser.add_argument(
     #     '--no-braces', action='store_true',
     #     help="print the bibTeX with quotations instead of braces"
     # )
 
     args = parser.parse_args()
+    for pattern in args.pattern:
+        name, sep, regex = pattern.partition('=')
+        if not sep or not name or not regex:
+            parser.error('--pattern should be RULE=REGEX, got "%s"' % pattern)
+        try:
+            register_pattern(name, regex, ignore_case=args.ignore_case)
+        except re.error as error:
+            parser.error('invalid --pattern "%s": %s' % (pattern, error))
+    if args.protected_terms:
+        with open(args.protected_terms) as fl:
+            register_protected_terms(
+                line.strip() for line in fl
+                if line.strip() and not line.startswith('#')
+            )
+    # The modules of the other modes are imported in their branch, a run
+    # only loads what it uses.
+    if args.serve:
+        from revise_bibtex.server import Service, serve_http, serve_lines
+
+        with Service(args.jobs) as service:
+            if args.serve == '-':
+                serve_lines(service)
+            else:
+                host, _, port = args.serve.rpartition(':')
+                serve_http(service, host or '127.0.0.1', int(port))
+        raise SystemExit()
+    if args.build_library:
+        if not args.library:
+            parser.error('--build-library needs the --library path')
+        from revise_bibtex.library import build_library
+
+        count = build_library(args.build_library, args.library)
+        logger.info('%d references indexed in "%s"', count, args.library)
+        if args.bib_file is None:
+            raise SystemExit()
+    if args.merge:
+        if not args.out_bib_file:
+            parser.error('--merge needs the --out-bib-file path')
+        from revise_bibtex.merge import merge_bibs
+
+        base = os.path.splitext(args.out_bib_file)
+        merged = '%s-merged%s' % base
+        merge_bibs(([args.bib_file] if args.bib_file else []) + args.merge,
+                   merged, args.key_map or '%s-keys.tsv' % base[0])
+        args.bib_file = merged
+    if args.bib_file is None:
+        parser.error('the bib_file argument is required')
+    cache_file = args.cache_file or (
+        default_cache_path() if args.cache else None
+    )
+    if args.watch:
+        from revise_bibtex.watch import watch_bibs
+
+        watch_bibs(
+            args.bib_file, args.bbl_file, force=not args.force_all_keys,
+            force_doi=args.force_doi, single_brace=args.single_brace,
+            protect_words=args.protect_words, socket_path=args.socket,
+            interval=args.poll_interval
+        )
+        raise SystemExit()
+    if args.since:
+        from revise_bibtex.incremental import lint_since
+
+        try:
+            count = lint_since(
+                args.bib_file, args.since, force=not args.force_all_keys,
+                force_doi=args.force_doi, single_brace=args.single_brace,
+                protect_words=args.protect_words, report_file=args.report,
+                report_format=args.report_format, cache_file=cache_file
+            )
+        except ValueError as error:
+            logger.error('%s', error, highlight=1)
+            raise SystemExit(2)
+        raise SystemExit(1 if count else 0)
+    if args.profile or args.profile_json:
+        profiler = profiling.enable()
     validate_bibs(
         args.bib_file, args.bbl_file, out_bib_file=args.out_bib_file,
         force=not args.force_all_keys, skip=args.skip, verbose=args.verbose,
         no_logs=args.no_logs, force_doi=args.force_doi,
-        single_brace=args.single_brace
+        single_brace=args.single_brace, protect_words=args.protect_words,
+        duplicates=args.duplicates,
+        stream=args.stream, jobs=args.jobs,
+        cache_file=cache_file,
+        cache_size=args.cache_size, clear_cache=args.clear_cache,
+        resolve=args.resolve, resolver_url=args.resolver_url,
+        resolve_concurrency=args.resolve_concurrency,
+        resolve_rate=args.resolve_rate or None, mailto=args.mailto,
+        report_file=args.report, report_format=args.report_format,
+        minimal_rewrite=args.minimal_rewrite, authors=args.authors,
+        library_file=args.library,
+        review_file=args.review_file or default_checkpoint(args.bib_file)
     )
+    if args.profile or args.profile_json:
+        profiler.log()
+        if args.profile_json:
+            profiler.dump(args.profile_json)
@@ -0,0 +1,99 @@
+import bibtexparser
+from bibtexparser.bibdatabase import BibDatabase, STANDARD_TYPES
+
+from .core import _validate
+from .crossref import CrossrefGraph, inherit
+from .duplicates import find_duplicates
+from .stream import make_parser
+
+
+class Result:
+    """The outcome of `revise`: the normalized cited entries in input order,
+    their warnings by ID, the pairs of IDs of near-duplicate titles, and the
+    cited keys that are not in the bib."""
+
+    def __init__(self, database, warnings, duplicates, missing):
+        self.database = database
+        self.warnings = warnings
+        self.duplicates = duplicates
+        self.missing = missing
+
+    @property
+    def entries(self):
+        return self.database.entries
+
+    def to_bib(self):
+        """Render the entries as `validate_bibs` writes them."""
+        return bibtexparser.dumps(self.database)
+
+    def to_dict(self):
+        return {
+            'entries': self.entries,
+            'warnings': {
+                key: [{'rule': getattr(w, 'rule', None),
+                       'field': getattr(w, 'field', None),
+                       'message': str(w)} for w in warnings]
+                for key, warnings in self.warnings.items()
+            },
+            'duplicates': [list(pair) for pair in self.duplicates],
+            'missing': self.missing,
+        }
+
+
+def revise(bib, cited=None, force=True, force_doi=False, single_brace=False,
+           protect_words=False, duplicates='index'):
+    """Validate and normalize a bibliography in memory, without any I/O.
+
+    `bib` is the text of a bib file, or an iterable of entries as parsed by
+    bibtexparser, which are copied and left untouched. `cited` are the cited
+    keys, all the entries by default, "*" stands for all of them too, and
+    no entry is validated for an empty `cited`. Safe
+    to call from several threads at once.
+    """
+    if isinstance(bib, str):
+        parser = make_parser()
+        parser.ignore_nonstandard_types = False
+        database = bibtexparser.loads(bib, parser=parser)
+        entries = database.entries
+    else:
+        database = BibDatabase()
+        entries = [dict(entry) for entry in bib]
+    # The same filter for both kinds of input, the other types, as @xdata,
+    # are only parents in the graph.
+    graph = CrossrefGraph.from_entries(entries)
+    entries = [entry for entry in entries
+               if entry['ENTRYTYPE'] in STANDARD_TYPES]
+    cited = {'*': None} if cited is None else dict.fromkeys(cited)
+    if '*' in cited:
+        cited.pop('*', None)
+        cited.update(dict.fromkeys(entry['ID'] for entry in entries))
+
+    options = dict(force=force, force_doi=force_doi,
+                   single_brace=single_brace, protect_words=protect_words)
+    validated = []
+    warnings = {}
+    for entry in entries:
+        if entry['ID'] not in cited:
+            continue
+        entry_warnings = []
+        if entry['ID'] in graph:
+            fields, entry_warnings = graph.inherited(entry['ID'])
+            inherit(entry, fields)
+        entry, validation_warnings, (note, _, _, _) = _validate(entry,
+                                                                 options)
+        entry_warnings = entry_warnings + validation_warnings
+        if note is not None:
+            entry['note'] = note
+        if entry_warnings:
+            warnings.setdefault(entry['ID'], []).extend(entry_warnings)
+        validated.append(entry)
+    database.entries = validated
+
+    seen = set(entry['ID'] for entry in validated)
+    titled = [entry for entry in validated if entry.get('title')]
+    return Result(
+        database, warnings,
+        [(titled[i]['ID'], titled[j]['ID']) for i, j in find_duplicates(
+            [entry['title'] for entry in titled], method=duplicates)],
+        [key for key in cited if key not in seen],
+    )
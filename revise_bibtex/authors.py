@@ -0,0 +1,156 @@
+from collections import defaultdict
+import re
+
+from .latex import decode_latex, strip_accents
+from .utils import trim
+
+
+_AND = re.compile(r'\s+and\s+', re.IGNORECASE)
+_TOKEN = re.compile(r'[^\s.]+\.?(?:-[^\s.]+\.?)*')
+
+
+def _fold(text):
+    """Lower-cased, without accents, e.g. "Gödel" -> "godel"."""
+    return strip_accents(text).lower()
+
+
+class Name:
+    """One author of an entry, e.g. "Smith, John A.", split as BibTeX does
+    in given names, the surname with its "von" part and a "Jr" part."""
+
+    __slots__ = ('given', 'surname', 'suffix', 'form', 'key', 'initials',
+                 'fulls')
+
+    def __init__(self, given, surname, suffix=''):
+        self.given = given
+        self.surname = surname
+        self.suffix = suffix
+        self.form = ' '.join(given + [surname]) + \
+            (', ' + suffix if suffix else '')
+        self.key = _fold(surname)
+        # The initials of each given name, several for "Jean-Pierre", and
+        # the folded name unless it is only an initial.
+        self.initials = []
+        self.fulls = []
+        for name in given:
+            parts = [_fold(part) for part in name.rstrip('.').split('-')]
+            self.initials.append(''.join(part[:1] for part in parts))
+            full = not name.endswith('.') and all(len(p) > 1 for p in parts)
+            self.fulls.append('-'.join(parts) if full else None)
+
+    @classmethod
+    def parse(cls, author):
+        """A Name from the decoded text of one author, None when it is not
+        a person with a given name and a surname, e.g. "others"."""
+        parts = [part.strip() for part in author.split(',')]
+        if len(parts) == 1:
+            tokens = _TOKEN.findall(parts[0])
+            if len(tokens) < 2:
+                return None
+            # The surname starts at the first lower-cased word, e.g. "van"
+            # in "Ludwig van Beethoven", or is the last word.
+            last = len(tokens) - 1
+            for i, token in enumerate(tokens[1:last], 1):
+                if token[0].islower():
+                    last = i
+                    break
+            given, surname, suffix = tokens[:last], tokens[last:], ''
+        else:
+            given = _TOKEN.findall(parts[-1])
+            surname = parts[0].split()
+            suffix = parts[1] if len(parts) > 2 else ''
+        if not given or not surname or surname == ['others']:
+            return None
+        return cls(given, ' '.join(surname), suffix)
+
+    def compatible(self, other):
+        """Whether both names can be of the same person: the same surname,
+        and given names which agree, except that one may lack some of the
+        middle names of the other, e.g. "J. Smith", "John Smith" and
+        "John A. Smith"."""
+        if self.key != other.key:
+            return False
+        short, long = sorted((self, other), key=lambda name: len(name.given))
+        j = 0
+        for i, initials in enumerate(short.initials):
+            while j < len(long.initials) and not _agree(
+                    initials, short.fulls[i], long.initials[j],
+                    long.fulls[j]):
+                if i == 0:  # the first given names must agree
+                    return False
+                j += 1
+            if j == len(long.initials):
+                return False
+            j += 1
+        return True
+
+    def completeness(self):
+        return (len(self.given), sum(full is not None for full in self.fulls),
+                sum(not char.isascii() for char in self.form))
+
+
+def _agree(initials, full, other_initials, other_full):
+    if full is not None and other_full is not None:
+        return full == other_full
+    return initials.startswith(other_initials) or \
+        other_initials.startswith(initials)
+
+
+def split_authors(author):
+    """The Names of an author field, in LaTeX."""
+    names = []
+    for text in _AND.split(trim(decode_latex(author))):
+        name = Name.parse(text)
+        if name is not None:
+            names.append(name)
+    return names
+
+
+class AuthorIndex:
+    """Groups the authors of many entries by their surname and first
+    initial, so that only the names in the same group are compared, and
+    finds the persons whose name is written in several forms."""
+
+    def __init__(self):
+        self._groups = defaultdict(dict)
+        self._entries = defaultdict(list)
+
+    def add(self, key, author):
+        """Index the names of the author field of the entry `key`."""
+        for name in split_authors(author):
+            group = self._groups[name.key, name.initials[0][:1]]
+            group.setdefault(name.form, name)
+            entries = self._entries[name.form]
+            if not entries or entries[-1] != key:
+                entries.append(key)
+
+    def _clusters(self, names):
+        # The most complete forms first, every other form joins the only
+        # cluster all of whose forms it is compatible with. A form such as
+        # "J. Smith", which can be "John Smith" as well as "Jane Smith",
+        # stays on its own.
+        names = sorted(names, key=lambda name: (
+            name.completeness(), len(self._entries[name.form]), name.form
+        ), reverse=True)
+        clusters = []
+        for name in names:
+            matching = [cluster for cluster in clusters
+                        if all(name.compatible(other) for other in cluster)]
+            if len(matching) == 1:
+                matching[0].append(name)
+            else:
+                clusters.append([name])
+        return clusters
+
+    def conflicts(self):
+        """Yield (canonical, {form: [entry keys]}) for every person written
+        in several forms, the canonical form is the most complete one."""
+        for names in self._groups.values():
+            if len(names) < 2:
+                continue
+            for cluster in self._clusters(names.values()):
+                if len(cluster) > 1:
+                    yield cluster[0].form, {
+                        name.form: self._entries[name.form]
+                        for name in cluster
+                    }
@@ -0,0 +1,128 @@
+import json
+import os
+import sqlite3
+import time
+
+from .logger import logger
+
+
+def default_cache_path():
+    base = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'revise_bibtex', 'cache.sqlite')
+
+
+class Cache:
+    """A key-value store of JSON values in an SQLite table, bounded to
+    `max_size` rows by evicting the least recently used ones on `close`.
+
+    Several processes can share the file: it is in WAL mode, a locked file
+    is waited for `timeout` seconds, and the writes are committed by the
+    caller with `commit`. A failing read or write, e.g. a file still locked
+    or corrupted, disables the cache for the rest of the run, with a
+    warning, rather than stopping the run."""
+
+    def __init__(self, path, table='entries', max_size=100000, timeout=30.0):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.table = table
+        self.max_size = max_size
+        self._touched = set()
+        self._connection = sqlite3.connect(path, timeout=timeout)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS %s (key TEXT PRIMARY KEY, '
+            'value TEXT NOT NULL, used REAL NOT NULL)' % table
+        )
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS %s_used ON %s (used)' % (table, table)
+        )
+        self._connection.commit()
+        self.hits = 0
+        self.misses = 0
+        self.disabled = False
+
+    def _disable(self, error):
+        logger.warning('Cannot use the cache "%s" anymore: %s', self.path,
+                       error, highlight=1)
+        self.disabled = True
+        try:
+            self._connection.rollback()
+        except sqlite3.Error:
+            pass
+
+    def get(self, key):
+        if self.disabled:
+            self.misses += 1
+            return None
+        try:
+            row = self._connection.execute(
+                'SELECT value FROM %s WHERE key = ?' % self.table, (key,)
+            ).fetchone()
+        except sqlite3.Error as error:
+            self._disable(error)
+            row = None
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touched.add(key)
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        if self.disabled:
+            return
+        try:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO %s (key, value, used) VALUES (?, ?, ?)'
+                % self.table, (key, json.dumps(value), time.time())
+            )
+        except sqlite3.Error as error:
+            self._disable(error)
+
+    def commit(self):
+        """Write the values put so far, without holding the write lock of
+        the file until `close`."""
+        if self.disabled:
+            return
+        try:
+            self._connection.commit()
+        except sqlite3.Error as error:
+            self._disable(error)
+
+    def clear(self):
+        self._connection.execute('DELETE FROM %s' % self.table)
+        self._connection.commit()
+        self._touched.clear()
+
+    def evict(self):
+        size = self._connection.execute(
+            'SELECT COUNT(*) FROM %s' % self.table
+        ).fetchone()[0]
+        if size > self.max_size:
+            self._connection.execute(
+                'DELETE FROM {0} WHERE key IN (SELECT key FROM {0} '
+                'ORDER BY used LIMIT ?)'.format(self.table),
+                (size - self.max_size,)
+            )
+
+    def close(self):
+        if not self.disabled:
+            now = time.time()
+            try:
+                self._connection.executemany(
+                    'UPDATE %s SET used = ? WHERE key = ?' % self.table,
+                    ((now, key) for key in self._touched)
+                )
+                self.evict()
+                self._connection.commit()
+            except sqlite3.Error as error:
+                self._disable(error)
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,192 @@
+import mmap
+import os
+import re
+
+
+# bbl files: \bibitem{key} and \bibitem[label]{key} of BibTeX, and
+# \entry{key}{type}{...} of biblatex.
+_BBL_KEY = re.compile(
+    rb'\\bibitem[ \t\r\n]*(?:\[(?:[^\[\]{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\])?'
+    rb'[ \t\r\n]*\{([^}]*)\}'
+    rb'|\\entry[ \t\r\n]*\{([^}]*)\}'
+)
+# aux files: \citation{a,b} of BibTeX, \abx@aux@cite{refsection}{key} of
+# biblatex, and \@input{chapter.aux} for the files of \include.
+_AUX_KEY = re.compile(
+    rb'\\citation[ \t\r\n]*\{([^}]*)\}'
+    rb'|\\abx@aux@cite[ \t\r\n]*(?:\{[^}]*\}[ \t\r\n]*)?\{([^}]*)\}'
+    rb'|\\@input[ \t\r\n]*\{([^}]*)\}'
+)
+
+# tex files: the comments, which are dropped before the scan, ...
+_TEX_COMMENT = re.compile(
+    rb'%[^\n]*'
+    rb'|\\begin[ \t]*\{comment\}.*?\\end[ \t]*\{comment\}',
+    re.DOTALL
+)
+# ... the citation commands of LaTeX, natbib and biblatex, e.g. \cite,
+# \citep*, \parencite[see][5]{key}, \textcite, \nocite{*}, the multicite
+# commands, e.g. \cites[5]{a}[7]{b}, and the included files, also
+# \input chapter of plain TeX.
+_TEX_ARGUMENTS = r'(?:\s*(?:\[[^\]]*\]|\([^)]*\)))*\s*'
+_TEX_KEY = re.compile(
+    r'\\[A-Za-z]*[Cc]ites\*?((?:' + _TEX_ARGUMENTS + r'\{[^{}]*\})+)'
+    r'|\\[A-Za-z]*[Cc]ite[A-Za-z]*\*?' + _TEX_ARGUMENTS + r'\{([^{}]*)\}'
+    r'|\\(input|include|subfile)(?:\s*\{([^}]*)\}|[ \t]+([^\s{}\\]+))'
+)
+_TEX_MULTICITE = re.compile(r'\[[^\]]*\]|\([^)]*\)|\{([^{}]*)\}')
+
+
+def _read(path):
+    with open(path, 'rb') as fl:
+        if os.fstat(fl.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _add_bbl_keys(path, keys):
+    data = _read(path)
+    for match in _BBL_KEY.finditer(data):
+        key = (match.group(1) or match.group(2) or b'').strip()
+        if key:
+            keys[key.decode('utf-8')] = None
+    if isinstance(data, mmap.mmap):
+        data.close()
+
+
+def _add_aux_keys(path, keys, visited):
+    path = os.path.abspath(path)
+    if path in visited or not os.path.isfile(path):
+        return
+    visited.add(path)
+    data = _read(path)
+    for match in _AUX_KEY.finditer(data):
+        citations, cite, aux_input = match.groups()
+        if aux_input is not None:
+            _add_aux_keys(
+                os.path.join(os.path.dirname(path),
+                             aux_input.strip().decode('utf-8')),
+                keys, visited
+            )
+            continue
+        for key in (citations or cite).split(b','):
+            key = key.strip()
+            if key:
+                keys[key.decode('utf-8')] = None
+    if isinstance(data, mmap.mmap):
+        data.close()
+
+
+def _tex_path(name, path, base, subfile):
+    """The file of \\input{name} in `path`, which is relative to the
+    directory of the root file `base`, or for \\subfile to the one of
+    `path`, None if not found."""
+    name = name.strip()
+    directories = [os.path.dirname(path), base]
+    if not subfile:
+        directories.reverse()
+    for directory in directories:
+        for candidate in (name, name + '.tex'):
+            candidate = os.path.join(directory, candidate)
+            if os.path.isfile(candidate):
+                return os.path.abspath(candidate)
+    return None
+
+
+def _strip_tex_comments(data):
+    parts = []
+    last = 0
+    match = _TEX_COMMENT.search(data)
+    while match is not None:
+        start = match.start()
+        if data[start] == ord('%'):
+            # \% is a percent sign, \\% a line break and a comment.
+            backslash = start
+            while backslash > 0 and data[backslash - 1] == ord('\\'):
+                backslash -= 1
+            if (start - backslash) % 2:
+                match = _TEX_COMMENT.search(data, start + 1)
+                continue
+        parts.append(data[last:start])
+        last = match.end()
+        match = _TEX_COMMENT.search(data, last)
+    parts.append(data[last:])
+    return b''.join(parts)
+
+
+def _scan_tex(path, base):
+    """The keys cited in a tex file, in order, in runs of [keys, included
+    file], the last included file being None."""
+    data = _read(path)
+    text = _strip_tex_comments(data).decode('utf-8', 'replace')
+    if isinstance(data, mmap.mmap):
+        data.close()
+    runs = []
+    keys = []
+    for multicite, cited, include, name, bare in _TEX_KEY.findall(text):
+        if include:
+            runs.append((keys, _tex_path(name or bare, path, base,
+                                         include == 'subfile')))
+            keys = []
+            continue
+        if multicite:
+            cited = ','.join(_TEX_MULTICITE.findall(multicite))
+        keys.extend(filter(None, map(str.strip, cited.split(','))))
+    runs.append((keys, None))
+    return runs
+
+
+def _add_tex_keys(path, keys, visited):
+    # The files are scanned concurrently, each included file as soon as it
+    # is found, then their keys are taken in the order of the document.
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    root = os.path.abspath(path)
+    if root in visited or not os.path.isfile(root):
+        return
+    base = os.path.dirname(root)
+    scanned = {root: None}
+    with ThreadPoolExecutor() as executor:
+        pending = {executor.submit(_scan_tex, root, base): root}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                found = scanned[pending.pop(future)] = future.result()
+                for _, included in found:
+                    if included is not None and included not in scanned \
+                            and included not in visited:
+                        scanned[included] = None
+                        pending[executor.submit(
+                            _scan_tex, included, base
+                        )] = included
+    stack = [iter([((), root)])]
+    while stack:
+        for cited, included in stack[-1]:
+            keys.update(dict.fromkeys(cited))
+            if included in scanned and included not in visited:
+                visited.add(included)
+                stack.append(iter(scanned[included]))
+                break
+        else:
+            stack.pop()
+
+
+def read_citation_keys(paths):
+    """Return the keys cited in .bbl, .aux or .tex files, as a dict used as
+    an ordered set: the keys are in citation order, without repetitions.
+
+    The .aux files of \\include'd files are followed. The .tex files are
+    read without compiling them, following \\input, \\include and
+    \\subfile, on a pool of threads. A key "*" means that \\nocite{*} was
+    used.
+    """
+    keys = {}
+    visited = set()
+    for path in paths:
+        if path.endswith('.aux'):
+            _add_aux_keys(path, keys, visited)
+        elif path.endswith('.tex'):
+            _add_tex_keys(path, keys, visited)
+        else:
+            _add_bbl_keys(path, keys)
+    return keys
@@ -1,18 +1,45 @@
 #!/usr/bin/env python3
+from collections import deque
+from contextlib import ExitStack
+import hashlib
+from itertools import islice
+import json
 import os
-import re
-import urllib.parse
+import sqlite3
 
 import bibtexparser
-import pyperclip
-
+from bibtexparser.bibdatabase import STANDARD_TYPES
+
+from .authors import AuthorIndex
+from .cache import Cache
+from .citations import read_citation_keys
+from .crossref import CrossrefGraph, inherit
+from .duplicates import TitleIndex, find_duplicates
+from .entry import Entry
+from .latex import decode_latex, encode_latex
 from .logger import logger
+from . import profiling
+from .report import Issue, Report, decode_issues, encode_issues
+from . import rules
+from . import titlecase
+from .stream import (
+    EntryWriter, index_bib, iter_entry_blocks, make_parser, parse_block,
+    rewrite_bib
+)
 from .utils import (
-    print_entry_dict_as_bib, trim, non_capitalized_words,
-    remove_umlauts, us_state_abbrev, isclose
+    isclose, print_entry_dict_as_bib, trim, non_capitalized_words,
+    us_state_abbrev
 )
 
 
+# Bump when the validation rules change, it invalidates the cached results.
+RULES_VERSION = '5'
+
+# The functions called by validate_entry, they are timed with --profile.
+VALIDATORS = ['validate_title', 'validate_author', 'validate_arxiv',
+              'validate_pages', 'validate_address', 'validate_doi',
+              'validate_required_keys']
+
 required_keys = {
     "inproceedings": ['title', 'publisher', 'address',
                       'booktitle', 'pages', 'year', 'author'],
@@ -26,17 +53,18 @@ required_keys = {
 
 
 def get_bib_items_ids(bbl_path):
-    regex = re.compile(r'\\bibitem{(.*?)}')
-    with open(bbl_path, 'r') as fl:
-        bib_file_text = fl.read()
+    if isinstance(bbl_path, str):
+        bbl_path = [bbl_path]
+    return read_citation_keys(bbl_path)
 
-    return regex.findall(bib_file_text)
 
-
-def validate_title(entry, single_brace=False):
+def validate_title(entry, single_brace=False, protect_words=False):
     if 'title' not in entry.keys():
         return 'title key not found'
     title = entry['title']
+    if protect_words:
+        entry['title'] = titlecase.protect_title(title)
+        return
 
     title = trim(title)
     bad_words = non_capitalized_words(title)
@@ -51,24 +79,26 @@ def validate_title(entry, single_brace=False):
         #     (counts, title, bad_words)
 
 
+_STATE_ABBREVIATIONS = frozenset(us_state_abbrev.values())
+_US_STATES = _STATE_ABBREVIATIONS.union(us_state_abbrev)
+
+
 def validate_address(entry):
     if 'address' in entry.keys() and entry['ENTRYTYPE'] == 'inproceedings':
-        states = list(us_state_abbrev.keys())
-        abbrv = list(us_state_abbrev.values())
         address = entry['address']
         components = [w.strip() for w in address.split(',')]
         if len(components) == 3:
             if components[2] != 'USA':
                 return 'address\' last component should be USA if they '\
                     'are 3 components, got %s' % components[2]
-            if components[1] not in states + abbrv:
+            if components[1] not in _US_STATES:
                 return 'address component[1] should be a US state, got: %s' %\
                     components[1]
         elif len(components) != 2:
             return 'address components should be 2 or 3'
-        if components[1] in states:
+        if components[1] in us_state_abbrev:
             components[1] = us_state_abbrev[components[1]]
-        if components[1] in abbrv and len(components) == 2:
+        if components[1] in _STATE_ABBREVIATIONS and len(components) == 2:
             components.append('USA')
         address = ', '.join(components)
         entry['address'] = address
@@ -79,8 +109,9 @@ def validate_author(entry):
         return 'authors key not found'
     author = entry['author']
 
-    author = trim(author)
-    author = remove_umlauts(author)
+    # Decoded first, as trim drops the braces of macros like {\H{o}}.
+    author = trim(decode_latex(author))
+    author = encode_latex(author)
     authors = author.split(' and ')
     for a in authors:
         names = []
@@ -135,57 +166,282 @@ def validate_doi(entry):
             return 'URL is available but not DOI, check please'
 
 
-def validate_entry(entry, force, force_doi=False, single_brace=False):
-
-    warnings = [
-        validate_title(entry, single_brace=single_brace),
-        validate_author(entry),
-        validate_arxiv(entry),
-        validate_pages(entry),
-        validate_address(entry),
-    ]
-    if force_doi:
-        warnings.append(validate_doi(entry))
-
+def validate_required_keys(entry, force):
+    warnings = []
     necessary_keys = required_keys.get(entry['ENTRYTYPE'], [])
     year = entry.get('year', 'YEAR')
     if 'year' not in entry.keys():
-        warnings.append("Year is empty")
+        warnings.append(Issue("Year is empty", 'missing-year', 'year'))
     publisher = entry.get('publisher', '')
     if not necessary_keys:
-        warnings.append('Unknown entry type "%s"' % entry['ENTRYTYPE'])
+        warnings.append(Issue('Unknown entry type "%s"' % entry['ENTRYTYPE'],
+                              'unknown-type'))
     else:
         for key in necessary_keys:
             if key not in entry.keys():
                 entry[key] = ''
-            if not entry[key] and key != 'url':
-                warnings.append('"%s" is empty' % key)
-            if year in entry[key] and key not in [
-                    'year', 'title', 'doi', 'url'
-                    ]:
-                warnings.append('Year "%s": is found in "%s": "%s"' % (
-                    year, key, entry[key]
-                ))
-            if publisher and key != 'publisher' and publisher in entry[key]:
-                warnings.append('Publisher "%s" is found in "%s": "%s"' % (
-                    publisher, key, entry[key]
-                ))
-            if 'proc.' in entry[key].lower():
-                warnings.append('"proc." found in "%s": "%s"' %
-                                (key, entry[key]))
+        warnings.extend(rules.scanner().scan(entry, necessary_keys, year,
+                                             publisher))
 
         pairs = list(entry.items())
         for key, value in pairs:
             if not value or (force and key not in necessary_keys +
                              ['ENTRYTYPE', 'ID']):
                 del entry[key]
+    return warnings
+
+
+def _issue(warning, rule, field):
+    return Issue(warning, rule, field) if warning else None
+
+
+def validate_entry(entry, force, force_doi=False, single_brace=False,
+                   protect_words=False):
+
+    warnings = [
+        _issue(validate_title(entry, single_brace=single_brace,
+                              protect_words=protect_words), 'title',
+               'title'),
+        _issue(validate_author(entry), 'author', 'author'),
+        _issue(validate_arxiv(entry), 'arxiv', 'journal'),
+        _issue(validate_pages(entry), 'pages', 'pages'),
+        _issue(validate_address(entry), 'address', 'address'),
+    ]
+    if force_doi:
+        warnings.append(_issue(validate_doi(entry), 'doi', 'url'))
+
+    warnings.extend(validate_required_keys(entry, force))
     warnings = [x for x in warnings if x]
     return warnings
 
 
+def _without_note(entry):
+    return {key: value for key, value in entry.items() if key != 'note'}
+
+
+def _validate(entry, options):
+    original = _without_note(entry)
+    note, crossref, doi = entry.get('note', None), \
+        entry.get('crossref', None), entry.get('doi', None)
+    warnings = validate_entry(entry, **options)
+    # The note is put back after the validation.
+    modified = _without_note(entry) != original
+    return entry, warnings, (note, crossref, doi, modified)
+
+
+_worker_parser = None
+
+
+def _init_worker(strings, user_rules=(), protected_terms=()):
+    global _worker_parser
+    _worker_parser = make_parser(compact=True)
+    _worker_parser.bib_database.strings.update(strings)
+    rules.set_user_rules(user_rules)
+    titlecase.set_user_protected_terms(protected_terms)
+
+
+def _validate_items(items, options, parser=None):
+    parser = parser or _worker_parser
+    results = []
+    for item in items:
+        if isinstance(item, tuple):
+            entries = parse_block(parser, item[1])
+            if len(item) > 2:
+                for entry in entries:
+                    inherit(entry, item[2])
+        else:
+            entries = [item]
+        results.append([_validate(entry, options) for entry in entries])
+    return results
+
+
+def _cache_key(item, salt):
+    if isinstance(item, tuple):
+        raw = item[1] if len(item) == 2 else \
+            json.dumps(item[1:], sort_keys=True)
+    else:
+        raw = json.dumps(item, sort_keys=True)
+    return hashlib.sha256((salt + raw).encode('utf-8')).hexdigest()
+
+
+def validate_entries(items, force, force_doi=False, single_brace=False,
+                     protect_words=False, jobs=1, strings=None, cache=None,
+                     chunk_size=64):
+    """Validate entries, yielding (entry, warnings, (note, crossref, doi,
+    modified)) in the input order, where note, crossref and doi are taken
+    before the validation, and modified tells whether it changed the entry
+    in another way than dropping its note.
+
+    The items are entries or (ID, text) blocks of a bib file, which are
+    parsed using the given @string definitions, or (ID, text, fields)
+    blocks, which inherit these fields from their crossref and xdata
+    entries. With a `Cache`, the results of the items seen in previous runs
+    are reused. With jobs != 1 (0 for all the CPUs), the items are sent in
+    chunks to a pool of processes, with a bounded number of chunks in
+    flight.
+    """
+    from concurrent.futures import Future, ProcessPoolExecutor
+
+    options = dict(force=force, force_doi=force_doi,
+                   single_brace=single_brace, protect_words=protect_words)
+    strings = dict(strings or {})
+    user_rules = rules.user_rules()
+    protected_terms = titlecase.user_protected_terms()
+    salt = json.dumps([RULES_VERSION, options, strings, user_rules,
+                       protected_terms], sort_keys=True)
+
+    with ExitStack() as stack:
+        if jobs == 1:
+            max_pending = 1
+            parser = make_parser(compact=True)
+            parser.bib_database.strings.update(strings)
+
+            def compute(chunk):
+                future = Future()
+                future.set_result(_validate_items(chunk, options, parser))
+                return future
+        else:
+            max_pending = 2 * (jobs or os.cpu_count() or 1)
+            executor = stack.enter_context(ProcessPoolExecutor(
+                jobs or None, initializer=_init_worker,
+                initargs=(strings, user_rules, protected_terms)
+            ))
+
+            def compute(chunk):
+                return executor.submit(_validate_items, chunk, options)
+
+        items = iter(items)
+        pending = deque()
+        while True:
+            chunk = list(islice(items, chunk_size))
+            if chunk:
+                keys = cached = None
+                misses = chunk
+                if cache is not None:
+                    keys = [_cache_key(item, salt) for item in chunk]
+                    cached = [cache.get(key) for key in keys]
+                    misses = [item for item, hit in zip(chunk, cached)
+                              if hit is None]
+                pending.append(
+                    (compute(misses) if misses else None, keys, cached)
+                )
+            if pending and (not chunk or len(pending) >= max_pending):
+                future, keys, cached = pending.popleft()
+                computed = iter(future.result() if future else ())
+                if cached is None:
+                    for results in computed:
+                        yield from results
+                    continue
+                chunk_results = []
+                for key, results in zip(keys, cached):
+                    if results is None:
+                        results = next(computed)
+                        cache.put(key, [
+                            (dict(entry), encode_issues(warnings), kept)
+                            for entry, warnings, kept in results
+                        ])
+                    else:
+                        results = [
+                            (Entry(entry), decode_issues(warnings), kept)
+                            for entry, warnings, kept in results
+                        ]
+                    chunk_results.append(results)
+                # Committed before the results are used, the other runs
+                # sharing the cache are not locked out meanwhile.
+                cache.commit()
+                for results in chunk_results:
+                    yield from results
+            elif not chunk:
+                break
+
+
+def _fill(entry, warnings, kept, fields):
+    """Fill the empty required fields of a validated entry from `fields`,
+    and drop their warnings."""
+    filled = [
+        key for key in required_keys.get(entry['ENTRYTYPE'], [])
+        if not entry.get(key) and fields.get(key)
+    ]
+    for key in filled:
+        entry[key] = fields[key]
+    if filled:
+        kept = kept[:3] + (True,)
+        empty = ['"%s" is empty' % key for key in filled]
+        warnings = [w for w in warnings if w not in empty]
+        logger.info('%s: filled %s', entry['ID'], ', '.join(filled))
+    return warnings, kept
+
+
+def resolve_entries(validated, resolver, batch_size=1024):
+    """Fill the empty required fields of the validated entries with the
+    metadata found by a `Resolver`, which looks up a batch of entries
+    concurrently. The warnings of the filled fields are dropped, and the
+    problems found by the resolver, e.g. unknown DOIs, are added."""
+    validated = iter(validated)
+    while True:
+        batch = list(islice(validated, batch_size))
+        if not batch:
+            return
+        with profiling.phase('resolve'):
+            found = resolver.resolve([(entry.get('title'), kept[2])
+                                      for entry, _, kept in batch])
+        for (entry, warnings, kept), (fields, problem) in zip(batch, found):
+            if fields:
+                warnings, kept = _fill(entry, warnings, kept, fields)
+            if problem is not None:
+                warnings = warnings + [Issue(problem, 'resolve', 'doi')]
+            yield entry, warnings, kept
+
+
+# The fields of an arXiv entry which are replaced by those of its
+# peer-reviewed version.
+_VENUE_KEYS = ('journal', 'booktitle', 'publisher', 'address', 'pages',
+               'volume', 'number', 'year', 'doi', 'archiveprefix', 'eprint',
+               'primaryclass')
+
+
+def match_entries(validated, library, options):
+    """Look up the validated entries by title in a reference `Library`.
+    An arXiv entry, see `validate_arxiv`, whose peer-reviewed version is
+    found becomes that version, and is validated again, the other entries
+    have their empty required fields filled."""
+    from .library import is_preprint
+
+    for entry, warnings, kept in validated:
+        with profiling.phase('library'):
+            fields = library.match(entry['title']) \
+                if entry.get('title') else None
+        if fields is not None and is_preprint(entry):
+            for key in _VENUE_KEYS:
+                entry.pop(key, None)
+            entry['ENTRYTYPE'] = fields['ENTRYTYPE']
+            for key in _VENUE_KEYS:
+                if key in fields:
+                    entry[key] = fields[key]
+            venue = fields.get('journal') or fields.get('booktitle') or \
+                fields.get('publisher', '')
+            logger.info('%s: replaced by its version in %s', entry['ID'],
+                        venue)
+            warnings = validate_entry(entry, **options) + [Issue(
+                'arXiv preprint replaced by its version in "%s"' % venue,
+                'library', 'journal'
+            )]
+            kept = kept[:3] + (True,)
+        elif fields is not None:
+            warnings, kept = _fill(entry, warnings, kept, fields)
+        yield entry, warnings, kept
+
+
 def validate_bibs(bib_path, bbl_path, out_bib_file=None, force=True,
                   skip=False, verbose=False, no_logs=False, force_doi=False,
-                  braces=True, single_brace=False):
+                  braces=True, single_brace=False, protect_words=False,
+                  duplicates='index', stream=False, jobs=1, cache_file=None,
+                  cache_size=100000, clear_cache=False, resolve=False,
+                  resolver_url=None,
+                  resolve_concurrency=32, resolve_rate=50, mailto=None,
+                  report_file=None, report_format='jsonl',
+                  minimal_rewrite=False, authors=False, library_file=None,
+                  review_file=None):
 
     if not no_logs:
         from .logger import add_log_file
@@ -195,96 +451,283 @@ def validate_bibs(bib_path, bbl_path, out_bib_file=None, force=True,
         logger.error("Invalid path for bib file \"%s\"", bib_path, highlight=1)
         return
 
-    is_there_bbl = False
-    if bbl_path is None:
+    if isinstance(bbl_path, str):
+        bbl_path = [bbl_path]
+    bbl_paths = []
+    if not bbl_path:
         logger.critical(
             "bbl_path is not provided, it is very recommended to provide one",
             highlight=1
         )
-    elif not os.path.isfile(bbl_path):
-        logger.error("Invalid path for bbl file \"%s\"", bbl_path, highlight=1)
-    else:
-        is_there_bbl = True
+    for path in bbl_path or []:
+        if not os.path.isfile(path):
+            logger.error("Invalid path for bbl file \"%s\"", path,
+                         highlight=1)
+        else:
+            bbl_paths.append(path)
+    is_there_bbl = bool(bbl_paths)
 
-    if out_bib_file is not None and bib_path == out_bib_file:
+    if out_bib_file is not None and bib_path == out_bib_file and \
+            not minimal_rewrite:
         logger.error(
             "Input and output files should be different, %s" % bib_path,
             highlight=1
         )
         return
 
-    with open(bib_path, 'r') as fl:
-        bibtex = bibtexparser.load(fl)
-        logger.info('loaded "%s" ...', bib_path)
+    if not skip:
+        jobs = 1
+    cache = None
+    if cache_file is not None:
+        try:
+            cache = Cache(cache_file, max_size=cache_size)
+            if clear_cache:
+                cache.clear()
+        except (OSError, sqlite3.Error) as error:
+            logger.error('Cannot use the cache "%s": %s', cache_file, error,
+                         highlight=1)
+            cache = None
+    if stream or jobs != 1 or cache is not None or minimal_rewrite:
+        parser = make_parser()
+        with profiling.phase('index'):
+            bib_ids, graph, spans = index_bib(bib_path, parser)
+        # The entries are parsed while being validated, possibly by the
+        # workers or not at all for cached ones, everything else is parsed
+        # here.
+        layout_parser = make_parser()
+        bibtex = layout_parser.bib_database
+        entries = iter_entry_blocks(bib_path, layout_parser)
+        strings = parser.bib_database.strings
+        logger.info('indexed "%s" ...', bib_path)
+    else:
+        with open(bib_path, 'r') as fl, profiling.phase('load'):
+            load_parser = make_parser(compact=True)
+            load_parser.ignore_nonstandard_types = False
+            bibtex = bibtexparser.load(fl, load_parser)
+            logger.info('loaded "%s" ...', bib_path)
+        with profiling.phase('crossref'):
+            graph = CrossrefGraph.from_entries(bibtex.entries)
+        # The other types, as @xdata, are only parents in the graph.
+        entries = [entry for entry in bibtex.entries
+                   if entry['ENTRYTYPE'] in STANDARD_TYPES]
+        bib_ids = [entry['ID'] for entry in entries]
+        strings = None
 
     if is_there_bbl:
-        all_ids = get_bib_items_ids(bbl_path)
+        with profiling.phase('citations'):
+            all_ids = get_bib_items_ids(bbl_paths)
+        if '*' in all_ids:  # \nocite{*}
+            del all_ids['*']
+            all_ids.update(dict.fromkeys(bib_ids))
         logger.info(
             '%d bibitems are to be found...', len(all_ids), highlight=4
         )
     else:
-        all_ids = [entry['ID'] for entry in bibtex.entries]
+        all_ids = dict.fromkeys(bib_ids)
+    cited = all_ids.keys()
+
+    report = None
+    if report_file is not None:
+        report = Report(report_file, report_format, bib_path=bib_path)
+    # With a report and --skip, nobody reads the warnings on the console,
+    # they are neither logged nor rendered with their entries.
+    quiet = report is not None and skip
+
+    out_fl = writer = None
+    if stream and out_bib_file is not None and not minimal_rewrite:
+        out_fl = open(out_bib_file, 'w')
+        writer = EntryWriter(out_fl, parser.bib_database)
 
     ids = []
+    titles = []
+    author_index = AuthorIndex() if authors else None
     filtered_entries = []
+    changed = {}
+    occurrences = {}
+    inheritance_issues = {}
     cnt = 0
 
-    for entry in bibtex.entries:
-        if entry['ID'] not in all_ids:
-            if verbose:
-                logger.info('skipping %s, because it is not in the bbl file, '
-                            'it is probably not cited..', entry['ID'])
-            continue
-        note = entry.get('note', None)
-        ids.append(entry['ID'])
-        filtered_entries.append(entry)
-        warnings = validate_entry(
-            entry, force, force_doi=force_doi, single_brace=single_brace
+    def cited_entries():
+        for item in entries:
+            key = item[0] if isinstance(item, tuple) else item['ID']
+            if key not in cited:
+                if verbose:
+                    logger.info('skipping %s, because it is not in the bbl '
+                                'file, it is probably not cited..', key)
+                continue
+            # The entries are validated with the fields they inherit.
+            if key in graph:
+                fields, issues = graph.inherited(key)
+                if issues:
+                    inheritance_issues[key] = issues
+                if isinstance(item, tuple):
+                    item = item + (fields,)
+                else:
+                    inherit(item, fields)
+            yield item
+
+    validated = profiling.iterate('validate', validate_entries(
+        cited_entries(), force, force_doi=force_doi,
+        single_brace=single_brace, protect_words=protect_words, jobs=jobs,
+        cache=cache, strings=strings
+    ))
+    library = None
+    if library_file is not None:
+        from .library import Library
+        library = Library(library_file)
+        validated = match_entries(validated, library, dict(
+            force=force, force_doi=force_doi, single_brace=single_brace,
+            protect_words=protect_words
+        ))
+    resolver = None
+    if resolve:
+        from .resolve import CROSSREF_URL, CrossrefBackend, Resolver
+        responses = None
+        if cache_file is not None:
+            # A file of its own, the responses are not evicted by the
+            # validated entries.
+            responses_file = '%s-responses%s' % os.path.splitext(cache_file)
+            try:
+                responses = Cache(responses_file, table='responses',
+                                  max_size=cache_size)
+            except (OSError, sqlite3.Error) as error:
+                logger.error('Cannot use the cache "%s": %s', responses_file,
+                             error, highlight=1)
+        resolver = Resolver(
+            CrossrefBackend(resolver_url or CROSSREF_URL, mailto=mailto),
+            concurrency=resolve_concurrency, rate=resolve_rate,
+            cache=responses
         )
-        if warnings:
-            for w in warnings:
-                logger.warning(w, highlight=3)
-            print_entry_dict_as_bib(entry, braces=braces)
-            pyperclip.copy(entry['title'].replace('{', '').replace('}', ''))
-            # logger.info('%d/%d done..' % (cnt, len(bibtex.entries)))
-            logger.info('%d/%d done..\n', cnt, len(all_ids))
-            # logger.print('\n\n')
-            if not skip:
-                search_title = urllib.parse.quote(
-                    entry['title'].replace('{', '').replace('}', '')
-                )
-                print('https://scholar.google.com/scholar?q=' + search_title)
-                print('https://ieeexplore.ieee.org/search/searchresult.jsp?'
-                      'newsearch=true&queryText=' + search_title)
-                print('\n[Paper title is copied to clipboard... '
-                      'press enter to continue..]\n')
-                input()
-        elif verbose:
-            logger.info('%d/%d done..' % (cnt, len(all_ids)))
-            logger.info("Looks good...", highlight=2)
-            print_entry_dict_as_bib(entry, logger.print, braces=braces)
-        # entry['volume'] = "{}"
-        # entry['number'] = "{}"
-        if note is not None:
-            entry['note'] = note
-        cnt += 1
+        validated = resolve_entries(validated, resolver)
+    review = None
+    title_index = None
+    found_duplicates = []
+    if not skip:
+        from .review import ReviewQueue
+        review = ReviewQueue(review_file, braces=braces, bib_path=bib_path)
+        # The titles are checked for duplicates as they are validated, to
+        # review the duplicates along with their entries.
+        title_index = TitleIndex() if duplicates == 'index' else None
+
+    def process():
+        nonlocal cnt
+        for entry, warnings, (note, _, _, modified) in validated:
+            ids.append(entry['ID'])
+            if entry['ID'] in inheritance_issues:
+                warnings = inheritance_issues.pop(entry['ID']) + warnings
+            if not stream:
+                filtered_entries.append(entry)
+            if report is not None:
+                for w in warnings:
+                    report.add(entry['ID'], w)
+            if review is not None:
+                title = entry['title']
+                same = title_index.query(title) if title_index is not None \
+                    else [j for j, other in enumerate(titles)
+                          if isclose(title, other)]
+                for j in sorted(same):
+                    found_duplicates.append((cnt, j))
+                    warnings = warnings + [Issue(
+                        'seems to be the same citation as %s' % ids[j],
+                        'duplicate', 'title'
+                    )]
+                if title_index is not None:
+                    title_index.add(cnt, title)
+                if warnings or verbose:
+                    review.put(entry, warnings, cnt, len(all_ids))
+            elif warnings and not quiet:
+                with profiling.phase('report'):
+                    for w in warnings:
+                        logger.warning(w, highlight=3)
+                    print_entry_dict_as_bib(entry, braces=braces)
+                    logger.info('%d/%d done..\n', cnt, len(all_ids))
+            elif verbose:
+                with profiling.phase('report'):
+                    logger.info('%d/%d done..' % (cnt, len(all_ids)))
+                    logger.info("Looks good...", highlight=2)
+                    print_entry_dict_as_bib(entry, logger.print,
+                                            braces=braces)
+            # entry['volume'] = "{}"
+            # entry['number'] = "{}"
+            if note is not None:
+                entry['note'] = note
+            titles.append(entry['title'])
+            if author_index is not None and 'author' in entry:
+                author_index.add(entry['ID'], entry['author'])
+            if minimal_rewrite:
+                # The entries of a duplicated ID are rewritten at their own
+                # spans, counted in the order of the file.
+                number = occurrences.get(entry['ID'], 0)
+                occurrences[entry['ID']] = number + 1
+                if modified:
+                    changed[entry['ID'], number] = entry
+            elif writer is not None:
+                with profiling.phase('write'):
+                    writer.write(entry)
+            cnt += 1
+
+    if review is None:
+        process()
+    else:
+        review.run(process)
     logger.info('%d/%d done..', cnt, len(all_ids))
-    not_seen = set(all_ids) - set(ids)
-
-    bibtex.entries = filtered_entries
-    bibtex.add_missing_from_crossref()
-    for i in range(len(bibtex.entries)):
-        entry_i = bibtex.entries[i]
-        for j in range(i):
-            entry_j = bibtex.entries[j]
-            if isclose(entry_i['title'], entry_j['title']):
+    if library is not None:
+        library.close()
+    if resolver is not None:
+        resolver.close()
+    if cache is not None:
+        logger.info('%d cached entries reused, %d validated', cache.hits,
+                    cache.misses)
+        cache.close()
+    seen = set(ids)
+    not_seen = [key for key in all_ids if key not in seen]
+
+    if not stream:
+        bibtex.entries = filtered_entries
+    with profiling.phase('duplicates'):
+        if review is None:
+            found_duplicates = find_duplicates(titles, method=duplicates)
+        for i, j in found_duplicates:
+            if report is not None:
+                report.add(ids[i], Issue(
+                    'seems to be the same citation as %s' % ids[j],
+                    'duplicate', 'title'
+                ))
+            if not quiet:
                 logger.warning(
-                    '%s and %s seem to be the same citation'
-                    ', with different IDs',
-                    entry_i['ID'], entry_j['ID'], highlight=2
+                    '%s and %s seem to be the same citation, with different '
+                    'IDs', ids[i], ids[j], highlight=2
                 )
-
-    if len(all_ids) != len(bibtex.entries):
+    if author_index is not None:
+        with profiling.phase('authors'):
+            for canonical, forms in author_index.conflicts():
+                if report is not None:
+                    for form, keys in forms.items():
+                        if form == canonical:
+                            continue
+                        for key in keys:
+                            report.add(key, Issue(
+                                'author "%s" is also written "%s"' % (
+                                    form, canonical),
+                                'author-variant', 'author'
+                            ))
+                if not quiet:
+                    logger.warning(
+                        'these are the same author, "%s" is the most '
+                        'complete form: %s', canonical, '; '.join(
+                            '"%s" in %s' % (form, ', '.join(keys))
+                            for form, keys in forms.items()
+                        ), highlight=2
+                    )
+
+    if report is not None:
+        for key in not_seen:
+            report.add(key, Issue('cited but not found in the bib file',
+                                  'not-found'))
+        report.close()
+        logger.info('%d warnings reported in "%s"', report.count,
+                    report_file)
+    if not_seen:
         logger.critical(
             "Some bib-items that are in your paper are not parsed correctly. "
             "The following IDs are not found: %s",
@@ -296,7 +739,15 @@ def validate_bibs(bib_path, bbl_path, out_bib_file=None, force=True,
                     'the number of citations in your paper', len(all_ids),
                     highlight=2)
 
-    if out_bib_file is not None:
-        with open(out_bib_file, 'w') as fl:
+    if out_fl is not None:
+        out_fl.close()
+        logger.info('%s saved...', out_bib_file)
+    elif out_bib_file is not None and minimal_rewrite:
+        with profiling.phase('write'):
+            rewritten = rewrite_bib(bib_path, out_bib_file, spans, changed)
+        logger.info('%s saved, %d changed entries rewritten...', out_bib_file,
+                    rewritten)
+    elif out_bib_file is not None:
+        with open(out_bib_file, 'w') as fl, profiling.phase('write'):
             bibtexparser.dump(bibtex, fl)
             logger.info('%s saved...', out_bib_file)
@@ -0,0 +1,125 @@
+from .report import Issue
+
+
+# The fields that are never inherited from a crossref or xdata entry, and
+# the fields of a crossref'ed entry inherited under another name, as biblatex
+# does: the title of the proceedings is the booktitle of its papers.
+_NOT_INHERITED = frozenset(['ID', 'ENTRYTYPE', 'crossref', 'xdata'])
+_RENAMED = {'title': 'booktitle'}
+
+
+def split_xdata(value):
+    """The keys of an xdata field, e.g. "acm, nyc" -> ['acm', 'nyc']."""
+    return [key.strip() for key in value.split(',') if key.strip()]
+
+
+def inherit(entry, fields):
+    """Add the inherited `fields` that the entry does not have."""
+    for name, value in fields.items():
+        if name not in entry:
+            entry[name] = value
+
+
+class CrossrefGraph:
+    """The crossref and biblatex xdata dependencies of the entries of a bib
+    file, to validate an entry along with the fields it inherits.
+
+    Only the entries referred to by another entry are kept, the `parents`.
+    The fields of each parent, with the fields it inherits itself, are
+    resolved once, however many entries refer to it. The references to
+    missing entries, and the cycles, are `Issue`s of the entries whose
+    inheritance goes through them."""
+
+    def __init__(self):
+        self.references = {}
+        self.parents = {}
+        self._resolved = {}
+
+    @classmethod
+    def from_entries(cls, entries):
+        """The graph of parsed entries, where the parents are found. The
+        parents are copied, they are not changed by their validation."""
+        graph = cls()
+        for entry in entries:
+            graph.add_references(entry['ID'], entry.get('crossref'),
+                                 split_xdata(entry.get('xdata', '')))
+        needed = graph.needed()
+        for entry in entries:
+            if entry['ID'] in needed:
+                graph.add_parent(dict(entry))
+        return graph
+
+    def add_references(self, key, crossref=None, xdata=()):
+        if crossref or xdata:
+            self.references.setdefault(key, (crossref, tuple(xdata)))
+
+    def needed(self):
+        """The IDs of the parents, whose entries are to be added."""
+        needed = set()
+        for crossref, xdata in self.references.values():
+            if crossref:
+                needed.add(crossref)
+            needed.update(xdata)
+        return needed
+
+    def add_parent(self, entry):
+        self.parents.setdefault(entry['ID'], entry)
+
+    def discard(self, key):
+        """Forget the references and the fields of the entry `key`, changed
+        or removed, and the fields resolved through it."""
+        self.references.pop(key, None)
+        self.parents.pop(key, None)
+        self._resolved.clear()
+
+    def __contains__(self, key):
+        return key in self.references
+
+    def inherited(self, key):
+        """The fields that the entry `key` inherits, by name, and the
+        issues of its inheritance."""
+        return self._inherited(key, [key])
+
+    def _inherited(self, key, path):
+        crossref, xdata = self.references.get(key, (None, ()))
+        fields = {}
+        issues = []
+        # The xdata entries come first, in their order, then the crossref'ed
+        # entry, for the fields that are still missing.
+        for parent, field in [(name, 'xdata') for name in xdata] + \
+                ([(crossref, 'crossref')] if crossref else []):
+            if parent in path:
+                issues.append(Issue('circular %s: %s' % (
+                    field, ' -> '.join(path[path.index(parent):] + [parent])
+                ), 'crossref', field))
+                continue
+            resolved = self._resolve(parent, path)
+            if resolved is None:
+                issues.append(Issue('%s "%s" of %s is not in the bib file' % (
+                    field, parent, key
+                ), 'crossref', field))
+                continue
+            parent_fields, parent_issues = resolved
+            issues.extend(parent_issues)
+            for name, value in parent_fields.items():
+                if field == 'crossref' and name in _RENAMED:
+                    if _RENAMED[name] in parent_fields:
+                        continue
+                    name = _RENAMED[name]
+                if name not in fields and name not in _NOT_INHERITED:
+                    fields[name] = value
+        return fields, issues
+
+    def _resolve(self, key, path):
+        # The fields of a parent, with its inherited ones, and the issues of
+        # its inheritance, None for a missing parent.
+        if key in self._resolved:
+            return self._resolved[key]
+        entry = self.parents.get(key)
+        if entry is None:
+            return None
+        inherited, issues = self._inherited(key, path + [key])
+        fields = dict(inherited)
+        fields.update(entry)
+        resolved = self._resolved[key] = (fields, issues)
+        return resolved
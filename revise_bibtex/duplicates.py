@@ -0,0 +1,210 @@
+from collections import defaultdict
+import math
+
+from .utils import isclose
+
+
+# Candidate generation for `isclose` based on q-gram prefix filtering.
+#
+# If lcs(a, b) > t * max(|a|, |b|), then a turns into b with fewer than
+# 2 * (1 - t) * |a| single-character insertions/deletions, and each of those
+# breaks at most q of the q-grams of a.  Hence a and b share at least
+# T(a) = (|a| - q + 1) - q * D(a) q-grams (counted with multiplicity), and by
+# the prefix-filtering argument they share one of the first |A| - T(a) + 1
+# q-grams of a, taken in any fixed global order.  Only those prefixes are
+# indexed, rarest q-grams first, so every pair reported by the pairwise scan
+# is still generated as a candidate.
+#
+# The candidates are then filtered by a bitmask of their q-grams, hashed to
+# _MASK_BITS bits: the bits of a that are not set for b are q-grams of a
+# that b does not have, more than q * D(a) of them and b is not close to a,
+# which is much cheaper to tell than the longest common subsequence.
+#
+# The postings are also split by the length of the titles: the common
+# subsequence is not longer than the shorter title, so only the titles
+# within a factor t of the length of a are candidates.
+
+_MASK_BITS = 512
+
+try:
+    _popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+    def _popcount(number):
+        return bin(number).count('1')
+
+
+def _tokens(string, q):
+    # The q-grams of the string, a repeated one is numbered from its second
+    # occurrence, e.g. "abc1", which is never another q-gram.
+    grams = [string[i:i + q] for i in range(len(string) - q + 1)]
+    if len(set(grams)) == len(grams):
+        return grams
+    seen = {}
+    tokens = []
+    for gram in grams:
+        occurrence = seen.get(gram, 0)
+        seen[gram] = occurrence + 1
+        tokens.append('%s%d' % (gram, occurrence) if occurrence else gram)
+    return tokens
+
+
+class _Frequencies(dict):
+    # The number of titles of each token, 0 for the unknown ones, without
+    # adding them.
+    def __missing__(self, token):
+        return 0
+
+
+def _max_breaks(length, threshold):
+    return max(math.ceil(2 * (1 - threshold) * length) - 1, 0)
+
+
+def _mask(tokens):
+    mask = 0
+    for token in tokens:
+        mask |= 1 << (hash(token) % _MASK_BITS)
+    return mask
+
+
+class TitleIndex:
+    def __init__(self, threshold=0.95, q=3, frequencies=None):
+        self.threshold = threshold
+        self.q = q
+        self.frequencies = frequencies \
+            if isinstance(frequencies, _Frequencies) \
+            else _Frequencies(frequencies or {})
+        self._titles = {}
+        self._prefixes = {}
+        self._masks = {}
+        self._postings = defaultdict(dict)
+        self._loose = set()
+        # The prefix of the last title, queried and then added.
+        self._last = None, None, None
+
+    def __len__(self):
+        return len(self._titles)
+
+    def __contains__(self, item):
+        return item in self._titles
+
+    def _prefix(self, title):
+        # The prefix of the q-grams of the title and their mask, or
+        # (None, None) if it has too few of them to be filtered.
+        last = self._last
+        if last[0] == title:
+            return last[1:]
+        lowered = title.lower()
+        if len(lowered) != len(title):
+            return None, None
+        tokens = _tokens(lowered, self.q)
+        overlap = len(tokens) - self.q * _max_breaks(len(title),
+                                                     self.threshold)
+        if overlap < 1:
+            return None, None
+        mask = _mask(tokens)
+        # The rarest first, then in alphabetical order, by two stable sorts.
+        tokens.sort()
+        tokens.sort(key=self.frequencies.__getitem__)
+        prefix = tokens[:len(tokens) - overlap + 1]
+        self._last = title, prefix, mask
+        return prefix, mask
+
+    def add(self, item, title):
+        if item in self._titles:
+            self.remove(item)
+        prefix, mask = self._prefix(title)
+        self._titles[item] = title
+        self._prefixes[item] = prefix
+        if prefix is None:
+            self._loose.add(item)
+        else:
+            self._masks[item] = mask
+            length = len(title)
+            for token in prefix:
+                self._postings[token].setdefault(length, set()).add(item)
+
+    def remove(self, item):
+        prefix = self._prefixes.pop(item)
+        if prefix is None:
+            del self._titles[item]
+            self._loose.discard(item)
+            return
+        del self._masks[item]
+        length = len(self._titles.pop(item))
+        for token in prefix:
+            by_length = self._postings[token]
+            by_length[length].discard(item)
+            if not by_length[length]:
+                del by_length[length]
+                if not by_length:
+                    del self._postings[token]
+
+    def candidates(self, title, prefix=None):
+        if prefix is None:
+            prefix = self._prefix(title)[0]
+        if prefix is None:
+            return set(self._titles)
+        found = set(self._loose)
+        # A slightly wider range of lengths, query() checks them exactly.
+        size = len(title)
+        lengths = range(int(self.threshold * size),
+                        int(size / self.threshold) + 2)
+        postings = self._postings
+        for token in prefix:
+            by_length = postings.get(token)
+            if by_length:
+                for length in lengths:
+                    posting = by_length.get(length)
+                    if posting:
+                        found.update(posting)
+        return found
+
+    def query(self, title):
+        matches = []
+        size = len(title)
+        prefix, mask = self._prefix(title)
+        breaks = self.q * _max_breaks(size, self.threshold)
+        titles = self._titles
+        masks = self._masks
+        threshold = self.threshold
+        low = threshold * size
+        for item in self.candidates(title, prefix):
+            other = titles[item]
+            other_mask = masks.get(item)
+            if other_mask is not None:
+                length = len(other)
+                if length <= low or size <= threshold * length:
+                    continue
+                if mask is not None and \
+                        _popcount(mask & ~other_mask) > breaks:
+                    continue
+            if isclose(title, other, threshold):
+                matches.append(item)
+        return matches
+
+
+def token_frequencies(titles, q=3):
+    frequencies = _Frequencies()
+    for title in titles:
+        for token in _tokens(title.lower(), q):
+            frequencies[token] += 1
+    return frequencies
+
+
+def find_duplicates(titles, threshold=0.95, method='index'):
+    """Yield (i, j) with j < i for every pair of titles that `isclose`,
+    in the same order as a pairwise scan."""
+    if method == 'pairwise':
+        for i in range(len(titles)):
+            for j in range(i):
+                if isclose(titles[i], titles[j], threshold):
+                    yield i, j
+        return
+    if method != 'index':
+        raise ValueError('Unknown duplicates method "%s"' % method)
+
+    index = TitleIndex(threshold, frequencies=token_frequencies(titles))
+    for i, title in enumerate(titles):
+        for j in sorted(index.query(title)):
+            yield i, j
+        index.add(i, title)
@@ -0,0 +1,135 @@
+from collections.abc import MutableMapping
+import sys
+
+
+# The fields whose values repeat across a bibliography, the same venues,
+# publishers and addresses are cited by many entries, their values are
+# interned so that the entries share them.
+SHARED_FIELDS = frozenset([
+    'ENTRYTYPE', 'address', 'booktitle', 'institution', 'journal', 'month',
+    'organization', 'publisher', 'school', 'series', 'year',
+])
+
+
+class _Layout:
+    """The field names of entries, in order, and their positions. All the
+    entries with the same fields share one layout."""
+
+    __slots__ = ('names', 'index', 'children', 'parents', 'shared')
+
+    def __init__(self, names):
+        self.names = names
+        self.shared = False
+        self.index = {name: i for i, name in enumerate(names)}
+        self.children = {}
+        self.parents = {}
+
+    def add(self, name):
+        child = self.children.get(name)
+        if child is None:
+            child = _layout(self.names + (sys.intern(name),))
+            if child.shared:
+                self.children[name] = child
+        return child
+
+    def remove(self, name):
+        parent = self.parents.get(name)
+        if parent is None:
+            parent = _layout(
+                tuple(other for other in self.names if other != name)
+            )
+            if parent.shared:
+                self.parents[name] = parent
+        return parent
+
+
+# The shared layouts, at most MAX_LAYOUTS of them, the entries with other
+# fields get a layout of their own, e.g. when fields are added one by one
+# in many different orders.
+MAX_LAYOUTS = 10000
+_LAYOUTS = {}
+
+
+def _layout(names):
+    layout = _LAYOUTS.get(names)
+    if layout is None:
+        layout = _Layout(names)
+        if len(_LAYOUTS) < MAX_LAYOUTS:
+            layout = _LAYOUTS.setdefault(names, layout)
+            layout.shared = True
+    return layout
+
+
+def _share(name, value):
+    if name in SHARED_FIELDS and type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+class Entry(MutableMapping):
+    """A bib entry, which behaves as the dict of its fields, keeping their
+    order, but only stores a list of values next to a layout shared with
+    the entries having the same fields. The field names and the values of
+    `SHARED_FIELDS` are interned.
+
+    Use it as the customization of a bibtexparser parser, to hold large
+    bibliographies in memory."""
+
+    __slots__ = ('_layout', '_values')
+
+    def __init__(self, fields=(), **kwargs):
+        if isinstance(fields, dict) and not kwargs:
+            self._layout = _layout(tuple(map(sys.intern, fields)))
+            self._values = [_share(name, value)
+                            for name, value in fields.items()]
+        else:
+            self._layout = _EMPTY
+            self._values = []
+            self.update(fields, **kwargs)
+
+    def __getitem__(self, name):
+        return self._values[self._layout.index[name]]
+
+    def get(self, name, default=None):
+        i = self._layout.index.get(name)
+        return default if i is None else self._values[i]
+
+    def __setitem__(self, name, value):
+        value = _share(name, value)
+        i = self._layout.index.get(name)
+        if i is None:
+            self._layout = self._layout.add(name)
+            self._values.append(value)
+        else:
+            self._values[i] = value
+
+    def __delitem__(self, name):
+        i = self._layout.index[name]
+        del self._values[i]
+        self._layout = self._layout.remove(name)
+
+    def __contains__(self, name):
+        return name in self._layout.index
+
+    def __iter__(self):
+        return iter(self._layout.names)
+
+    def keys(self):
+        # The layouts never change, this view is not updated by the changes
+        # of the entry, unlike the one of a dict.
+        return self._layout.index.keys()
+
+    def __len__(self):
+        return len(self._values)
+
+    def copy(self):
+        return Entry(self)
+
+    def __reduce__(self):
+        return Entry, (dict(zip(self._layout.names, self._values)),)
+
+    def __repr__(self):
+        return 'Entry(%r)' % dict(zip(self._layout.names, self._values))
+
+
+_EMPTY = _layout(())
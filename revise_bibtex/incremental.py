@@ -0,0 +1,306 @@
+from contextlib import ExitStack
+import glob
+import os
+import re
+import subprocess
+import tempfile
+
+from .cache import default_cache_path
+from .core import validate_entry, validate_title
+from .crossref import CrossrefGraph, inherit, split_xdata
+from .duplicates import find_duplicates
+from .library import Library, build_index, normalize_title
+from .logger import logger
+from .report import Issue, Report
+from .stream import (
+    _VALUE, block_key, is_entry_type, iter_blocks, make_parser, parse_block
+)
+from .utils import isclose
+
+
+_HUNK = re.compile(rb'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@', re.M)
+_STRING_BLOCK = re.compile(rb'@[ \t\r\n]*string[ \t\r\n]*[{(]', re.IGNORECASE)
+_TITLE = re.compile(rb'[ \t\r\n,]title[ \t\r\n]*=[ \t\r\n]*(' + _VALUE + rb')',
+                    re.IGNORECASE)
+# The indexes of the other entries of a few previous revisions are kept.
+_KEPT_INDEXES = 8
+# The index compares the normalized titles, without their punctuation and
+# accents, which may be less close than the titles themselves, its
+# candidates are then compared as `find_duplicates` does.
+_INDEX_THRESHOLD = 0.9
+
+
+def _git(args, cwd):
+    try:
+        return subprocess.run(
+            ['git'] + args, cwd=cwd, check=True, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        ).stdout
+    except FileNotFoundError:
+        raise ValueError('git is not installed')
+    except subprocess.CalledProcessError as error:
+        raise ValueError('git %s: %s' % (args[0], error.stderr.decode(
+            'utf-8', 'replace').strip()))
+
+
+def _line_offsets(data, lines):
+    # The byte offsets of the starts of the given lines, counted from 1,
+    # skipping the chunks of the file before them at once.
+    offsets = {}
+    pos = 0
+    line = 1
+    for target in sorted(set(lines)):
+        while line < target:
+            chunk = data.count(b'\n', pos, pos + (1 << 16))
+            if chunk and line + chunk < target:
+                line += chunk
+                pos += 1 << 16
+                continue
+            found = data.find(b'\n', pos)
+            if found < 0:
+                pos = len(data)
+                break
+            pos = found + 1
+            line += 1
+        offsets[target] = pos
+    return offsets
+
+
+def _touched_blocks(data, spans, parser):
+    # The (start, end, body_start) of the entries overlapping the (start,
+    # end) byte spans, an empty span touches the entry around it. The blocks
+    # are scanned from the last line starting with "@" before each span.
+    blocks = {}
+    skipped = set()
+    for first, last in spans:
+        pos = data.rfind(b'\n@', 0, first + 1) + 1
+        for block_type, start, end, body in iter_blocks(data, pos):
+            if start >= last:
+                break
+            if end <= first:
+                continue
+            if is_entry_type(block_type, parser):
+                blocks[start] = (start, end, body)
+            elif block_type in ('string', 'xdata'):
+                skipped.add(block_type)
+    for block_type in sorted(skipped):
+        logger.warning('a @%s block changed, the entries using it are not '
+                       'validated again', block_type)
+    return [blocks[start] for start in sorted(blocks)]
+
+
+def _hunk_spans(diff, old, new):
+    # The changed (start, end) byte spans of the old and new versions. A
+    # hunk of no line, "-a,0" or "+c,0", is an empty span after line a or c.
+    hunks = [[int(number) if number is not None else 1
+              for number in match.groups()]
+             for match in _HUNK.finditer(diff)]
+    spans = []
+    for data, side in ((old, 0), (new, 2)):
+        lines = [(line + (count == 0), line + count + (count == 0))
+                 for line, count in (hunk[side:side + 2] for hunk in hunks)]
+        offsets = _line_offsets(data, [line for pair in lines
+                                       for line in pair])
+        spans.append([(offsets[first], offsets[last])
+                      for first, last in lines])
+    return spans
+
+
+def _find_entry(data, key, parser):
+    match = re.search(rb'@[ \t\r\n]*[A-Za-z]+[ \t\r\n]*[{(][ \t\r\n]*' +
+                      re.escape(key.encode('utf-8')) + rb'[ \t\r\n]*,', data)
+    if match is None:
+        return []
+    for _, start, end, _ in iter_blocks(data, match.start()):
+        ignore = parser.ignore_nonstandard_types
+        parser.ignore_nonstandard_types = False
+        try:
+            return parse_block(parser, data[start:end].decode('utf-8'))
+        finally:
+            parser.ignore_nonstandard_types = ignore
+    return []
+
+
+def _validate(data, blocks, options):
+    # {ID: (entry, warnings)} of the entry blocks of a version of the file,
+    # with its @string definitions and the fields they inherit.
+    parser = make_parser()
+    for match in _STRING_BLOCK.finditer(data):
+        for _, start, end, _ in iter_blocks(data, match.start()):
+            parse_block(parser, data[start:end].decode('utf-8'))
+            break
+    entries = []
+    for start, end, _ in blocks:
+        entries.extend(parse_block(parser, data[start:end].decode('utf-8')))
+    graph = CrossrefGraph()
+    found = set()
+    pending = entries
+    while pending:
+        for entry in pending:
+            graph.add_references(entry['ID'], entry.get('crossref'),
+                                 split_xdata(entry.get('xdata', '')))
+        pending = []
+        for key in graph.needed() - found:
+            found.add(key)
+            for parent in _find_entry(data, key, parser):
+                graph.add_parent(parent)
+                pending.append(parent)
+    results = {}
+    for entry in entries:
+        issues = []
+        if entry['ID'] in graph:
+            fields, issues = graph.inherited(entry['ID'])
+            inherit(entry, fields)
+        results[entry['ID']] = (entry, issues + validate_entry(entry,
+                                                               **options))
+    return results
+
+
+def _titles(data, parser):
+    # The records of the entries of a version of the file, their ID and
+    # title, which are not parsed.
+    for block_type, start, end, body in iter_blocks(data):
+        if not is_entry_type(block_type, parser):
+            continue
+        title = _TITLE.search(data, body, end)
+        if title is not None:
+            yield {'ID': block_key(data, body),
+                   'title': title.group(1).decode('utf-8')}
+
+
+def _validated_title(record, options):
+    # The title of a record as the validation writes it, which is what the
+    # duplicates of a full run are found with.
+    title = record['title']
+    if title[:1] in ('{', '"'):
+        title = title[1:-1]
+    entry = {'title': title}
+    validate_title(entry, single_brace=options['single_brace'],
+                   protect_words=options['protect_words'])
+    return entry['title']
+
+
+def _index(old, blob, directory):
+    # The index of the titles of the old version, built once by version of
+    # the file in `directory`.
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, '%s.idx' % blob)
+    if not os.path.isfile(path):
+        logger.info('indexing the other entries...')
+        build_index(_titles(old, make_parser()), path)
+        indexes = sorted(glob.glob(os.path.join(directory, '*.idx')),
+                         key=os.path.getmtime)
+        for other in indexes[:-_KEPT_INDEXES]:
+            os.remove(other)
+    return Library(path, threshold=_INDEX_THRESHOLD)
+
+
+def lint_since(bib_path, rev, force=True, force_doi=False, single_brace=False,
+               protect_words=False, report_file=None, report_format='jsonl',
+               cache_file=None):
+    """Validate only the entries of a bib file added or changed since the
+    git revision `rev`, and look for their duplicates among all the entries.
+
+    The old version is read with git, the entries overlapping the lines of
+    `git diff` are validated in both versions. The warnings that the old
+    version of an entry did not have are new, as the duplicates of an entry
+    whose title changed, which are the same as those of a full run. The
+    index of the titles of the other entries is kept by version of the file
+    in a "since" directory next to `cache_file`, or to the default cache.
+    Returns the number of new warnings."""
+    cwd = os.path.dirname(os.path.abspath(bib_path))
+    name = './' + os.path.basename(bib_path)
+    try:
+        _git(['rev-parse', '--verify', '--quiet', rev + '^{commit}'], cwd)
+    except ValueError:
+        raise ValueError('"%s" is not a git revision of "%s"' % (
+            rev, bib_path))
+    with open(bib_path, 'rb') as fl:
+        new = fl.read()
+    parser = make_parser()
+    try:
+        blob = _git(['rev-parse', '--verify', '--quiet', '%s:%s' % (
+            rev, name)], cwd).decode('ascii').strip()
+    except ValueError:
+        blob = None
+    if blob is None:
+        old = b''
+        old_spans, new_spans = [], [(0, len(new))]
+    else:
+        old = _git(['cat-file', 'blob', blob], cwd)
+        diff = _git(['diff', '-U0', '--no-color', '--no-ext-diff',
+                     '--no-textconv', rev, '--', name], cwd)
+        old_spans, new_spans = _hunk_spans(diff, old, new)
+
+    options = dict(force=force, force_doi=force_doi,
+                   single_brace=single_brace, protect_words=protect_words)
+    old_blocks = _touched_blocks(old, old_spans, parser)
+    new_blocks = _touched_blocks(new, new_spans, parser)
+    before = _validate(old, old_blocks, options)
+    after = _validate(new, new_blocks, options)
+    old_keys = set(block_key(old, body) for _, _, body in old_blocks)
+
+    warnings = {key: list(entry_warnings)
+                for key, (_, entry_warnings) in after.items()}
+    new_warnings = {key: [w for w in entry_warnings
+                          if key not in before or
+                          str(w) not in map(str, before[key][1])]
+                    for key, entry_warnings in warnings.items()}
+    # The duplicates among the changed entries, then with the other ones,
+    # by their validated titles, as `validate_bibs` finds them.
+    keys = list(after)
+    titles = [after[key][0].get('title', '') for key in keys]
+    retitled = set(key for key, title in zip(keys, titles)
+                   if key not in before or
+                   title != before[key][0].get('title', ''))
+    duplicates = [(keys[i], keys[j]) for i, j in find_duplicates(titles)
+                  if titles[i] and titles[j]]
+    if old and keys:
+        directory = os.path.join(os.path.dirname(os.path.abspath(
+            cache_file or default_cache_path())), 'since')
+        with ExitStack() as stack:
+            try:
+                library = stack.enter_context(_index(old, blob, directory))
+            except OSError as error:
+                logger.warning('cannot keep the index in "%s": %s',
+                               directory, error)
+                library = stack.enter_context(_index(
+                    old, blob,
+                    stack.enter_context(tempfile.TemporaryDirectory())))
+            for key, title in zip(keys, titles):
+                if not title:
+                    continue
+                for number in sorted(library.candidates(
+                        normalize_title(title))):
+                    record = library.record(number)
+                    other = record['ID']
+                    if other not in old_keys and other not in after and \
+                            isclose(title, _validated_title(record, options)):
+                        duplicates.append((key, other))
+    for key, other in duplicates:
+        issue = Issue('seems to be the same citation as %s' % other,
+                      'duplicate', 'title')
+        warnings[key].append(issue)
+        if key in retitled or other in retitled:
+            new_warnings[key].append(issue)
+
+    report = None
+    if report_file is not None:
+        report = Report(report_file, report_format, bib_path=bib_path)
+    count = 0
+    for key in keys:
+        for w in warnings[key]:
+            if w in new_warnings[key]:
+                count += 1
+                logger.warning('%s: %s', key, w, highlight=3)
+                if report is not None:
+                    report.add(key, w)
+            else:
+                logger.info('%s: %s (already there)', key, w)
+    if report is not None:
+        report.close()
+    removed = old_keys.difference(after)
+    logger.info('%d entries added or changed, %d removed since %s, %d new '
+                'warnings', len(after), len(removed), rev, count,
+                highlight=2 if not count else 1)
+    return count
@@ -0,0 +1,150 @@
+import re
+import unicodedata
+
+
+# LaTeX accent macros of the Unicode combining characters.
+ACCENTS = {
+    '\u0300': '`',
+    '\u0301': "'",
+    '\u0302': '^',
+    '\u0303': '~',
+    '\u0304': '=',
+    '\u0306': 'u',
+    '\u0307': '.',
+    '\u0308': '"',
+    '\u030a': 'r',
+    '\u030b': 'H',
+    '\u030c': 'v',
+    '\u0323': 'd',
+    '\u0327': 'c',
+    '\u0328': 'k',
+    '\u0331': 'b',
+}
+TIE = '\u0361'
+# The accents under a letter, the others take the dot of an i or a j, which
+# are written dotless, e.g. {\'\i}.
+BELOW = frozenset(['\u0323', '\u0327', '\u0328', '\u0331'])
+
+# Letters without a decomposition, and their LaTeX macros.
+SPECIAL_LETTERS = {
+    'ø': 'o',
+    'Ø': 'O',
+    'ł': 'l',
+    'Ł': 'L',
+    'ı': 'i',
+    'ȷ': 'j',
+    'ß': 'ss',
+    'æ': 'ae',
+    'Æ': 'AE',
+    'œ': 'oe',
+    'Œ': 'OE',
+}
+
+LATIN_RANGES = [(0x00C0, 0x0250), (0x1E00, 0x1F00)]
+
+
+def _accented(base, marks):
+    text = base
+    if base in ('i', 'j') and marks[0] not in BELOW:
+        text = '\\' + base
+    for number, mark in enumerate(marks):
+        macro = ACCENTS[mark]
+        if macro.isalpha() or number:
+            text = '\\%s{%s}' % (macro, text)
+        else:
+            text = '\\%s%s' % (macro, text)
+    return '{%s}' % text
+
+
+def _build_table():
+    # A list indexed by code point is looked up faster by str.translate than
+    # a dict, code points past its end are left as they are.
+    table = list(range(LATIN_RANGES[-1][1]))
+    for low, high in LATIN_RANGES:
+        for code in range(low, high):
+            char = chr(code)
+            if char in SPECIAL_LETTERS:
+                table[code] = '{\\%s}' % SPECIAL_LETTERS[char]
+                continue
+            decomposed = unicodedata.normalize('NFD', char)
+            base, marks = decomposed[0], decomposed[1:]
+            if marks and base.isascii() and base.isalpha() and \
+                    all(mark in ACCENTS for mark in marks):
+                table[code] = _accented(base, marks)
+    return table
+
+
+_ENCODE_TABLE = _build_table()
+_TIED = re.compile('(.)%s(.)' % TIE)
+_COMBINING = re.compile('([^\\W\\d_])([%s]+)' % ''.join(ACCENTS))
+
+_ACCENT_MARKS = {macro: mark for mark, macro in ACCENTS.items()}
+_DECODE = re.compile(r'''
+    (\{)?\\(?:
+        (?P<accent>[`'^~="u.vHrdckbt])
+        (?:\s*\{\s*(?P<braced>\\[ij](?![A-Za-z])|[^\W\d_]{1,2})\s*\}
+          |(?<=[`'^~=".])\s*(?P<bare>\\[ij](?![A-Za-z])|[^\W\d_])
+          |\s+(?P<spaced>[^\W\d_])
+          |(?P<decoded>(?![A-Za-z])[^\W\d_]))
+      |(?P<letter>oe|OE|ae|AE|aa|AA|ss|o|O|l|L|i|j)(?![A-Za-z])(?:\{\})?
+    )(?(1)\})
+''', re.VERBOSE)
+_SPECIAL_CHARS = {macro: char for char, macro in SPECIAL_LETTERS.items()}
+_SPECIAL_CHARS.update({'aa': 'å', 'AA': 'Å'})
+
+
+def encode_latex(text):
+    """Replace the accented Latin letters of `text` by LaTeX macros, e.g.
+    "Müller" by "M{\\"u}ller", in a single pass over the text."""
+    if text.isascii():
+        return text
+    text = unicodedata.normalize('NFC', text).translate(_ENCODE_TABLE)
+    if not text.isascii():
+        # Accents without a precomposed character.
+        text = _TIED.sub(r'\\t{\1\2}', text)
+        text = _COMBINING.sub(
+            lambda match: _accented(match.group(1), match.group(2)), text
+        )
+    return text
+
+
+def _decode_match(match):
+    letter = match.group('letter')
+    if letter is not None:
+        return _SPECIAL_CHARS[letter]
+    base = match.group('braced') or match.group('bare') or \
+        match.group('spaced') or match.group('decoded')
+    if base in ('\\i', '\\j'):
+        base = base[1]
+    if match.group('accent') == 't':
+        return base[0] + TIE + base[1:]
+    if len(base) > 1:
+        return match.group(0)
+    return unicodedata.normalize(
+        'NFC', base + _ACCENT_MARKS[match.group('accent')]
+    )
+
+
+def decode_latex(text):
+    """Inverse of `encode_latex`, it also reads the usual variants of the
+    accent macros, e.g. \\"u, \\"{u} and {\\"u}, and returns NFC text."""
+    if '\\' not in text:
+        return text
+    while True:
+        decoded = _DECODE.sub(_decode_match, text)
+        if decoded == text:
+            break
+        text = decoded
+    return unicodedata.normalize('NFC', text)
+
+
+_STRIP_TABLE = str.maketrans(SPECIAL_LETTERS)
+
+
+def strip_accents(text):
+    """The text without its accents, e.g. "Gödel" -> "Godel", the special
+    letters are replaced by their macro name, e.g. "ß" -> "ss"."""
+    if text.isascii():
+        return text
+    return ''.join(char for char in unicodedata.normalize('NFKD', text)
+                   if not unicodedata.combining(char)).translate(_STRIP_TABLE)
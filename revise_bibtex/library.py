@@ -0,0 +1,416 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+import gzip
+import html.entities
+from itertools import accumulate
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+import xml.etree.ElementTree as ElementTree
+
+from .latex import decode_latex, encode_latex, strip_accents
+from .utils import isclose
+
+
+# An index file is a header followed by sections of native-endian arrays:
+# the offsets of the postings of each trigram, the postings, i.e. the
+# sorted numbers of the records whose titles have the trigram, the first
+# number of each title length, the records being numbered by the lengths of
+# their titles, the offsets and the JSON of the records, and the offsets and
+# the text of the normalized titles. Only the pages read by a query are
+# loaded, through a memory map.
+MAGIC = b'RBLIBRY1'
+_HEADER = struct.Struct('<8s8sQQ8Q')
+_Q = 3
+# The normalized titles only have spaces, lower-cased ASCII letters and
+# digits, every other letter is one more symbol.
+_ALPHABET = ' abcdefghijklmnopqrstuvwxyz0123456789'
+_CODES = {char: i for i, char in enumerate(_ALPHABET)}
+_BASE = len(_ALPHABET) + 1
+GRAMS = _BASE ** _Q
+# The cost of verifying a candidate title, in counted postings.
+_VERIFY = 128
+
+_WORD = re.compile(r'[^\W_]+')
+_FIELDS = ('ENTRYTYPE', 'title', 'author', 'year', 'journal', 'booktitle',
+           'publisher', 'address', 'pages', 'volume', 'number', 'doi')
+
+
+def normalize_title(title):
+    """The lower-cased words of a title, without accents, braces and
+    punctuation, e.g. "{BERT}: Pre-training" -> "bert pre training"."""
+    title = decode_latex(title).replace('{', '').replace('}', '')
+    return ' '.join(_WORD.findall(strip_accents(title).lower()))
+
+
+def _grams(title):
+    codes = [_CODES.get(char, _BASE - 1) for char in title]
+    return {(codes[i] * _BASE + codes[i + 1]) * _BASE + codes[i + 2]
+            for i in range(len(codes) - _Q + 1)}
+
+
+def is_preprint(fields):
+    """Whether the fields are of an arXiv preprint, as `validate_arxiv`
+    leaves them, or as DBLP lists them (in CoRR)."""
+    if fields.get('publisher', '').lower() == 'arxiv':
+        return True
+    return any(fields.get(key, '').lower().startswith(('arxiv', 'corr'))
+               for key in ('journal', 'booktitle'))
+
+
+def _bib_fields(record):
+    fields = {}
+    for key, value in record.items():
+        key = 'ENTRYTYPE' if key.lower() in ('type', 'entrytype') else \
+            key.lower()
+        if key == 'authors':
+            key = 'author'
+        if isinstance(value, list):
+            value = ' and '.join(str(item) for item in value) \
+                if key == 'author' else (str(value[0]) if value else '')
+        if key in _FIELDS and value:
+            fields[key] = str(value).strip()
+    if 'pages' in fields:
+        fields['pages'] = re.sub(r'\s*-+\s*', '--', fields['pages'])
+    if fields.get('doi', '').startswith('https://doi.org/'):
+        fields['doi'] = fields['doi'][len('https://doi.org/'):]
+    return fields
+
+
+class _DblpTarget:
+    # Collects the records of a DBLP XML dump, the children of its root,
+    # fed to an XMLParser chunk by chunk.
+    def __init__(self):
+        self.records = []
+        self._depth = 0
+        self._record = None
+        self._field = None
+        self._text = []
+
+    def start(self, tag, attrib):
+        self._depth += 1
+        if self._depth == 2:
+            self._record = {'ENTRYTYPE': tag}
+        elif self._depth == 3:
+            self._field = tag
+            self._text = []
+
+    def data(self, data):
+        if self._field is not None:
+            self._text.append(data)
+
+    def end(self, tag):
+        if self._depth == 3 and self._record is not None:
+            text = ''.join(self._text).strip()
+            if self._field == 'author':
+                self._record.setdefault('author', []).append(text)
+            elif self._field == 'ee':
+                if 'doi.org/' in text and 'doi' not in self._record:
+                    self._record['doi'] = text.split('doi.org/', 1)[1]
+            else:
+                self._record.setdefault(self._field, text)
+            self._field = None
+        elif self._depth == 2:
+            if self._record.get('ENTRYTYPE') != 'www':  # home pages
+                self.records.append(self._record)
+            self._record = None
+        self._depth -= 1
+
+    def close(self):
+        pass
+
+
+def _read_dblp(fl):
+    target = _DblpTarget()
+    parser = ElementTree.XMLParser(target=target)
+    # The entities of the DBLP DTD, which is not loaded.
+    parser.entity.update((name, chr(code)) for name, code in
+                         html.entities.name2codepoint.items())
+    while True:
+        chunk = fl.read(1 << 20)
+        if not chunk:
+            break
+        parser.feed(chunk)
+        yield from target.records
+        target.records.clear()
+    parser.close()
+    yield from target.records
+
+
+def read_dump(path):
+    """Yield the bib fields of the records of a dump, a DBLP XML file or a
+    file of JSON records, one per line, both possibly gzipped."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as fl:
+        if '.xml' in os.path.basename(path):
+            records = _read_dblp(fl)
+        else:
+            records = (json.loads(line) for line in fl if line.strip())
+        for record in records:
+            yield _bib_fields(record)
+
+
+def _align(fl):
+    fl.write(b'\0' * (-fl.tell() % 8))
+    return fl.tell()
+
+
+def _write_ordered(fl, source, offsets, order):
+    # The offsets of the items of `source` in the given order, then the
+    # items, returns where they start.
+    array('Q', accumulate((offsets[i + 1] - offsets[i] for i in order),
+                          initial=0)).tofile(fl)
+    start = _align(fl)
+    if offsets[-1]:
+        data = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for i in order:
+                fl.write(data[offsets[i]:offsets[i + 1]])
+        finally:
+            data.close()
+    return start
+
+
+def build_library(dump_path, index_path):
+    """Build the index of a dump, see `read_dump`. Returns the number of
+    records."""
+    return build_index(read_dump(dump_path), index_path)
+
+
+def build_index(references, index_path):
+    """Build the index of references, dicts of bib fields with a title, in
+    two passes: the first one writes the records and counts the trigrams, the
+    second one fills the postings. Returns the number of records."""
+    directory = os.path.dirname(os.path.abspath(index_path))
+    counts = array('Q', bytes(8 * GRAMS))
+    record_offsets = array('Q', [0])
+    title_offsets = array('Q', [0])
+    lengths = array('I')
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix='.%s.' % os.path.basename(index_path)
+    )
+    try:
+        with tempfile.TemporaryFile(dir=directory) as records, \
+                tempfile.TemporaryFile(dir=directory) as titles:
+            for fields in references:
+                title = normalize_title(fields.get('title', ''))
+                grams = _grams(title)
+                if not grams:
+                    continue
+                for gram in grams:
+                    counts[gram] += 1
+                record_offsets.append(record_offsets[-1] + records.write(
+                    json.dumps(fields, ensure_ascii=False).encode('utf-8')
+                ))
+                title_offsets.append(title_offsets[-1] + titles.write(
+                    title.encode('utf-8')
+                ))
+                lengths.append(len(title))
+            records.flush()
+            titles.flush()
+            gram_offsets = array('Q', accumulate(counts, initial=0))
+            # The records are numbered by the lengths of their titles, so
+            # that the postings of a range of lengths are contiguous.
+            order = sorted(range(len(lengths)), key=lengths.__getitem__)
+            length_starts = array(
+                'Q', bytes(8 * (max(lengths, default=0) + 2))
+            )
+            for length in lengths:
+                length_starts[length + 1] += 1
+            length_starts = array('Q', accumulate(length_starts))
+
+            with os.fdopen(fd, 'w+b') as fl:
+                fl.write(b'\0' * _HEADER.size)
+                sections = [_align(fl)]
+                gram_offsets.tofile(fl)
+                sections.append(_align(fl))
+                fl.seek(4 * gram_offsets[-1], os.SEEK_CUR)
+                sections.append(_align(fl))
+                length_starts.tofile(fl)
+                sections.append(_align(fl))
+                sections.append(_write_ordered(fl, records, record_offsets,
+                                               order))
+                sections.append(_align(fl))
+                sections.append(_write_ordered(fl, titles, title_offsets,
+                                               order))
+                sections.append(fl.tell())
+                fl.seek(0)
+                fl.write(_HEADER.pack(
+                    MAGIC, sys.byteorder.encode('ascii').ljust(8, b'\0'),
+                    _Q, len(lengths), *sections
+                ))
+                fl.flush()
+                _fill_postings(fl, gram_offsets, sections)
+                os.fsync(fl.fileno())
+        os.replace(temp_path, index_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return len(lengths)
+
+
+def _fill_postings(fl, gram_offsets, sections):
+    data = mmap.mmap(fl.fileno(), 0)
+    view = memoryview(data)
+    postings = view[sections[1]:sections[2]].cast('I')
+    offsets = view[sections[5]:sections[6]].cast('Q')
+    titles = view[sections[6]:sections[7]]
+    try:
+        cursors = gram_offsets[:-1]
+        for number in range(len(offsets) - 1):
+            title = bytes(titles[offsets[number]:offsets[number + 1]])
+            for gram in _grams(title.decode('utf-8')):
+                postings[cursors[gram]] = number
+                cursors[gram] += 1
+        data.flush()
+    finally:
+        for section in (postings, offsets, titles, view):
+            section.release()
+        data.close()
+
+
+class Library:
+    """A reference library indexed by `build_library`, queried by title
+    through a memory map of its index file.
+
+    At most `budget` postings are counted by a query, beyond the ones it
+    has to read."""
+
+    def __init__(self, path, threshold=0.95, budget=1 << 15):
+        self.path = path
+        self.threshold = threshold
+        self.budget = budget
+        with open(path, 'rb') as fl:
+            self._data = mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, byteorder, q, self.count, *sections = _HEADER.unpack_from(
+            self._data
+        )
+        byteorder = byteorder.rstrip(b'\0').decode('ascii', 'replace')
+        if magic != MAGIC or q != _Q:
+            self._data.close()
+            raise ValueError('"%s" is not a reference library index' % path)
+        if byteorder != sys.byteorder:
+            self._data.close()
+            raise ValueError('"%s" was built on a %s-endian machine' % (
+                path, byteorder))
+        view = self._view = memoryview(self._data)
+        self._gram_offsets = view[sections[0]:sections[1]].cast('Q')
+        self._postings = view[sections[1]:sections[2]].cast('I')
+        self._length_starts = view[sections[2]:sections[3]].cast('Q')
+        self._record_offsets = view[sections[3]:sections[4]].cast('Q')
+        self._records = view[sections[4]:sections[5]]
+        self._title_offsets = view[sections[5]:sections[6]].cast('Q')
+        self._titles = view[sections[6]:sections[7]]
+
+    def __len__(self):
+        return self.count
+
+    def record(self, number):
+        return json.loads(bytes(self._records[
+            self._record_offsets[number]:self._record_offsets[number + 1]
+        ]).decode('utf-8'))
+
+    def title(self, number):
+        return bytes(self._titles[
+            self._title_offsets[number]:self._title_offsets[number + 1]
+        ]).decode('utf-8')
+
+    def _window(self, size):
+        # The numbers of the records whose titles are neither too short nor
+        # too long to be close to a title of `size` characters.
+        starts = self._length_starts
+        low = min(math.floor(self.threshold * size) + 1, len(starts) - 1)
+        high = min(math.ceil(size / self.threshold), len(starts) - 1)
+        return starts[low], starts[high]
+
+    def candidates(self, title):
+        """The numbers of the records whose normalized titles can be close
+        to the normalized `title`.
+
+        A close title is obtained with at most D insertions and deletions,
+        which break at most q * D of the distinct trigrams of `title`, so it
+        is in one of the q * D + 1 shortest postings of these trigrams, and
+        in at least k - q * D of the k shortest ones. Only the postings of
+        the titles of close lengths are read."""
+        first, last = self._window(len(title))
+        offsets = self._gram_offsets
+        postings = self._postings
+        lists = []
+        for gram in _grams(title):
+            start = bisect_left(postings, first, offsets[gram],
+                                offsets[gram + 1])
+            end = bisect_left(postings, last, start, offsets[gram + 1])
+            lists.append((end - start, start, end))
+        edits = max(math.ceil(
+            2 * (1 - self.threshold) * len(title) / self.threshold
+        ) - 1, 0)
+        if len(lists) <= _Q * edits:
+            return range(first, last)
+        lists.sort()
+        read = _Q * edits + 1
+        extra = 0
+        while read < len(lists) and extra + lists[read][0] <= self.budget:
+            extra += lists[read][0]
+            read += 1
+        counts = Counter()
+        for _, start, end in lists[:read]:
+            counts.update(postings[start:end])
+        found = [number for number, count in counts.items()
+                 if count >= read - _Q * edits]
+        # Verifying a candidate costs as much as counting some hundred
+        # postings, keep counting while it leaves much fewer candidates.
+        while read < len(lists) and len(found) * _VERIFY > lists[read][0]:
+            _, start, end = lists[read]
+            counts.update(postings[start:end])
+            read += 1
+            found = [number for number in found
+                     if counts[number] >= read - _Q * edits]
+        return found
+
+    def search(self, title):
+        """Yield (record number, normalized title) of the records whose
+        titles `isclose` to the normalized `title`."""
+        for number in sorted(self.candidates(title)):
+            other = self.title(number)
+            if isclose(title, other, self.threshold):
+                yield number, other
+
+    def match(self, title):
+        """The fields of the peer-reviewed record with the closest title to
+        `title`, or None, with their accented letters written as LaTeX
+        macros, the records keep them as in the dump. Preprints are never
+        returned."""
+        title = normalize_title(title)
+        best = None
+        for number, other in self.search(title):
+            record = self.record(number)
+            if is_preprint(record):
+                continue
+            if other == title:
+                best = 0, record
+                break
+            distance = abs(len(other) - len(title))
+            if best is None or distance < best[0]:
+                best = distance, record
+        if best is None:
+            return None
+        return {key: encode_latex(value) for key, value in best[1].items()}
+
+    def close(self):
+        for view in (self._gram_offsets, self._postings,
+                     self._length_starts, self._record_offsets, self._records,
+                     self._title_offsets, self._titles, self._view):
+            view.release()
+        self._data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
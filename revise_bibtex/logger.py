@@ -1,4 +1,5 @@
 import logging
+import logging.handlers
 import os
 
 
@@ -16,20 +17,20 @@ class ColoredFormatter(logging.Formatter):
         super().__init__(
             ColoredFormatter.FORMAT, datefmt=ColoredFormatter.DATE_FMT
         )
-        self.use_highlight = use_highlight
+        # coloring doesn't always work well for Windows
+        self.use_highlight = use_highlight and os.name == 'posix'
+        self._print_style = logging.PercentStyle('%(message)s')
 
-    def format(self, record):
-        record.pathname = os.path.relpath(record.pathname)
+    def formatMessage(self, record):
         if record.levelno == logging.PRINT:
-            self._style._fmt = '%(message)s'
-        if os.name == 'posix':  # coloring doesn't always work well for Windows
-            if self.use_highlight and hasattr(record, 'highlight') and\
-                    record.highlight != 0:
-                start = '\033[%dm' % (record.highlight + 30)
-                end = '\033[%dm' % 39
-                return start + super().format(record) + end
+            return self._print_style.format(record)
+        return self._style.format(record)
+
+    def format(self, record):
         result = super().format(record)
-        self._style._fmt = ColoredFormatter.FORMAT
+        highlight = getattr(record, 'highlight', 0)
+        if self.use_highlight and highlight:
+            return '\033[%dm%s\033[39m' % (highlight + 30, result)
         return result
 
 
@@ -51,10 +52,17 @@ class CustomLogger(logging.LoggerAdapter):
         else:
             file_handler = logging.FileHandler(filename)
             file_handler.setFormatter(ColoredFormatter(use_highlight=False))
-            return self.logger.addHandler(file_handler)
+            # The records are written in batches, and at exit by
+            # logging.shutdown.
+            buffered_handler = logging.handlers.MemoryHandler(
+                1024, flushLevel=logging.PRINT + 1, target=file_handler
+            )
+            return self.logger.addHandler(buffered_handler)
 
     def removeOutputHandler(self):
-        return self.logger.removeHandler(self.logger.handlers[-1])
+        handler = self.logger.handlers[-1]
+        handler.flush()
+        return self.logger.removeHandler(handler)
 
     def print(self, msg, *args, **kwargs):
         self.log(logging.PRINT, msg, *args, **kwargs)
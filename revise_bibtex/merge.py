@@ -0,0 +1,326 @@
+from contextlib import ExitStack
+import csv
+import mmap
+import os
+import re
+import tempfile
+
+from .duplicates import TitleIndex, token_frequencies
+from .library import normalize_title
+from .logger import logger
+from .stream import (
+    _REFERENCE, _VALUE, block_fields, block_key, is_entry_type, iter_blocks,
+    make_parser, open_bib
+)
+
+
+_DOI_PREFIX = re.compile(r'^\s*(?:https?://(?:dx\.)?doi\.org/|doi:\s*)',
+                         re.IGNORECASE)
+# An ID in the value of a crossref or xdata field.
+_REFERENCE_KEY = re.compile(rb'[^ \t\r\n,{}"]+')
+# The title and DOI of an entry are searched, its other fields are only read
+# to compare it with its duplicate.
+_TITLE = re.compile(rb'[ \t\r\n,]title[ \t\r\n]*=[ \t\r\n]*(' + _VALUE +
+                    rb')', re.IGNORECASE)
+_DOI = re.compile(rb'[ \t\r\n,]doi[ \t\r\n]*=[ \t\r\n]*(' + _VALUE + rb')',
+                  re.IGNORECASE)
+_STRING_NAME = re.compile(rb'@[ \t\r\n]*string[ \t\r\n]*[{(][ \t\r\n]*'
+                          rb'([^ \t\r\n=]+)', re.IGNORECASE)
+# The fields that are not compared between an entry and its duplicate: the
+# title is close, and the IDs may differ.
+_NOT_COMPARED = frozenset(['title', 'crossref', 'xdata'])
+# The titles are indexed by their 4-grams, fewer titles share the rarest
+# ones than their trigrams.
+_Q = 4
+
+
+def _unquote(value):
+    if value[:1] in ('{', '"'):
+        return value[1:-1]
+    return value
+
+
+def normalize_doi(doi):
+    """A DOI without its resolver prefix, lower-cased as DOIs are case
+    insensitive."""
+    return _DOI_PREFIX.sub('', _unquote(doi)).strip().lower()
+
+
+def _normalize_value(name, value):
+    if name == 'doi':
+        return normalize_doi(value)
+    value = _unquote(value).replace('{', '').replace('}', '')
+    return ' '.join(value.lower().split())
+
+
+def conflicting_fields(fields, other):
+    """The names of the fields, raw as `block_fields` reads them, that two
+    entries both define differently, but for their braces, spacing and
+    case."""
+    return sorted(name for name in fields.keys() & other.keys()
+                  if name not in _NOT_COMPARED and
+                  _normalize_value(name, fields[name]) !=
+                  _normalize_value(name, other[name]))
+
+
+def _scan(data):
+    # (block type, start, end, body start, key, normalized title, DOI) of
+    # the blocks of a bib file, the key, title and DOI are None for the
+    # special blocks.
+    parser = make_parser()
+    for block_type, start, end, body in iter_blocks(data):
+        if not is_entry_type(block_type, parser) and block_type != 'xdata':
+            yield block_type, start, end, body, None, None, None
+            continue
+        title = _TITLE.search(data, body, end)
+        doi = _DOI.search(data, body, end)
+        if title is not None:
+            title = normalize_title(_unquote(title.group(1).decode('utf-8')))
+        if doi is not None:
+            doi = normalize_doi(doi.group(1).decode('utf-8'))
+        yield block_type, start, end, body, block_key(data, body), \
+            title or None, doi or None
+
+
+class MergeIndex:
+    """The entries of a merged bibliography, by ID, by DOI and by title,
+    to find whether an entry is already there, possibly under another ID,
+    without comparing it with all of them. The same normalized titles are
+    found by a lookup, the other close titles by a `TitleIndex`, with the
+    `frequencies` of the q-grams of the titles, which finds all of them."""
+
+    def __init__(self, threshold=0.95, frequencies=None):
+        self.threshold = threshold
+        self.keys = set()
+        self.dois = {}
+        self.exact = {}
+        self._titles = TitleIndex(threshold, _Q, frequencies)
+        self._title_keys = []
+
+    def find(self, title, doi):
+        """The ID of the entry with the same DOI, or a close title."""
+        if doi and doi in self.dois:
+            return self.dois[doi]
+        if not title:
+            return None
+        if title in self.exact:
+            return self.exact[title]
+        found = self._titles.query(title)
+        return self._title_keys[min(found)] if found else None
+
+    def add(self, key, title, doi):
+        self.keys.add(key)
+        if doi:
+            self.dois.setdefault(doi, key)
+        if title and title not in self.exact:
+            self.exact[title] = key
+            self._titles.add(len(self._title_keys), title)
+            self._title_keys.append(key)
+
+    def unique_key(self, key):
+        number = 2
+        while '%s-%d' % (key, number) in self.keys:
+            number += 1
+        return '%s-%d' % (key, number)
+
+
+def merge_bibs(bib_paths, out_path, key_map_path=None, threshold=0.95):
+    """Merge bib files into `out_path`, without parsing their entries.
+
+    Every entry is kept once: an entry with the same DOI as a previous one,
+    or a title that `isclose` to it, is dropped, whatever its ID, and the
+    fields it defines differently from the kept entry are warned about. An
+    entry without a title or DOI, e.g. @xdata, is dropped for an entry of
+    the same ID and fields. An entry whose ID is taken by another entry gets
+    a new ID, e.g. "smith20-2". The crossref and xdata fields follow the new
+    IDs, those of the file first, then those of the dropped entries of every
+    file. The @string, @preamble and @comment blocks are kept once, the
+    text between the blocks is dropped.
+
+    Returns the rows of the key map, (file, ID, merged ID, reason,
+    conflicting fields), where the reason is 'same' for a dropped entry of
+    the same ID, 'duplicate' for one of another ID, and 'conflict' for a new
+    ID, the rows are also written to `key_map_path` as tab-separated
+    values."""
+    with ExitStack() as stack:
+        datas = []
+        for path in bib_paths:
+            data = open_bib(path)
+            if isinstance(data, mmap.mmap):
+                stack.callback(data.close)
+            datas.append(data)
+        # All the blocks are scanned first, to count the q-grams of the
+        # titles, the index looks them up by their rarest ones.
+        scans = [list(_scan(data)) for data in datas]
+        index = MergeIndex(threshold, token_frequencies(
+            (title for scan in scans for _, _, _, _, _, title, _ in scan
+             if title), _Q
+        ))
+        # Where the kept entries are, (file number, body start, end) by ID,
+        # to compare their fields with those of their duplicates.
+        locations = {}
+        rows = []
+        moved = {}
+        pending = []
+        with open(out_path, 'wb') as fl:
+            written = set()
+            strings = {}
+            count = 0
+            for number, (path, data, scan) in enumerate(zip(
+                    bib_paths, datas, scans)):
+                blocks = []
+                renamed = {}
+                for block in scan:
+                    block_type, start, end, body, key, title, doi = block
+                    if key is None:
+                        blocks.append((block_type, data[start:end], None))
+                        continue
+                    same = index.find(title, doi)
+                    if same is None and key in index.keys and \
+                            title is None and doi is None:
+                        # An entry without a title or DOI, e.g. @xdata, is
+                        # the same as the entry of its ID of the same fields.
+                        fields = block_fields(data, body, end)
+                        other = block_fields(datas[locations[key][0]],
+                                             *locations[key][1:])
+                        if fields.keys() == other.keys() and \
+                                not conflicting_fields(fields, other):
+                            same = key
+                    if same is not None:
+                        other, other_body, other_end = locations[same]
+                        conflicts = conflicting_fields(
+                            block_fields(data, body, end),
+                            block_fields(datas[other], other_body, other_end)
+                        )
+                        reason = 'same' if same == key else 'duplicate'
+                        if conflicts:
+                            logger.warning(
+                                '%s: "%s" is merged into "%s" from %s, which '
+                                'has another %s', path, key, same,
+                                bib_paths[other], ', '.join(conflicts))
+                        rows.append((path, key, same, reason,
+                                     ','.join(conflicts)))
+                        renamed[key] = same
+                        moved.setdefault(key, same)
+                        continue
+                    new_key = key
+                    if key in index.keys:
+                        new_key = renamed[key] = index.unique_key(key)
+                        rows.append((path, key, new_key, 'conflict', ''))
+                        logger.warning('%s: "%s" is already another entry, '
+                                       'renamed "%s"', path, key, new_key)
+                    index.add(new_key, title, doi)
+                    locations[new_key] = (number, body, end)
+                    blocks.append((block_type, data[start:end],
+                                   (body - start, key, new_key)))
+                # The blocks of a file are written once all its IDs are
+                # known, as an entry usually comes before its crossref'ed
+                # entry.
+                for block_type, text, keys in blocks:
+                    if keys is None:
+                        if text in written:
+                            continue
+                        written.add(text)
+                        if block_type == 'string':
+                            name = _STRING_NAME.match(text)
+                            name = name.group(1).lower() if name else text
+                            if name in strings:
+                                logger.warning(
+                                    '%s: @string %s is already defined '
+                                    'differently, the first definition is '
+                                    'kept', path,
+                                    name.decode('utf-8', 'replace'))
+                                continue
+                            strings[name] = text
+                    else:
+                        unresolved = []
+                        text = _rename(text, keys, lambda parent: _resolve(
+                            parent, renamed, index.keys, moved, unresolved))
+                        if unresolved:
+                            pending.append((fl.tell(), len(text)))
+                        count += 1
+                    fl.write(text)
+                    fl.write(b'\n\n')
+    # The references to the entries of the next files, which were not
+    # known yet, and may have been dropped since.
+    _relink(out_path, pending, index.keys, moved)
+    if key_map_path is not None:
+        with open(key_map_path, 'w', newline='') as fl:
+            writer = csv.writer(fl, delimiter='\t', lineterminator='\n')
+            writer.writerow(['file', 'key', 'merged key', 'reason',
+                             'conflicting fields'])
+            writer.writerows(rows)
+    logger.info('%d entries merged from %d files into "%s", %d duplicates '
+                'dropped, %d with conflicting fields, %d renamed', count,
+                len(bib_paths), out_path,
+                sum(row[3] != 'conflict' for row in rows),
+                sum(bool(row[4]) for row in rows),
+                sum(row[3] == 'conflict' for row in rows))
+    return rows
+
+
+def _resolve(parent, renamed, keys, moved, unresolved):
+    # The merged ID of a crossref'ed or xdata entry: its new ID in the file,
+    # the ID of a kept entry, or of the entry a dropped one was merged into,
+    # the IDs that are none of them yet are added to `unresolved`.
+    if parent in renamed:
+        return renamed[parent]
+    if parent in keys:
+        return parent
+    if parent in moved:
+        return moved[parent]
+    unresolved.append(parent)
+    return parent
+
+
+def _rename(text, keys, resolve):
+    # The new ID of an entry, and the IDs of its crossref and xdata fields
+    # given by `resolve`.
+    offset, key, new_key = keys
+    if new_key != key:
+        offset += len(text[offset:]) - len(text[offset:].lstrip())
+        text = text[:offset] + new_key.encode('utf-8') + \
+            text[offset + len(key.encode('utf-8')):]
+
+    def reference(match):
+        # The value is braced, quoted or bare.
+        group = next(i for i in (2, 3, 4) if match.group(i) is not None)
+        start, end = match.span(group)
+        return text[match.start():start] + _REFERENCE_KEY.sub(
+            lambda parent: resolve(parent.group().decode('utf-8')).encode(
+                'utf-8'), match.group(group)) + text[end:match.end()]
+    return _REFERENCE.sub(reference, text)
+
+
+def _relink(out_path, pending, keys, moved):
+    # Rewrite the references of the (offset, length) blocks of the merged
+    # file to the entries dropped after them, only if there are some.
+    def resolve(parent):
+        return parent if parent in keys else moved.get(parent, parent)
+    with open(out_path, 'rb') as fl:
+        changes = []
+        for offset, length in pending:
+            fl.seek(offset)
+            text = fl.read(length)
+            renamed = _rename(text, (0, None, None), resolve)
+            if renamed != text:
+                changes.append((offset, length, renamed))
+    if not changes:
+        return
+    directory = os.path.dirname(os.path.abspath(out_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.merged.')
+    try:
+        with open(out_path, 'rb') as source, os.fdopen(fd, 'wb') as fl:
+            for offset, length, text in changes:
+                fl.write(source.read(offset - source.tell()))
+                fl.write(text)
+                source.seek(length, os.SEEK_CUR)
+            while True:
+                chunk = source.read(1 << 20)
+                if not chunk:
+                    break
+                fl.write(chunk)
+        os.replace(temp_path, out_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
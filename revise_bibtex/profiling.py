@@ -0,0 +1,150 @@
+from array import array
+from contextlib import contextmanager, nullcontext
+import functools
+import heapq
+import json
+import time
+
+from .logger import logger
+
+
+# The active Profiler, None when profiling is off, in which case the phases
+# only pay for this lookup, and the validators are not wrapped at all.
+profiler = None
+_originals = {}
+
+
+class Timer:
+    __slots__ = ('times', 'slowest', 'keep')
+
+    def __init__(self, keep=5):
+        self.times = array('d')
+        self.slowest = []
+        self.keep = keep
+
+    def add(self, elapsed, label=None):
+        self.times.append(elapsed)
+        if label is None:
+            return
+        if len(self.slowest) < self.keep:
+            heapq.heappush(self.slowest, (elapsed, label))
+        elif elapsed > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (elapsed, label))
+
+    def summary(self):
+        times = sorted(self.times)
+        return {
+            'count': len(times),
+            'total': sum(times),
+            'p95': times[min(int(0.95 * len(times)), len(times) - 1)]
+            if times else 0.0,
+            'max': times[-1] if times else 0.0,
+            'slowest': [{'label': label, 'time': elapsed}
+                        for elapsed, label in sorted(self.slowest,
+                                                     reverse=True)],
+        }
+
+
+class Profiler:
+    """Timers of the phases of a run and of the validators, with the
+    number of calls, total and 95th percentile times, and the labels (entry
+    IDs) of the slowest calls."""
+
+    def __init__(self, keep=5):
+        self.keep = keep
+        self.timers = {}
+
+    def timer(self, name):
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = Timer(self.keep)
+        return timer
+
+    def call(self, function, entry, *args, **kwargs):
+        start = time.perf_counter()
+        result = function(entry, *args, **kwargs)
+        self.timer(function.__name__).add(time.perf_counter() - start,
+                                          entry.get('ID'))
+        return result
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timer(name).add(time.perf_counter() - start)
+
+    def iterate(self, name, iterable):
+        timer = self.timer(name)
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                timer.add(time.perf_counter() - start)
+                return
+            timer.add(time.perf_counter() - start)
+            yield item
+
+    def summary(self):
+        return {name: timer.summary() for name, timer in self.timers.items()}
+
+    def log(self):
+        logger.info('%-24s %9s %11s %11s %11s', 'timer', 'calls', 'total',
+                    'p95', 'max')
+        for name, summary in self.summary().items():
+            logger.info(
+                '%-24s %9d %10.4fs %9.1fus %9.1fus', name, summary['count'],
+                summary['total'], 1e6 * summary['p95'], 1e6 * summary['max']
+            )
+            if summary['slowest']:
+                logger.info('%24s slowest: %s', '', ', '.join(
+                    '%s (%.1fus)' % (item['label'], 1e6 * item['time'])
+                    for item in summary['slowest']
+                ))
+
+    def dump(self, path):
+        with open(path, 'w') as fl:
+            json.dump(self.summary(), fl, indent=2)
+
+
+def _timed(function):
+    @functools.wraps(function)
+    def timed(entry, *args, **kwargs):
+        return profiler.call(function, entry, *args, **kwargs)
+    return timed
+
+
+def enable(keep=5):
+    """Start profiling, replacing the validators of `core` by timed
+    wrappers."""
+    global profiler
+    from . import core
+
+    profiler = Profiler(keep)
+    for name in core.VALIDATORS:
+        if name not in _originals:
+            _originals[name] = getattr(core, name)
+            setattr(core, name, _timed(_originals[name]))
+    return profiler
+
+
+def disable():
+    global profiler
+    from . import core
+
+    for name, function in _originals.items():
+        setattr(core, name, function)
+    _originals.clear()
+    profiler = None
+
+
+def phase(name):
+    return nullcontext() if profiler is None else profiler.phase(name)
+
+
+def iterate(name, iterable):
+    return iterable if profiler is None else \
+        profiler.iterate(name, iterable)
@@ -0,0 +1,139 @@
+import json
+import os
+
+
+class Issue(str):
+    """A warning message, which also tells the rule that produced it and
+    the field it is about, if any."""
+
+    def __new__(cls, message, rule, field=None):
+        issue = super().__new__(cls, message)
+        issue.rule = rule
+        issue.field = field
+        return issue
+
+    def __reduce__(self):
+        return Issue, (str(self), self.rule, self.field)
+
+
+def encode_issues(warnings):
+    return [[str(w), getattr(w, 'rule', None), getattr(w, 'field', None)]
+            for w in warnings]
+
+
+def decode_issues(encoded):
+    return [Issue(message, rule, field) for message, rule, field in encoded]
+
+
+def entry_lines(bib_path):
+    """The line of each entry of a bib file, by ID, counted from 1, from a
+    scan of its blocks."""
+    from .stream import _SPECIAL_TYPES, block_key, iter_blocks, open_bib
+
+    lines = {}
+    data = open_bib(bib_path)
+    try:
+        line, pos = 1, 0
+        for block_type, start, _, body in iter_blocks(data):
+            line += data[pos:start].count(b'\n')
+            pos = start
+            if block_type not in _SPECIAL_TYPES:
+                lines.setdefault(block_key(data, body), line)
+    finally:
+        if not isinstance(data, bytes):
+            data.close()
+    return lines
+
+
+class Report:
+    """Collect the warnings of a run in a machine-readable file, one record
+    per warning: the entry ID, the rule, the field and the message.
+
+    The 'jsonl' format writes one JSON object per line through a large
+    buffer, the 'sarif' format writes a SARIF 2.1.0 log on `close`."""
+
+    def __init__(self, path, format='jsonl', bib_path=None,
+                 buffer_size=1 << 20):
+        if format not in ('jsonl', 'sarif'):
+            raise ValueError('Unknown report format "%s"' % format)
+        self.path = path
+        self.format = format
+        self.bib_path = bib_path
+        self.count = 0
+        self._results = []
+        self._fl = open(path, 'w', buffering=buffer_size) \
+            if format == 'jsonl' else None
+
+    def add(self, key, warning, rule=None, field=None):
+        rule = getattr(warning, 'rule', rule) or 'warning'
+        field = getattr(warning, 'field', field)
+        self.count += 1
+        if self._fl is not None:
+            self._fl.write(json.dumps({
+                'id': key, 'rule': rule, 'field': field,
+                'message': str(warning),
+            }))
+            self._fl.write('\n')
+        else:
+            self._results.append((key, rule, field, str(warning)))
+
+    def _sarif(self):
+        from . import __version__
+
+        rules = sorted(set(rule for _, rule, _, _ in self._results))
+        indices = {rule: i for i, rule in enumerate(rules)}
+        artifact = lines = None
+        if self.bib_path is not None:
+            artifact = {
+                'uri': os.path.relpath(self.bib_path).replace(os.sep, '/')
+            }
+            lines = entry_lines(self.bib_path)
+        results = []
+        for key, rule, field, message in self._results:
+            names = [key] + ([field] if field else [])
+            location = {}
+            if artifact is not None:
+                location['physicalLocation'] = {'artifactLocation': artifact}
+                if key in lines:
+                    location['physicalLocation']['region'] = {
+                        'startLine': lines[key]
+                    }
+            results.append({
+                'ruleId': rule,
+                'ruleIndex': indices[rule],
+                'level': 'warning',
+                'message': {'text': message},
+                'locations': [dict(location, logicalLocations=[{
+                    'fullyQualifiedName': '.'.join(names),
+                    'name': names[-1],
+                    'kind': 'member',
+                }])],
+            })
+        return {
+            '$schema': 'https://json.schemastore.org/sarif-2.1.0.json',
+            'version': '2.1.0',
+            'runs': [{
+                'tool': {'driver': {
+                    'name': 'revise-bibtex',
+                    'version': __version__,
+                    'informationUri':
+                        'https://github.com/mostafa-mahmoud/revise-bibtex',
+                    'rules': [{'id': rule} for rule in rules],
+                }},
+                'results': results,
+            }],
+        }
+
+    def close(self):
+        if self._fl is not None:
+            self._fl.close()
+            self._fl = None
+        elif self.format == 'sarif':
+            with open(self.path, 'w') as fl:
+                json.dump(self._sarif(), fl, indent=1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
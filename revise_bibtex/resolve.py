@@ -0,0 +1,315 @@
+import asyncio
+from collections import defaultdict
+import json
+import ssl
+import urllib.parse
+
+from .utils import isclose
+
+
+CROSSREF_URL = 'https://api.crossref.org'
+
+
+class ResolveError(Exception):
+    pass
+
+
+class HTTPClient:
+    """A minimal asyncio HTTP/1.1 client for GET requests, keeping the
+    connections alive in a pool per host, with at most `limit_per_host`
+    open connections to each."""
+
+    def __init__(self, limit_per_host=16, timeout=10.0, headers=None):
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+        self._idle = defaultdict(list)
+        self._limits = {}
+        self._ssl = None
+
+    async def _connect(self, scheme, host, port):
+        context = None
+        if scheme == 'https':
+            if self._ssl is None:
+                self._ssl = ssl.create_default_context()
+            context = self._ssl
+        return await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=context), self.timeout
+        )
+
+    async def _request(self, reader, writer, host, target):
+        headers = dict(self.headers, Host=host, Connection='keep-alive')
+        writer.write(('GET %s HTTP/1.1\r\n%s\r\n' % (target, ''.join(
+            '%s: %s\r\n' % item for item in headers.items()
+        ))).encode('latin-1'))
+        await writer.drain()
+        # The reason phrase after the status code is optional.
+        version, _, status = (await reader.readline()).decode(
+            'latin-1').partition(' ')
+        status = status.split(None, 1)[0] if status.strip() else ''
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        keep_alive = version == 'HTTP/1.1' and \
+            response_headers.get('connection', '').lower() != 'close'
+        if response_headers.get('transfer-encoding', '').lower() == \
+                'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b''.join(chunks)
+        elif 'content-length' in response_headers:
+            body = await reader.readexactly(
+                int(response_headers['content-length'])
+            )
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return int(status), response_headers, body, keep_alive
+
+    async def get(self, url):
+        """Return (status, headers, body) of a GET request, the header
+        names are lower-cased."""
+        parts = urllib.parse.urlsplit(url)
+        host = parts.hostname
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        target = (parts.path or '/') + \
+            ('?' + parts.query if parts.query else '')
+        key = parts.scheme, host, port
+        if key not in self._limits:
+            self._limits[key] = asyncio.Semaphore(self.limit_per_host)
+        async with self._limits[key]:
+            idle = self._idle[key]
+            while True:
+                reused = bool(idle)
+                reader, writer = idle.pop() if reused else \
+                    await self._connect(*key)
+                try:
+                    status, headers, body, keep_alive = \
+                        await asyncio.wait_for(
+                            self._request(reader, writer, host, target),
+                            self.timeout
+                        )
+                except (OSError, ValueError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused:  # closed by the server while idle
+                        continue
+                    raise
+                except asyncio.TimeoutError:
+                    writer.close()
+                    raise
+                if keep_alive:
+                    idle.append((reader, writer))
+                else:
+                    writer.close()
+                return status, headers, body
+
+    async def close(self):
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+
+class RateLimiter:
+    """Space the requests to at most `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        delay = self._next - now
+        self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class CrossrefBackend:
+    """Looks up works in the Crossref REST API, or any server answering
+    the same /works requests, e.g. a local stub.
+
+    Other backends provide the same three methods: the URLs of the lookups
+    by DOI and by title, and the bib fields of a response."""
+
+    def __init__(self, base_url=CROSSREF_URL, mailto=None):
+        self.base_url = base_url.rstrip('/')
+        self.mailto = mailto
+
+    def _url(self, path, params):
+        if self.mailto:
+            params['mailto'] = self.mailto
+        query = urllib.parse.urlencode(params)
+        return self.base_url + path + ('?' + query if query else '')
+
+    def doi_url(self, doi):
+        return self._url('/works/' + urllib.parse.quote(doi, safe='/'), {})
+
+    def title_url(self, title):
+        return self._url('/works', {'query.bibliographic': title,
+                                    'rows': 1})
+
+    def fields(self, response):
+        message = response.get('message', {})
+        if 'items' in message:
+            if not message['items']:
+                return None
+            message = message['items'][0]
+        fields = {}
+        if message.get('title'):
+            fields['title'] = message['title'][0]
+        if message.get('DOI'):
+            fields['doi'] = message['DOI']
+        if message.get('publisher'):
+            fields['publisher'] = message['publisher']
+        if message.get('page'):
+            fields['pages'] = message['page'].replace('-', '--')
+        if message.get('volume'):
+            fields['volume'] = message['volume']
+        if message.get('issue'):
+            fields['number'] = message['issue']
+        container = message.get('container-title')
+        if container:
+            if message.get('type') == 'journal-article':
+                fields['journal'] = container[0]
+            else:
+                fields['booktitle'] = container[0]
+        parts = message.get('issued', {}).get('date-parts')
+        if parts and parts[0] and parts[0][0]:
+            fields['year'] = str(parts[0][0])
+        return fields
+
+
+def _plain(title):
+    return title.replace('{', '').replace('}', '').lower()
+
+
+class Resolver:
+    """Fetches the metadata of many entries concurrently, through one
+    pooled HTTP client, with at most `concurrency` requests in flight, at
+    most `rate` requests per second (None for no limit), and `retries`
+    retries of failed requests. The responses are kept in `cache`, a
+    `Cache` with e.g. table='responses', when given."""
+
+    def __init__(self, backend=None, concurrency=32, rate=50, retries=3,
+                 timeout=10.0, cache=None, title_threshold=0.8):
+        self.backend = backend or CrossrefBackend()
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.timeout = timeout
+        self.cache = cache
+        self.title_threshold = title_threshold
+        self._loop = None
+
+    def _start(self):
+        self._loop = asyncio.new_event_loop()
+        self._client = HTTPClient(
+            limit_per_host=self.concurrency, timeout=self.timeout,
+            headers={'Accept': 'application/json',
+                     'User-Agent': 'revise-bibtex'}
+        )
+        self._limiter = RateLimiter(self.rate) if self.rate else None
+
+    async def fetch(self, url):
+        """Return the decoded JSON response, or None for a 404."""
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached is not None:
+                return cached['response']
+        problem = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(min(0.5 * 2 ** (attempt - 1), 8.0))
+            if self._limiter is not None:
+                await self._limiter.wait()
+            try:
+                status, headers, body = await self._client.get(url)
+            except (OSError, ValueError, asyncio.IncompleteReadError,
+                    asyncio.TimeoutError) as error:
+                problem = str(error) or type(error).__name__
+                continue
+            if status == 200:
+                try:
+                    response = json.loads(body.decode('utf-8'))
+                except ValueError as error:
+                    raise ResolveError('invalid response: %s' % error)
+            elif status == 404:
+                response = None
+            elif status == 429 or status >= 500:
+                problem = 'HTTP %d' % status
+                retry_after = headers.get('retry-after', '')
+                if retry_after.isdigit():
+                    await asyncio.sleep(min(int(retry_after), 60))
+                continue
+            else:
+                raise ResolveError('HTTP %d' % status)
+            if self.cache is not None:
+                self.cache.put(url, {'response': response})
+                self.cache.commit()
+            return response
+        raise ResolveError(problem)
+
+    def _same_title(self, title, fields):
+        other = _plain(fields.get('title', ''))
+        return bool(other) and isclose(title, other, self.title_threshold)
+
+    async def _resolve(self, title, doi):
+        title = _plain(title or '').strip()
+        if doi:
+            response = await self.fetch(self.backend.doi_url(doi))
+            if response is None:
+                return None, 'DOI "%s" is not found' % doi
+            fields = self.backend.fields(response)
+            if fields and title and 'title' in fields and \
+                    not self._same_title(title, fields):
+                return None, 'DOI "%s" is of another work: "%s"' % (
+                    doi, fields['title'])
+            return fields, None
+        if not title:
+            return None, None
+        response = await self.fetch(self.backend.title_url(title))
+        fields = response and self.backend.fields(response)
+        if fields and self._same_title(title, fields):
+            return fields, None
+        return None, None
+
+    async def _resolve_all(self, items):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def resolve(title, doi):
+            async with semaphore:
+                try:
+                    return await self._resolve(title, doi)
+                except ResolveError as error:
+                    return None, 'cannot resolve "%s": %s' % (
+                        doi or title, error)
+
+        return await asyncio.gather(*(resolve(title, doi)
+                                      for title, doi in items))
+
+    def resolve(self, items):
+        """For each (title, doi) item, where doi may be None, return
+        (fields, problem): the bib fields of the work, or None if it is not
+        found, and a description of what went wrong, or None."""
+        if self._loop is None:
+            self._start()
+        return self._loop.run_until_complete(self._resolve_all(items))
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.run_until_complete(self._client.close())
+            self._loop.close()
+            self._loop = None
+        if self.cache is not None:
+            self.cache.close()
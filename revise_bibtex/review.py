@@ -0,0 +1,186 @@
+import hashlib
+import heapq
+import json
+import os
+import threading
+import urllib.parse
+
+from .logger import logger
+from .utils import copy_to_clipboard, print_entry_dict_as_bib
+
+
+# The entries with the most severe warnings are reviewed first, a missing
+# field before a badly cased title. The other rules have severity 1.
+SEVERITY = {
+    'unknown-type': 4,
+    'empty-field': 3,
+    'missing-year': 3,
+    'duplicate': 3,
+    'resolve': 3,
+    'crossref': 3,
+    'arxiv': 2,
+    'library': 2,
+    'doi': 2,
+    'pages': 2,
+    'year-in-field': 2,
+    'publisher-in-field': 2,
+}
+
+
+def severity(warnings):
+    return max((SEVERITY.get(getattr(w, 'rule', None), 1)
+                for w in warnings), default=0)
+
+
+def _digest(entry, warnings):
+    return hashlib.sha256(json.dumps(
+        [entry, [str(w) for w in warnings]], sort_keys=True
+    ).encode('utf-8')).hexdigest()[:16]
+
+
+def default_checkpoint(bib_path):
+    """The checkpoint of the review of a bib file, next to it, e.g.
+    ".refs.bib.review.jsonl" for "refs.bib"."""
+    directory, name = os.path.split(os.path.abspath(bib_path))
+    return os.path.join(directory, '.%s.review.jsonl' % name)
+
+
+class ReviewQueue:
+    """The entries to review one by one, while a background thread keeps
+    validating the next ones, so that the user never waits between two
+    entries. The ready entries are reviewed by decreasing `severity`, then
+    in the order of the bib file.
+
+    The reviewed entries are appended to the `checkpoint` file, and are not
+    shown again by the next run of the same `bib_path`, unless they or their
+    warnings changed. The file is removed once every entry has been
+    reviewed."""
+
+    def __init__(self, checkpoint=None, braces=True, bib_path=None):
+        self.checkpoint = checkpoint
+        self.braces = braces
+        self.bib_path = bib_path and os.path.abspath(bib_path)
+        self._ready = []
+        self._count = 0
+        self._done = False
+        self._error = None
+        self._condition = threading.Condition()
+        self._reviewed = set()
+        if checkpoint is not None and os.path.isfile(checkpoint):
+            with open(checkpoint) as fl:
+                for line in fl:
+                    try:
+                        record = json.loads(line)
+                        if record.get('bib') == self.bib_path:
+                            self._reviewed.add(record['digest'])
+                    except (ValueError, KeyError, TypeError,
+                            AttributeError):
+                        continue  # e.g. a line cut by a crash
+            if self._reviewed:
+                logger.info('resuming the review, %d entries were already '
+                            'reviewed', len(self._reviewed), highlight=4)
+        self._fl = None
+        self.skipped = 0
+
+    def put(self, entry, warnings, position, total):
+        """Queue a copy of a validated entry, with its warnings, or without
+        any to only show it as good."""
+        entry = dict(entry)
+        digest = _digest(entry, warnings) if warnings else None
+        if digest is not None and digest in self._reviewed:
+            self.skipped += 1
+            return
+        with self._condition:
+            heapq.heappush(self._ready, (
+                -severity(warnings), self._count,
+                (entry, warnings, position, total, digest)
+            ))
+            self._count += 1
+            self._condition.notify()
+
+    def _produce(self, producer):
+        try:
+            producer()
+        except BaseException as error:
+            self._error = error
+        finally:
+            with self._condition:
+                self._done = True
+                self._condition.notify()
+
+    def _get(self):
+        with self._condition:
+            if not self._ready and not self._done:
+                logger.info('validating the next entries...')
+            while not self._ready and not self._done:
+                self._condition.wait()
+            if not self._ready:
+                return None, 0
+            return heapq.heappop(self._ready)[2], len(self._ready)
+
+    def _mark(self, entry, digest):
+        if self.checkpoint is None:
+            return
+        if self._fl is None:
+            self._fl = open(self.checkpoint, 'a')
+        self._fl.write(json.dumps({'bib': self.bib_path, 'id': entry['ID'],
+                                   'digest': digest}))
+        self._fl.write('\n')
+        self._fl.flush()
+
+    def show(self, entry, warnings, position, total, ready):
+        if not warnings:
+            logger.info('%d/%d done..' % (position, total))
+            logger.info("Looks good...", highlight=2)
+            print_entry_dict_as_bib(entry, logger.print, braces=self.braces)
+            return True
+        for w in warnings:
+            logger.warning(w, highlight=3)
+        print_entry_dict_as_bib(entry, braces=self.braces)
+        logger.info('entry %d/%d, %d more ready to review..\n', position,
+                    total, ready)
+        title = entry.get('title', '').replace('{', '').replace('}', '')
+        copy_to_clipboard(title)
+        search_title = urllib.parse.quote(title)
+        print('https://scholar.google.com/scholar?q=' + search_title)
+        print('https://ieeexplore.ieee.org/search/searchresult.jsp?'
+              'newsearch=true&queryText=' + search_title)
+        print('\n[Paper title is copied to clipboard... '
+              'press enter to continue, q to stop reviewing..]\n')
+        try:
+            answer = input()
+        except EOFError:
+            answer = 'q'
+        return answer.strip().lower() != 'q'
+
+    def run(self, producer):
+        """Call `producer`, which `put`s the entries, in a background
+        thread, and review the entries as they are ready. Stopping the
+        review with "q" lets the producer finish, the review is resumed by
+        the next run."""
+        thread = threading.Thread(target=self._produce, args=(producer,),
+                                  daemon=True)
+        thread.start()
+        reviewing = True
+        while reviewing:
+            item, ready = self._get()
+            if item is None:
+                break
+            entry, warnings, position, total, digest = item
+            reviewing = self.show(entry, warnings, position, total, ready)
+            if reviewing and digest is not None:
+                self._mark(entry, digest)
+        if not reviewing:
+            logger.info('review stopped, it is resumed by the next run',
+                        highlight=4)
+        thread.join()
+        if self._fl is not None:
+            self._fl.close()
+        if self._error is not None:
+            raise self._error
+        if reviewing and self.checkpoint is not None and \
+                os.path.isfile(self.checkpoint):
+            os.remove(self.checkpoint)
+        if self.skipped:
+            logger.info('%d entries reviewed in a previous run were skipped',
+                        self.skipped)
@@ -0,0 +1,143 @@
+import re
+
+from .report import Issue
+
+
+class PatternRule:
+    """A warning for the fields whose values match a regular expression.
+    The message is formatted with the `field`, its `value` and the
+    `match`. The pattern is compiled here, an invalid one raises
+    `re.error`."""
+
+    __slots__ = ('name', 'pattern', 'message', 'fields', 'ignore_case',
+                 'regex', 'combinable')
+
+    def __init__(self, name, pattern, message=None, fields=None,
+                 ignore_case=False):
+        self.name = name
+        self.pattern = pattern
+        self.message = message or \
+            '"%(match)s" found in "%(field)s": "%(value)s"'
+        self.fields = frozenset(fields) if fields is not None else None
+        self.ignore_case = ignore_case
+        self.regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        # A pattern with groups, maybe referred to by backreferences, or
+        # with global flags, cannot be one alternative of a larger pattern.
+        self.combinable = not self.regex.groups
+        if self.combinable:
+            try:
+                re.compile(self.alternative())
+            except re.error:
+                self.combinable = False
+
+    def alternative(self):
+        return '(?%s:%s)' % ('i' if self.ignore_case else '', self.pattern)
+
+    def to_json(self):
+        return [self.name, self.pattern, self.message,
+                sorted(self.fields) if self.fields is not None else None,
+                self.ignore_case]
+
+
+# The fields where the year of the entry is expected.
+_YEAR_FIELDS = frozenset(['year', 'title', 'doi', 'url'])
+
+
+class FieldScanner:
+    """The checks of the values of the required fields of an entry: empty,
+    holding the year or the publisher of the entry, and the `PatternRule`s.
+
+    The patterns without groups are compiled in a single regular
+    expression, which scans the values of an entry at once, the others are
+    searched one by one. Only the entries with a match are checked field by
+    field and rule by rule, to tell which ones matched."""
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+        self._combined = None
+        combinable = [rule for rule in self.rules if rule.combinable]
+        if combinable:
+            self._combined = re.compile('|'.join(
+                rule.alternative() for rule in combinable
+            ))
+        self._separate = [rule.regex for rule in self.rules
+                          if not rule.combinable]
+
+    def scan(self, entry, keys, year, publisher):
+        """The warnings of the fields `keys` of `entry`, which has them
+        all."""
+        values = [entry[key] for key in keys]
+        text = '\n'.join(values)
+        combined = self._combined
+        matched = combined is not None and combined.search(text) is not None
+        if not matched and self._separate:
+            matched = any(regex.search(text) is not None
+                          for regex in self._separate)
+        warnings = []
+        for key, value in zip(keys, values):
+            if not value and key != 'url':
+                warnings.append(Issue('"%s" is empty' % key, 'empty-field',
+                                      key))
+            if year in value and key not in _YEAR_FIELDS:
+                warnings.append(Issue('Year "%s": is found in "%s": "%s"' % (
+                    year, key, value
+                ), 'year-in-field', key))
+            if publisher and key != 'publisher' and publisher in value:
+                warnings.append(Issue(
+                    'Publisher "%s" is found in "%s": "%s"' % (
+                        publisher, key, value
+                    ), 'publisher-in-field', key
+                ))
+            if not matched:
+                continue
+            for rule in self.rules:
+                if rule.fields is not None and key not in rule.fields:
+                    continue
+                match = rule.regex.search(value)
+                if match is not None:
+                    warnings.append(Issue(rule.message % {
+                        'field': key, 'value': value, 'match': match.group()
+                    }, rule.name, key))
+        return warnings
+
+
+BUILTIN_RULES = [
+    PatternRule('proc-abbreviation', r'proc\.',
+                '"proc." found in "%(field)s": "%(value)s"',
+                ignore_case=True),
+]
+_rules = list(BUILTIN_RULES)
+_scanner = None
+
+
+def register_pattern(name, pattern, message=None, fields=None,
+                     ignore_case=False):
+    """Warn about the required fields matching `pattern`, or only the
+    given `fields`. The warnings have the rule `name`, and `message`, see
+    `PatternRule`."""
+    global _scanner
+    _rules.append(PatternRule(name, pattern, message, fields, ignore_case))
+    _scanner = None
+
+
+def user_rules():
+    """The registered patterns, as JSON, to register them again in another
+    process with `set_user_rules`."""
+    return [rule.to_json() for rule in _rules[len(BUILTIN_RULES):]]
+
+
+def set_user_rules(rules):
+    global _scanner
+    del _rules[len(BUILTIN_RULES):]
+    for rule in rules:
+        _rules.append(PatternRule(*rule))
+    _scanner = None
+
+
+def scanner():
+    """The `FieldScanner` of the built-in and registered rules, compiled
+    once until a pattern is registered."""
+    global _scanner
+    if _scanner is None:
+        _scanner = FieldScanner(_rules)
+    return _scanner
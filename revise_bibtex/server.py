@@ -0,0 +1,178 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import sys
+
+from .api import revise
+from .core import _init_worker
+from .logger import logger
+from . import rules
+from . import titlecase
+
+
+_FLAGS = ('force', 'force_doi', 'single_brace', 'protect_words')
+_DUPLICATES = ('index', 'pairwise')
+
+
+class RequestError(ValueError):
+    """An invalid request, answered with a 400 status."""
+
+
+def _options(request):
+    if not isinstance(request.get('bib'), str):
+        raise RequestError('"bib" must be the text of a bib file')
+    options = {}
+    cited = request.get('cited')
+    if cited is not None:
+        if not isinstance(cited, list) or \
+                not all(isinstance(key, str) for key in cited):
+            raise RequestError('"cited" must be a list of keys')
+        options['cited'] = cited
+    for flag in _FLAGS:
+        if flag in request:
+            if not isinstance(request[flag], bool):
+                raise RequestError('"%s" must be true or false' % flag)
+            options[flag] = request[flag]
+    if 'duplicates' in request:
+        if request['duplicates'] not in _DUPLICATES:
+            raise RequestError('"duplicates" must be one of %s' %
+                               ', '.join(_DUPLICATES))
+        options['duplicates'] = request['duplicates']
+    return options
+
+
+def handle(request):
+    """Answer one request, a dict with the text of a bib file as "bib", and
+    optionally the other arguments of `revise`, and an "id" which is sent
+    back. The answer has the fields of `Result.to_dict`, and the normalized
+    bib file as "bib", or an "error".
+
+    Returns the status of the answer, as in HTTP, and the answer: 400 for an
+    invalid request, 500 for a failure of the validation itself."""
+    response = {'id': request.get('id')}
+    try:
+        options = _options(request)
+        result = revise(request['bib'], **options)
+        response.update(result.to_dict())
+        response['bib'] = result.to_bib()
+    except RequestError as error:
+        response['error'] = 'ValueError: %s' % error
+        return 400, response
+    except Exception as error:
+        response['error'] = '%s: %s' % (type(error).__name__, error)
+        return 500, response
+    return 200, response
+
+
+class Service:
+    """Runs the requests on a pool of `workers` processes (0 for all the
+    CPUs), which are started once and reused by all the requests. The rules
+    and protected terms registered before are registered in the workers
+    too, whatever the start method of the processes."""
+
+    def __init__(self, workers=0):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(
+            self.workers, initializer=_init_worker,
+            initargs=({}, rules.user_rules(),
+                      titlecase.user_protected_terms())
+        )
+
+    def submit(self, request):
+        return self.pool.submit(handle, request)
+
+    def close(self):
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def serve_lines(service, lines=None, out=None):
+    """Read one JSON request per line, and write one JSON answer per line,
+    in the order of the requests, with at most twice as many requests in
+    flight as there are workers."""
+    lines = sys.stdin if lines is None else lines
+    out = sys.stdout if out is None else out
+    pending = deque()
+
+    def flush(limit):
+        while len(pending) > limit:
+            _, response = pending.popleft().result()
+            out.write(json.dumps(response))
+            out.write('\n')
+        out.flush()
+
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('a request must be a JSON object')
+        except ValueError as error:
+            flush(0)
+            out.write(json.dumps({'id': None, 'error': 'ValueError: %s' %
+                                  error}))
+            out.write('\n')
+            continue
+        pending.append(service.submit(request))
+        flush(2 * service.workers - 1)
+    flush(0)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, value):
+        body = json.dumps(value).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self.send_json(404, {'error': 'not found'})
+        self.send_json(200, {'status': 'ok',
+                             'workers': self.server.service.workers})
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            if not isinstance(request, dict):
+                raise ValueError('a request must be a JSON object')
+        except ValueError as error:
+            return self.send_json(400, {'error': 'ValueError: %s' % error})
+        status, response = self.server.service.submit(request).result()
+        self.send_json(status, response)
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+def serve_http(service, host='127.0.0.1', port=8000):
+    """Answer POST requests, whose body is a JSON request, with the JSON
+    answer of `handle`, and GET /health, until interrupted."""
+    server = _HTTPServer((host, port), _RequestHandler)
+    server.service = service
+    logger.info('serving on http://%s:%d with %d workers...',
+                *server.server_address[:2], service.workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,310 @@
+import mmap
+import os
+import re
+import shutil
+import tempfile
+
+from bibtexparser.bibdatabase import BibDatabase, STANDARD_TYPES
+from bibtexparser.bparser import BibTexParser
+from bibtexparser.bwriter import BibTexWriter
+
+from .crossref import CrossrefGraph, split_xdata
+from .entry import Entry
+
+
+_BLOCK_START = re.compile(rb'@[ \t\r\n]*([A-Za-z]+)[ \t\r\n]*([{(])')
+_DELIMITERS = re.compile(rb'[{}()]')
+_KEY = re.compile(rb'[ \t\r\n]*([^ \t\r\n,]*)')
+# The crossref and xdata fields of an entry, their value is one key, or
+# several comma separated keys.
+_REFERENCE = re.compile(
+    rb'[ \t\r\n,](crossref|xdata)[ \t\r\n]*=[ \t\r\n]*'
+    rb'(?:\{([^{}]*)\}|"([^"]*)"|([^ \t\r\n,}"]+))',
+    re.IGNORECASE
+)
+_SPECIAL_TYPES = ('comment', 'preamble', 'string')
+# A field of an entry, name = value, where the value is braced, quoted, a
+# number or a @string name, or several of them joined by #.
+_VALUE = (rb'(?:\{(?:[^{}]|\{(?:[^{}]|\{[^{}]*\})*\})*\}'
+          rb'|"(?:[^"{}]|\{(?:[^{}]|\{[^{}]*\})*\})*"|[^\s,#{}()"]+)')
+_FIELD = re.compile(
+    rb'[ \t\r\n]*,?[ \t\r\n]*([A-Za-z][^ \t\r\n=,{}]*)[ \t\r\n]*='
+    rb'[ \t\r\n]*(' + _VALUE + rb'(?:[ \t\r\n]*#[ \t\r\n]*' + _VALUE +
+    rb')*)'
+)
+
+
+def iter_blocks(data, pos=0):
+    """Yield (block_type, start, end, body_start) for each @-block in the
+    bytes-like `data` after `pos`, the type is lower-cased (e.g. 'article',
+    'string')."""
+    size = len(data)
+    while True:
+        match = _BLOCK_START.search(data, pos)
+        if match is None:
+            return
+        parentheses = match.group(2) == b'('
+        depth = 0 if parentheses else 1
+        end = size
+        for delimiter in _DELIMITERS.finditer(data, match.end()):
+            char = delimiter.group()
+            if char == b'{':
+                depth += 1
+            elif char == b'}':
+                depth -= 1
+                if depth == 0 and not parentheses:
+                    end = delimiter.end()
+                    break
+            elif char == b')' and depth == 0 and parentheses:
+                end = delimiter.end()
+                break
+        yield match.group(1).decode('ascii').lower(), match.start(), end,\
+            match.end()
+        pos = end
+
+
+def is_entry_type(block_type, parser):
+    return block_type not in _SPECIAL_TYPES and (
+        block_type in STANDARD_TYPES or not parser.ignore_nonstandard_types
+    )
+
+
+def block_key(data, body_start):
+    return _KEY.match(data, body_start).group(1).decode('utf-8')
+
+
+def block_fields(data, body_start, end):
+    """The raw fields of the entry block, as {lower-cased name: text of
+    the value, with its braces or quotes}, without parsing it. The scan
+    stops at the first malformed field."""
+    fields = {}
+    pos = _KEY.match(data, body_start).end()
+    while True:
+        match = _FIELD.match(data, pos, end)
+        if match is None:
+            return fields
+        name = match.group(1).decode('utf-8').lower()
+        fields.setdefault(name, match.group(2).decode('utf-8'))
+        pos = match.end()
+
+
+def open_bib(bib_path):
+    """Memory-map a bib file, returns an empty bytes object for empty
+    files."""
+    with open(bib_path, 'rb') as fl:
+        if os.fstat(fl.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def make_parser(compact=False):
+    """A parser for several calls of `parse`, with `compact` it builds
+    `Entry` objects instead of dicts."""
+    parser = BibTexParser(customization=Entry if compact else None)
+    parser.expect_multiple_parse = True
+    return parser
+
+
+def parse_block(parser, text):
+    # The entries of the block, the comments and preambles parsed before it
+    # are kept, but not its own.
+    database = parser.bib_database
+    comments = len(database.comments)
+    preambles = len(database.preambles)
+    parser.parse(text)
+    entries = database.entries[:]
+    database.entries.clear()
+    del database.comments[comments:]
+    del database.preambles[preambles:]
+    return entries
+
+
+def iter_entries(bib_path, parser=None):
+    """Parse a bib file lazily, one entry at a time. @string definitions are
+    kept in the parser and interpolated in the following entries."""
+    if parser is None:
+        parser = make_parser()
+    data = open_bib(bib_path)
+    try:
+        for _, start, end, _ in iter_blocks(data):
+            yield from parse_block(parser, data[start:end].decode('utf-8'))
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def iter_entry_blocks(bib_path, parser):
+    """Yield (ID, text) for the entries of a bib file, without parsing them.
+    Everything else, the special blocks and the text in between, is parsed
+    by `parser`, which then holds the same comments, preambles and strings
+    as after parsing the whole file."""
+    data = open_bib(bib_path)
+    try:
+        pos = 0
+        for block_type, start, end, body in iter_blocks(data):
+            if not is_entry_type(block_type, parser):
+                continue
+            if start > pos:
+                parser.parse(data[pos:start].decode('utf-8'))
+            key = block_key(data, body)
+            yield key, data[start:end].decode('utf-8')
+            pos = end
+        if pos < len(data):
+            parser.parse(data[pos:].decode('utf-8'))
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def index_bib(bib_path, parser=None):
+    """Scan a bib file without fully parsing it.
+
+    Returns the IDs of its entries, in order, the `CrossrefGraph` of their
+    crossref and xdata fields, with the parsed entries they refer to, and a
+    dict with the (start, end) byte spans of the entries of each ID, in the
+    order of the file, there are several for duplicated IDs. Only the special
+    blocks, the comments between the blocks and the referred entries go
+    through the parser, which then holds the comments, preambles and strings
+    of the file.
+    """
+    if parser is None:
+        parser = make_parser()
+    ids = []
+    spans = {}
+    # The biblatex @xdata entries are not entries of their own, only the
+    # parents of the entries referring to them.
+    xdata_spans = {}
+    graph = CrossrefGraph()
+    data = open_bib(bib_path)
+    try:
+        pos = 0
+        for block_type, start, end, body in iter_blocks(data):
+            if data[pos:start].strip():
+                parser.parse(data[pos:start].decode('utf-8'))
+            pos = end
+            if block_type in _SPECIAL_TYPES:
+                parser.parse(data[start:end].decode('utf-8'))
+                continue
+            if block_type == 'xdata':
+                key = block_key(data, body)
+                xdata_spans.setdefault(key, (start, end))
+            elif not is_entry_type(block_type, parser):
+                continue
+            else:
+                key = block_key(data, body)
+                ids.append(key)
+                spans.setdefault(key, []).append((start, end))
+            crossref = xdata = None
+            for match in _REFERENCE.finditer(data, body, end):
+                keys = split_xdata(b''.join(match.groups(b'')[1:]).decode(
+                    'utf-8'))
+                if match.group(1).lower() == b'crossref':
+                    crossref = crossref or keys[:1]
+                else:
+                    xdata = xdata or keys
+            if crossref or xdata:
+                graph.add_references(key, crossref[0] if crossref else None,
+                                     xdata or ())
+        if data[pos:].strip():
+            parser.parse(data[pos:].decode('utf-8'))
+        for key in graph.needed():
+            span = spans[key][0] if key in spans else xdata_spans.get(key)
+            if span is None:
+                continue
+            ignore = parser.ignore_nonstandard_types
+            parser.ignore_nonstandard_types = ignore and key in spans
+            try:
+                for entry in parse_block(
+                        parser, data[span[0]:span[1]].decode('utf-8')):
+                    graph.add_parent(entry)
+            finally:
+                parser.ignore_nonstandard_types = ignore
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+    return ids, graph, spans
+
+
+def rewrite_bib(bib_path, out_path, spans, entries):
+    """Write a copy of a bib file where the entries given as a dict by ID
+    are rendered again, at their (start, end) byte spans from `index_bib`.
+    The entries of a duplicated ID are given by (ID, number), the number
+    counting its entries from 0 in the order of the file. Everything else is
+    copied verbatim, so the cost of the rendering is proportional to the
+    number of changed entries. The output replaces `out_path` atomically,
+    which can then be `bib_path` itself.
+
+    An entry whose rendering is the same as its text is copied too, the
+    validation may change an entry without changing how it is written, e.g.
+    the braces of its title. Returns the number of rewritten entries, the
+    bib file itself is not written again when there are none."""
+    writer = BibTexWriter()
+    writer.contents = ['entries']
+    database = BibDatabase()
+    data = open_bib(bib_path)
+    view = memoryview(data)
+    try:
+        changes = []
+        for key, entry in entries.items():
+            key, number = key if isinstance(key, tuple) else (key, 0)
+            start, end = spans[key][number]
+            database.entries = [entry]
+            text = writer.write(database).rstrip('\n').encode('utf-8')
+            if view[start:end] != text:
+                changes.append((start, end, text))
+        changes.sort(key=lambda change: change[0])
+        if not changes and os.path.exists(out_path) and \
+                os.path.samefile(bib_path, out_path):
+            return 0
+        directory = os.path.dirname(os.path.abspath(out_path))
+        fd, temp_path = tempfile.mkstemp(
+            dir=directory, prefix='.%s.' % os.path.basename(out_path)
+        )
+        try:
+            with os.fdopen(fd, 'wb', buffering=1 << 20) as fl:
+                pos = 0
+                for start, end, text in changes:
+                    fl.write(view[pos:start])
+                    fl.write(text)
+                    pos = end
+                fl.write(view[pos:])
+                fl.flush()
+                os.fsync(fl.fileno())
+            shutil.copymode(
+                out_path if os.path.exists(out_path) else bib_path, temp_path
+            )
+            os.replace(temp_path, out_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    finally:
+        view.release()
+        if isinstance(data, mmap.mmap):
+            data.close()
+    return len(changes)
+
+
+class EntryWriter:
+    """Write entries one by one, formatted as `bibtexparser.dump` does, after
+    the comments, preambles and strings of `database`."""
+
+    def __init__(self, fl, database=None):
+        self.fl = fl
+        self.writer = BibTexWriter()
+        self.writer.contents = ['entries']
+        self._database = BibDatabase()
+        self._first = True
+        if database is not None:
+            header = BibTexWriter()
+            header.contents = ['comments', 'preambles', 'strings']
+            text = header.write(database).rstrip('\n')
+            if text:
+                fl.write(text + '\n')
+                self._first = False
+
+    def write(self, entry):
+        self._database.entries = [entry]
+        if not self._first:
+            self.fl.write(self.writer.entry_separator)
+        self.fl.write(self.writer.write(self._database))
+        self._first = False
@@ -0,0 +1,84 @@
+import functools
+import re
+
+from .utils import trim
+
+
+# The proper nouns of the titles of computer science papers, which cannot be
+# told apart from the other capitalized words, as the acronyms can. They are
+# written as here, whatever their case in the title.
+PROTECTED_TERMS = [
+    'Bayes', 'Bayesian', 'Bellman', 'Bernoulli', 'Boolean', 'Carlo',
+    'Dirichlet', 'Euclidean', 'Fourier', 'Gaussian', 'Gibbs', 'Hamiltonian',
+    'Hessian', 'Hilbert', 'Hopfield', 'Jacobian', 'Kalman', 'Kullback',
+    'Lagrangian', 'Langevin', 'Laplace', 'Laplacian', 'Leibler', 'Lipschitz',
+    'Lyapunov', 'Markov', 'Markovian', 'Monte', 'Nash', 'Newton', 'Pareto',
+    'Poisson', 'Riemannian', 'Shapley', 'Turing', 'Wasserstein', 'Wiener',
+    'Arabic', 'Chinese', 'English', 'French', 'German', 'Japanese',
+    'Spanish', 'Android', 'GitHub', 'ImageNet', 'Java', 'JavaScript', 'Linux',
+    'PyTorch', 'Python', 'TensorFlow', 'Twitter', 'Wikipedia', 'YouTube',
+]
+_terms = {term.lower(): term for term in PROTECTED_TERMS}
+_user_terms = []
+
+# A title split in the words and math of a title, at the odd positions, and
+# the spaces and punctuation between them.
+_TOKEN = re.compile(r'(\$[^$]*\$|[^\s\-/:;,!?()\[\]$]+)')
+# A word with braces in the original title, protected by the author.
+_BRACED = re.compile(r'[^\s{}\-/:;,!?()\[\]$]*\{[^{}\s]*\}'
+                     r'[^\s{}\-/:;,!?()\[\]$]*')
+# The suffixes of the terms, e.g. "Gaussians" or "Markov's".
+_SUFFIX = re.compile(r"(?:'s|s)?\.?$")
+
+
+def register_protected_terms(terms):
+    """Protect these words in the titles, written as given, e.g. "LaTeX"
+    or "CO2"."""
+    for term in terms:
+        _user_terms.append(term)
+        _terms[term.lower()] = term
+    protect_word.cache_clear()
+
+
+def user_protected_terms():
+    """The registered terms, to register them again in another process with
+    `set_user_protected_terms`."""
+    return list(_user_terms)
+
+
+def set_user_protected_terms(terms):
+    del _user_terms[:]
+    _terms.clear()
+    _terms.update((term.lower(), term) for term in PROTECTED_TERMS)
+    register_protected_terms(terms)
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def protect_word(word):
+    """The word, in braces if BibTeX styles should keep its case: a known
+    term, written as registered, a word with a capital letter other than
+    its first one, as "BERT", "iPhone" or "CO2", or math with a capital
+    letter. The words of a bibliography repeat a lot, they are memoized."""
+    if word.startswith('$'):
+        return '{%s}' % word if word != word.lower() else word
+    suffix = _SUFFIX.search(word).group()
+    for bare, rest in ((word.rstrip('.'), word[len(word.rstrip('.')):]),
+                       (word[:len(word) - len(suffix)], suffix)):
+        term = _terms.get(bare.lower())
+        if term is not None:
+            return '{%s}%s' % (term, rest)
+    if word[1:] != word[1:].lower():
+        return '{%s}' % word
+    return word
+
+
+def protect_title(title):
+    """The title without its braces, but around the words whose case is
+    kept, see `protect_word`, and the words in braces in `title`, unless
+    the braces hold several words, as a title in double braces."""
+    kept = set(word for braced in _BRACED.findall(title)
+               for word in _TOKEN.split(trim(braced))[1::2])
+    parts = _TOKEN.split(trim(title))
+    parts[1::2] = ['{%s}' % word if word in kept else protect_word(word)
+                   for word in parts[1::2]]
+    return ''.join(parts)
@@ -1,11 +1,18 @@
-import pylcs
-from sklearn.feature_extraction import _stop_words as stop_words
+from .stop_words import ENGLISH_STOP_WORDS
 
 
 def warn(*args, highlight=1):
     print('\033[%dm%s\033[39m' % (30 + highlight, ' '.join(args)))
 
 
+def copy_to_clipboard(text):
+    import pyperclip
+    try:
+        pyperclip.copy(text)
+    except pyperclip.PyperclipException:
+        pass  # e.g. no clipboard on headless machines
+
+
 def print_entry_dict_as_bib(entry, print_fn=None, braces=True):
     keys = list(entry.keys())
     ordered_keys = ['ENTRYTYPE', 'ID', 'title']
@@ -93,43 +100,9 @@ def trim(string):
     return string
 
 
-def remove_umlauts(string):
-    # TODO: Add more patterns
-    patterns = {
-        "ä": '\\"a',
-        "ü": '\\"u',
-        "ö": '\\"o',
-        "Ä": '\\"A',
-        "Ü": '\\"U',
-        "Ö": '\\"O',
-        "é": "\\'e",
-        "ă": "\\ua",
-        "á": "\\'a",
-        "ò": "\\`{o}",
-        "ó": "\\'{o}",
-        "ô": "\\^{o}",
-        "ő": "\\H{o}",
-        "õ": "\\~{o}",
-        "ç": "\\c{c}",
-        "ą": "\\k{a}",
-        "ł": "\\l{} ",
-        "ō": "\\={o}",
-        "ȯ": "\\.{o}",
-        "ụ": "\\d{u}",
-        "å": "\\r{a}",
-        "ŏ": "\\u{o}",
-        "š": "\\v{s}",
-        "ø": "\\o{}",
-        "ı": "{\\i}",
-        "o͡o": "\\t{oo}",
-    }
-    for k, v in patterns.items():
-        string = string.replace(k, v)
-    return string
-
-
-def isclose(a, b):
-    return pylcs.lcs(a.lower(), b.lower()) / max(len(a), len(b)) > 0.95
+def isclose(a, b, threshold=0.95):
+    import pylcs
+    return pylcs.lcs(a.lower(), b.lower()) / max(len(a), len(b)) > threshold
 
 
 def non_capitalized_words(title):
@@ -137,10 +110,10 @@ def non_capitalized_words(title):
     for word in [
             word.strip().replace('"', '').replace(",", '').replace(":", '')
             for word in title.split()
-            if word.lower() not in stop_words.ENGLISH_STOP_WORDS
+            if word.lower() not in ENGLISH_STOP_WORDS
             ]:
         words.extend(word.split('-'))
     non_capitalized = list(filter(
         lambda x: (x != x.capitalize() and x != x.upper() and
-                   x.lower() not in stop_words.ENGLISH_STOP_WORDS), words))
+                   x.lower() not in ENGLISH_STOP_WORDS), words))
     return non_capitalized
@@ -0,0 +1,445 @@
+import json
+import os
+import socketserver
+import threading
+import time
+
+from .citations import read_citation_keys
+from .core import validate_entry
+from .crossref import CrossrefGraph, inherit, split_xdata
+from .duplicates import TitleIndex, token_frequencies
+from .logger import logger
+from .stream import (
+    block_key, is_entry_type, iter_blocks, make_parser, parse_block
+)
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # polling is used instead
+    INotify = None
+
+
+_CHUNK = 1 << 16
+
+
+def _common_prefix(a, b, limit):
+    # Compare whole chunks first so that the loop runs in C over the equal
+    # bytes, then bisect the chunk that differs.
+    pos = 0
+    while pos < limit:
+        end = min(pos + _CHUNK, limit)
+        if a[pos:end] != b[pos:end]:
+            low, high = pos, end
+            while high - low > 1:
+                mid = (low + high) // 2
+                if a[low:mid] == b[low:mid]:
+                    low = mid
+                else:
+                    high = mid
+            return low
+        pos = end
+    return limit
+
+
+def _common_suffix(a, b, limit):
+    size_a, size_b = len(a), len(b)
+    pos = 0
+    while pos < limit:
+        end = min(pos + _CHUNK, limit)
+        if a[size_a - end:size_a - pos] != b[size_b - end:size_b - pos]:
+            low, high = pos, end
+            while high - low > 1:
+                mid = (low + high) // 2
+                if a[size_a - mid:size_a - low] == \
+                        b[size_b - mid:size_b - low]:
+                    low = mid
+                else:
+                    high = mid
+            return low
+        pos = end
+    return limit
+
+
+class _Block:
+    __slots__ = ('type', 'start', 'end', 'key', 'entry', 'warnings')
+
+    def __init__(self, block_type, start, end, key=None):
+        self.type = block_type
+        self.start = start
+        self.end = end
+        self.key = key
+        self.entry = None
+        self.warnings = []
+
+
+class Watcher:
+    """Keeps a bib file parsed and validated in memory, and revalidates
+    only the entries whose text changed when `refresh` is called, and the
+    entries inheriting their fields through crossref or xdata."""
+
+    def __init__(self, bib_path, bbl_paths=(), force=True, force_doi=False,
+                 single_brace=False, protect_words=False):
+        self.bib_path = bib_path
+        self.bbl_paths = list(bbl_paths)
+        self.options = dict(force=force, force_doi=force_doi,
+                            single_brace=single_brace,
+                            protect_words=protect_words)
+        self.lock = threading.RLock()
+        self.data = None
+        self.cited = None
+
+    def _read_citations(self):
+        self.cited = read_citation_keys(self.bbl_paths) \
+            if self.bbl_paths else None
+        if self.cited is not None and '*' in self.cited:
+            self.cited = None
+
+    def is_cited(self, key):
+        return self.cited is None or key in self.cited
+
+    def _parse_text(self, block):
+        # The @xdata blocks are parsed, as parents, by the same parser.
+        text = self.data[block.start:block.end].decode('utf-8')
+        ignore = self.parser.ignore_nonstandard_types
+        self.parser.ignore_nonstandard_types = False
+        try:
+            return parse_block(self.parser, text)
+        finally:
+            self.parser.ignore_nonstandard_types = ignore
+
+    def _parse(self, block):
+        # The entry is validated by `_check`, once all the blocks are parsed.
+        if block.type == 'string':
+            parse_block(self.parser,
+                        self.data[block.start:block.end].decode('utf-8'))
+            return
+        if block.type == 'xdata':
+            entries = self._parse_text(block)
+            if entries:
+                block.key = entries[0]['ID']
+                if block.key not in self.xdata:
+                    self.xdata[block.key] = block
+                    self.graph.add_parent(entries[0])
+            return
+        if not is_entry_type(block.type, self.parser):
+            return
+        entries = self._parse_text(block)
+        if not entries:
+            return
+        block.entry = entries[0]
+        block.key = block.entry['ID']
+        self.by_key[block.key] = block
+        crossref = block.entry.get('crossref')
+        xdata = split_xdata(block.entry.get('xdata', ''))
+        self.graph.add_references(block.key, crossref, xdata)
+        for parent in ([crossref] if crossref else []) + xdata:
+            self.children.setdefault(parent, set()).add(block.key)
+
+    def _inherited(self, key):
+        # The entries are changed by their validation, the parents are
+        # parsed again from their text, once until they change.
+        pending = [key]
+        seen = set(pending)
+        while pending:
+            crossref, xdata = self.graph.references.get(pending.pop(),
+                                                        (None, ()))
+            for parent in ([crossref] if crossref else []) + list(xdata):
+                if parent in seen:
+                    continue
+                seen.add(parent)
+                pending.append(parent)
+                block = self.by_key.get(parent)
+                if block is not None and parent not in self.graph.parents:
+                    for entry in self._parse_text(block):
+                        self.graph.add_parent(entry)
+        return self.graph.inherited(key)
+
+    def _check(self, block):
+        if block.entry is None:
+            return
+        issues = []
+        if block.key in self.graph:
+            fields, issues = self._inherited(block.key)
+            inherit(block.entry, fields)
+        block.warnings = issues + validate_entry(block.entry, **self.options)
+
+    def _add(self, block, report):
+        if block.entry is None:
+            return
+        if 'title' not in block.entry:
+            return
+        matches = self.index.query(block.entry['title'])
+        self.duplicates[block] = set(matches)
+        for match in matches:
+            self.duplicates[match].add(block)
+            if report and self.is_cited(block.key) and \
+                    self.is_cited(match.key):
+                logger.warning(
+                    '%s and %s seem to be the same citation, with '
+                    'different IDs', block.key, match.key, highlight=2
+                )
+        self.index.add(block, block.entry['title'])
+
+    def _remove(self, block):
+        if block.key is not None and (self.by_key.get(block.key) is block or
+                                      self.xdata.get(block.key) is block):
+            self.by_key.pop(block.key, None)
+            self.xdata.pop(block.key, None)
+            crossref, xdata = self.graph.references.get(block.key,
+                                                        (None, ()))
+            for parent in ([crossref] if crossref else []) + list(xdata):
+                self.children.get(parent, set()).discard(block.key)
+            self.graph.discard(block.key)
+        if block in self.index:
+            self.index.remove(block)
+        for match in self.duplicates.pop(block, ()):
+            self.duplicates[match].discard(block)
+
+    def _load(self, data):
+        self.data = data
+        self.parser = make_parser(compact=True)
+        self.graph = CrossrefGraph()
+        self.by_key = {}
+        self.xdata = {}
+        self.children = {}
+        self.blocks = [
+            _Block(block_type, start, end,
+                   block_key(data, body)
+                   if is_entry_type(block_type, self.parser) else None)
+            for block_type, start, end, body in iter_blocks(data)
+        ]
+        for block in self.blocks:
+            self._parse(block)
+        for block in self.blocks:
+            self._check(block)
+        self.index = TitleIndex(frequencies=token_frequencies(
+            block.entry['title'] for block in self.blocks
+            if block.entry is not None and 'title' in block.entry
+        ))
+        self.duplicates = {}
+        for block in self.blocks:
+            self._add(block, report=False)
+        return self.blocks
+
+    def _update(self, data):
+        old = self.data
+        size = min(len(old), len(data))
+        prefix = _common_prefix(old, data, size)
+        suffix = _common_suffix(old, data, size - prefix)
+        shift = len(data) - len(old)
+        changed_end = len(old) - suffix
+
+        first = 0
+        while first < len(self.blocks) and self.blocks[first].end <= prefix:
+            first += 1
+        last = first
+        while last < len(self.blocks) and \
+                self.blocks[last].start < changed_end:
+            last += 1
+        tail = {self.blocks[i].start + shift: i
+                for i in range(last, len(self.blocks))}
+
+        pos = self.blocks[first - 1].end if first else 0
+        new_blocks = []
+        resume = len(self.blocks)
+        for block_type, start, end, body in iter_blocks(data, pos):
+            if start >= changed_end + shift and start in tail:
+                resume = tail[start]
+                break
+            new_blocks.append(_Block(
+                block_type, start, end,
+                block_key(data, body)
+                if is_entry_type(block_type, self.parser) else None
+            ))
+        old_blocks = self.blocks[first:resume]
+        if any(block.type == 'string' for block in old_blocks + new_blocks):
+            logger.info('@string definitions changed, reloading...')
+            for block in self._load(data):
+                self._report(block)
+            return sum(block.entry is not None for block in self.blocks)
+
+        for block in self.blocks[resume:]:
+            block.start += shift
+            block.end += shift
+        self.data = data
+        self.blocks[first:resume] = new_blocks
+        for block in old_blocks:
+            self._remove(block)
+        for block in new_blocks:
+            self._parse(block)
+        # The entries inheriting from a changed entry, directly or not, are
+        # validated again too.
+        pending = [block.key for block in old_blocks + new_blocks
+                   if block.key is not None]
+        seen = set(pending)
+        revalidated = set(new_blocks)
+        dependents = []
+        while pending:
+            for child in self.children.get(pending.pop(), ()):
+                if child in seen:
+                    continue
+                seen.add(child)
+                pending.append(child)
+                block = self.by_key.get(child)
+                if block is not None and block not in revalidated:
+                    revalidated.add(block)
+                    dependents.append(block)
+        for block in dependents:
+            self._remove(block)
+            self._parse(block)
+        for block in new_blocks + dependents:
+            self._check(block)
+            self._report(block)
+            self._add(block, report=True)
+        return sum(block.entry is not None
+                   for block in new_blocks + dependents)
+
+    def _report(self, block):
+        if block.entry is None or not self.is_cited(block.key):
+            return
+        for warning in block.warnings:
+            logger.warning('%s: %s', block.key, warning, highlight=3)
+
+    def refresh(self, changed=None):
+        """Re-read the files, all of them or the `changed` paths, and
+        revalidate the entries that changed since the last call."""
+        start = time.perf_counter()
+        with self.lock:
+            if changed is None or set(changed) & set(self.bbl_paths):
+                self._read_citations()
+            if changed is not None and self.bib_path not in changed:
+                return
+            with open(self.bib_path, 'rb') as fl:
+                data = fl.read()
+            if self.data is None:
+                for block in self._load(data):
+                    self._report(block)
+                count = None
+            elif data == self.data:
+                return
+            else:
+                count = self._update(data)
+            entries = sum(block.entry is not None for block in self.blocks)
+            if count is None:
+                count = entries
+        logger.info('%d of %d entries revalidated in %.1f ms', count,
+                    entries, (time.perf_counter() - start) * 1000)
+
+    def query(self, key):
+        with self.lock:
+            block = self.by_key.get(key)
+            if block is None or block.entry is None:
+                return {'key': key, 'found': False}
+            return {
+                'key': key,
+                'found': True,
+                'cited': self.is_cited(key),
+                'warnings': list(block.warnings),
+                'duplicates': sorted(match.key for match in
+                                     self.duplicates.get(block, ())),
+            }
+
+    def summary(self):
+        with self.lock:
+            return {block.key: list(block.warnings) for block in self.blocks
+                    if block.warnings and self.is_cited(block.key)}
+
+
+class _QueryHandler(socketserver.StreamRequestHandler):
+    # One request per line, either a key or a JSON object with "key", or
+    # with "command": "summary", answered by one JSON line.
+    def handle(self):
+        for line in self.rfile:
+            line = line.decode('utf-8').strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line) if line.startswith('{') else \
+                    {'key': line}
+                if request.get('command') == 'summary':
+                    response = self.server.watcher.summary()
+                else:
+                    response = self.server.watcher.query(request['key'])
+            except (ValueError, KeyError) as error:
+                response = {'error': 'invalid request: %s' % error}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+def serve(watcher, socket_path):
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = socketserver.ThreadingUnixStreamServer(socket_path,
+                                                    _QueryHandler)
+    server.daemon_threads = True
+    server.watcher = watcher
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def iter_changes(paths, interval=0.5):
+    """Yield the sets of paths that changed, using inotify if the
+    inotify_simple package is installed, polling them otherwise."""
+    paths = [os.path.abspath(path) for path in paths]
+    if INotify is not None:
+        inotify = INotify()
+        watches = {}
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+        for directory in set(os.path.dirname(path) for path in paths):
+            watches[inotify.add_watch(directory, mask)] = directory
+        while True:
+            events = inotify.read()
+            # Editors and latexmk write in bursts, wait for them to settle.
+            events += inotify.read(timeout=int(interval * 1000))
+            changed = set(
+                os.path.join(watches[event.wd], event.name) for event in events
+            ) & set(paths)
+            if changed:
+                yield changed
+
+    def stat(path):
+        try:
+            result = os.stat(path)
+        except OSError:
+            return None
+        return result.st_mtime_ns, result.st_size
+
+    states = {path: stat(path) for path in paths}
+    while True:
+        time.sleep(interval)
+        changed = set()
+        for path in paths:
+            state = stat(path)
+            if state != states[path]:
+                states[path] = state
+                changed.add(path)
+        if changed:
+            yield changed
+
+
+def watch_bibs(bib_path, bbl_path=None, force=True, force_doi=False,
+               single_brace=False, protect_words=False, socket_path=None,
+               interval=0.5):
+    if isinstance(bbl_path, str):
+        bbl_path = [bbl_path]
+    bib_path = os.path.abspath(bib_path)
+    bbl_paths = [os.path.abspath(path) for path in bbl_path or []]
+    watcher = Watcher(bib_path, bbl_paths, force=force, force_doi=force_doi,
+                      single_brace=single_brace, protect_words=protect_words)
+    watcher.refresh()
+    server = None
+    if socket_path is not None:
+        server = serve(watcher, socket_path)
+        logger.info('answering queries on "%s"', socket_path)
+    logger.info('watching "%s" ...', bib_path, highlight=4)
+    try:
+        for changed in iter_changes([bib_path] + bbl_paths, interval):
+            watcher.refresh(changed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            os.remove(socket_path)
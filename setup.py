@@ -6,7 +6,6 @@ VERSION = __import__('revise_bibtex').__version__
 install_requires = [
     'bibtexparser>=1.2',
     'pyperclip>=1.8',
-    'scikit-learn>=1.0',
     'pylcs>=0.0.6',
 ]
 
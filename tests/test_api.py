@@ -0,0 +1,86 @@
+import bibtexparser
+
+from revise_bibtex import server
+from revise_bibtex.api import revise
+from revise_bibtex.stream import make_parser
+
+
+BIB = '''
+@article{first,
+  title = {Learning Sparse Graphs},
+  author = {Ann Smith and Bob Jones},
+  journal = {Journal of Graphs},
+  year = {2020},
+}
+
+@article{second,
+  title = {Learning Sparse Graph},
+  author = {Ann Smith and Bob Jones},
+  journal = {Journal of Graphs},
+  year = {2020},
+}
+
+@misc{untitled,
+  author = {Ann Smith},
+}
+'''
+
+
+def test_cited_entries():
+    result = revise(BIB)
+    assert [entry['ID'] for entry in result.entries] == \
+        ['first', 'second', 'untitled']
+    assert result.duplicates == [('second', 'first')]
+    assert [entry['ID'] for entry in revise(BIB, cited=['*']).entries] == \
+        ['first', 'second', 'untitled']
+    result = revise(BIB, cited=['second', 'other'])
+    assert [entry['ID'] for entry in result.entries] == ['second']
+    assert result.missing == ['other']
+    assert revise(BIB, cited=[]).entries == []
+
+
+def test_handle_statuses(monkeypatch):
+    status, response = server.handle({'id': 7, 'bib': BIB})
+    assert status == 200 and response['id'] == 7
+    assert '@article{first' in response['bib']
+    for request in [{}, {'bib': 1}, {'bib': BIB, 'cited': 'first'},
+                    {'bib': BIB, 'force': 'yes'},
+                    {'bib': BIB, 'duplicates': 'other'}]:
+        status, response = server.handle(request)
+        assert status == 400 and 'error' in response
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('broken')
+
+    monkeypatch.setattr(server, 'revise', fail)
+    status, response = server.handle({'bib': BIB})
+    assert status == 500
+    assert response['error'] == 'RuntimeError: broken'
+
+
+def test_text_and_entries_are_filtered_alike():
+    bib = BIB + '''
+@xdata{shared,
+  journal = {Journal of Graphs},
+}
+
+@online{site,
+  title = {A Web Site},
+}
+
+@article{third,
+  title = {Counting Trees},
+  xdata = {shared},
+}
+'''
+    parser = make_parser()
+    parser.ignore_nonstandard_types = False
+    entries = bibtexparser.loads(bib, parser=parser).entries
+    from_text = revise(bib)
+    from_entries = revise(entries)
+    assert [entry['ID'] for entry in from_text.entries] == \
+        ['first', 'second', 'untitled', 'third']
+    assert from_entries.entries == from_text.entries
+    assert from_entries.warnings == from_text.warnings
+    assert from_entries.missing == from_text.missing == []
+    assert revise(entries, cited=['site']).missing == ['site']
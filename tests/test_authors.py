@@ -0,0 +1,69 @@
+import json
+
+from revise_bibtex.authors import AuthorIndex, Name, split_authors
+from revise_bibtex.core import validate_bibs
+
+
+def test_split_authors():
+    names = split_authors(r'M{\"u}ller, J. and Ludwig van Beethoven and '
+                          r'Smith, Jr, John and others and Plato')
+    assert [name.form for name in names] == \
+        ['J. Müller', 'Ludwig van Beethoven', 'John Smith, Jr']
+    assert [name.surname for name in names] == \
+        ['Müller', 'van Beethoven', 'Smith']
+
+
+def test_compatible_names():
+    def compatible(first, second):
+        return Name.parse(first).compatible(Name.parse(second))
+
+    assert compatible('J. Smith', 'John Smith')
+    assert compatible('John Smith', 'John A. Smith')
+    assert compatible('J. A. Smith', 'John Andrew Smith')
+    assert compatible('Jean-Pierre Dupont', 'J.-P. Dupont')
+    assert compatible('Kurt Gödel', 'Kurt Godel')
+    assert not compatible('John Smith', 'Jane Smith')
+    assert not compatible('A. John Smith', 'John Smith')
+    assert not compatible('John Smith', 'John Smyth')
+
+
+def test_conflicts():
+    index = AuthorIndex()
+    index.add('a', 'John A. Smith and Jane Doe')
+    index.add('b', 'J. Smith and J. Doe')
+    index.add('c', 'John Smith and Jane Doe')
+    index.add('d', 'Jean-Pierre Dupont')
+    index.add('e', 'J.-P. Dupont and Jane Smith')
+    # "J. Smith" can be John as well as Jane, it is left alone.
+    assert sorted(index.conflicts()) == [
+        ('Jane Doe', {'Jane Doe': ['a', 'c'], 'J. Doe': ['b']}),
+        ('Jean-Pierre Dupont', {'Jean-Pierre Dupont': ['d'],
+                                'J.-P. Dupont': ['e']}),
+        ('John A. Smith', {'John A. Smith': ['a'], 'John Smith': ['c']}),
+    ]
+
+
+def test_author_variants_are_reported(tmp_path):
+    bib = tmp_path / 'refs.bib'
+    bib.write_text('''@article{first,
+  title = {A First Title},
+  author = {G{\\"o}del, Kurt and Ann Smith},
+  year = {2020},
+}
+
+@article{second,
+  title = {A Second Title},
+  author = {K. G{\\"o}del},
+  year = {2021},
+}
+''')
+    report = tmp_path / 'report.jsonl'
+    validate_bibs(str(bib), None, str(tmp_path / 'out.bib'), skip=True,
+                  no_logs=True, authors=True, report_file=str(report))
+    with open(report) as fl:
+        records = [json.loads(line) for line in fl]
+    assert [record for record in records
+            if record['rule'] == 'author-variant'] == [{
+                'id': 'second', 'rule': 'author-variant', 'field': 'author',
+                'message': 'author "K. Gödel" is also written "Kurt Gödel"'
+            }]
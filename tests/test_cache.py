@@ -0,0 +1,55 @@
+import sqlite3
+
+from revise_bibtex.cache import Cache
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    with Cache(path) as cache:
+        assert cache.get('a') is None
+        cache.put('a', {'entry': ['x', 1]})
+        cache.commit()
+        assert cache.get('a') == {'entry': ['x', 1]}
+    with Cache(path) as cache:
+        assert cache.get('a') == {'entry': ['x', 1]}
+        assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_eviction(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    with Cache(path, max_size=2) as cache:
+        for key in 'abc':
+            cache.put(key, key)
+    with Cache(path) as cache:
+        assert [cache.get(key) for key in 'abc'].count(None) == 1
+
+
+def test_concurrent_writers(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    first = Cache(path, timeout=1)
+    second = Cache(path, timeout=1)
+    for number in range(10):
+        first.put('first%d' % number, number)
+        first.commit()
+        second.put('second%d' % number, number)
+        second.commit()
+    assert first.get('second9') == 9
+    assert second.get('first9') == 9
+    first.close()
+    second.close()
+    assert not first.disabled and not second.disabled
+
+
+def test_locked_file_disables_the_cache(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = Cache(path, timeout=0.1)
+    cache.put('a', 1)
+    cache.commit()
+    other = sqlite3.connect(path)
+    other.execute('BEGIN EXCLUSIVE')
+    cache.put('b', 2)
+    assert cache.disabled
+    assert cache.get('a') is None
+    cache.close()
+    other.rollback()
+    other.close()
@@ -0,0 +1,83 @@
+from revise_bibtex.citations import read_citation_keys
+
+
+def write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_bbl_keys_of_bibtex_and_biblatex(tmp_path):
+    bibtex = write(tmp_path / 'bibtex.bbl', r'''\begin{thebibliography}{2}
+\bibitem{first}
+A. Author.
+\bibitem[{Smith et~al.(2020)}]{second}
+B. Author.
+\bibitem{first}
+\end{thebibliography}
+''')
+    biblatex = write(tmp_path / 'biblatex.bbl', r'''\refsection{0}
+  \entry{third}{article}{}
+    \name{author}{1}{}{}
+  \endentry
+  \entry{second}{book}{}
+  \endentry
+\endrefsection
+''')
+    assert list(read_citation_keys([bibtex, biblatex])) == \
+        ['first', 'second', 'third']
+
+
+def test_aux_keys_follow_the_included_files(tmp_path):
+    (tmp_path / 'chapter.aux').write_text(
+        '\\citation{c}\n\\abx@aux@cite{0}{d}\n'
+    )
+    main = write(tmp_path / 'main.aux', r'''\relax
+\citation{a,b}
+\@input{chapter.aux}
+\citation{a}
+\abx@aux@cite{e}
+\@input{missing.aux}
+''')
+    assert list(read_citation_keys([main])) == ['a', 'b', 'c', 'd', 'e']
+
+
+def test_nocite_all_in_aux(tmp_path):
+    main = write(tmp_path / 'main.aux', '\\citation{*}\n\\citation{a}\n')
+    assert list(read_citation_keys([main])) == ['*', 'a']
+
+
+def test_tex_citation_commands(tmp_path):
+    main = write(tmp_path / 'main.tex', r'''\documentclass{article}
+\begin{document}
+See \cite{a}, \citep*[see][p.~5]{b, c} and \parencite[5]{d}.
+\textcite{e} % \cite{commented}
+50\% of \Citeauthor{f}.
+\cites[5]{g}[7]{h}
+\nocite{*}
+\begin{comment}
+\cite{also-commented}
+\end{comment}
+\cite{a}
+\end{document}
+''')
+    assert list(read_citation_keys([main])) == \
+        ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', '*']
+
+
+def test_tex_follows_the_included_files_in_order(tmp_path):
+    chapters = tmp_path / 'chapters'
+    chapters.mkdir()
+    (chapters / 'one.tex').write_text(
+        '\\cite{c}\n\\input{chapters/nested}\n\\cite{e}\n'
+    )
+    (chapters / 'nested.tex').write_text('\\cite{d}\n')
+    (tmp_path / 'two.tex').write_text('\\cite{f}\n\\input{main}\n')
+    main = write(tmp_path / 'main.tex', r'''\cite{a}
+\input{chapters/one}
+%\include{two}
+\cite{b}
+\include{two}
+\input missing
+''')
+    assert list(read_citation_keys([main])) == \
+        ['a', 'c', 'd', 'e', 'b', 'f']
@@ -0,0 +1,61 @@
+from revise_bibtex.crossref import CrossrefGraph, inherit
+
+
+def graph_of(*entries):
+    return CrossrefGraph.from_entries([dict(entry) for entry in entries])
+
+
+PROCEEDINGS = {'ID': 'proc', 'ENTRYTYPE': 'proceedings',
+               'title': 'Proceedings of ICML', 'publisher': 'PMLR',
+               'year': '2020'}
+
+
+def test_crossref_fields_are_inherited():
+    paper = {'ID': 'paper', 'ENTRYTYPE': 'inproceedings', 'title': 'A Paper',
+             'crossref': 'proc', 'year': '2021'}
+    graph = graph_of(paper, PROCEEDINGS)
+    fields, issues = graph.inherited('paper')
+    assert issues == []
+    inherit(paper, fields)
+    # The title of the proceedings is the booktitle of the paper, and the
+    # fields of the paper are kept.
+    assert paper['booktitle'] == 'Proceedings of ICML'
+    assert paper['title'] == 'A Paper'
+    assert paper['publisher'] == 'PMLR'
+    assert paper['year'] == '2021'
+
+
+def test_xdata_comes_before_crossref():
+    paper = {'ID': 'paper', 'ENTRYTYPE': 'inproceedings', 'title': 'A Paper',
+             'crossref': 'proc', 'xdata': 'acm, nyc'}
+    acm = {'ID': 'acm', 'ENTRYTYPE': 'xdata', 'publisher': 'ACM'}
+    nyc = {'ID': 'nyc', 'ENTRYTYPE': 'xdata', 'address': 'New York',
+           'publisher': 'Other'}
+    fields, issues = graph_of(paper, PROCEEDINGS, acm, nyc).inherited('paper')
+    assert issues == []
+    assert fields['publisher'] == 'ACM'
+    assert fields['address'] == 'New York'
+    assert fields['booktitle'] == 'Proceedings of ICML'
+
+
+def test_missing_and_circular_references():
+    a = {'ID': 'a', 'ENTRYTYPE': 'inproceedings', 'crossref': 'b'}
+    b = {'ID': 'b', 'ENTRYTYPE': 'proceedings', 'crossref': 'a'}
+    c = {'ID': 'c', 'ENTRYTYPE': 'inproceedings', 'crossref': 'missing'}
+    graph = graph_of(a, b, c)
+    _, issues = graph.inherited('a')
+    assert [str(issue) for issue in issues] == \
+        ['circular crossref: a -> b -> a']
+    assert issues[0].rule == 'crossref'
+    _, issues = graph.inherited('c')
+    assert [str(issue) for issue in issues] == \
+        ['crossref "missing" of c is not in the bib file']
+
+
+def test_discard_forgets_the_resolved_fields():
+    paper = {'ID': 'paper', 'ENTRYTYPE': 'inproceedings', 'crossref': 'proc'}
+    graph = graph_of(paper, PROCEEDINGS)
+    assert graph.inherited('paper')[0]['publisher'] == 'PMLR'
+    graph.discard('proc')
+    graph.add_parent(dict(PROCEEDINGS, publisher='Springer'))
+    assert graph.inherited('paper')[0]['publisher'] == 'Springer'
@@ -0,0 +1,41 @@
+import random
+
+from revise_bibtex.duplicates import TitleIndex, find_duplicates
+
+
+WORDS = ['learning', 'deep', 'neural', 'networks', 'graph', 'sparse',
+         'inference', 'bayesian', 'retrieval', 'scalable', 'optimization',
+         'language', 'models', 'for', 'with', 'of', 'the', 'a']
+
+
+def make_titles(count, seed=0):
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(count):
+        if titles and rng.random() < 0.3:
+            # A near duplicate: a typo, a plural or another case.
+            title = list(rng.choice(titles))
+            position = rng.randrange(len(title))
+            title[position] = rng.choice('aeiou')
+            titles.append(''.join(title))
+        else:
+            titles.append(' '.join(rng.choice(WORDS)
+                                   for _ in range(rng.randint(4, 12))))
+    return titles
+
+
+def test_index_finds_the_pairs_of_the_pairwise_scan():
+    for seed in range(3):
+        titles = make_titles(300, seed)
+        assert list(find_duplicates(titles)) == \
+            list(find_duplicates(titles, method='pairwise'))
+
+
+def test_index_query_and_remove():
+    index = TitleIndex()
+    index.add('a', 'Deep Learning for Sparse Graph Inference')
+    index.add('b', 'Bayesian Optimization of Language Models')
+    assert index.query('Deep Learning for Sparse Graph Inferences') == ['a']
+    index.remove('a')
+    assert 'a' not in index
+    assert index.query('Deep Learning for Sparse Graph Inferences') == []
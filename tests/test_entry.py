@@ -0,0 +1,81 @@
+from concurrent.futures import ProcessPoolExecutor
+import pickle
+
+import pytest
+
+from revise_bibtex import entry as entry_module
+from revise_bibtex.entry import Entry
+
+
+FIELDS = {'ENTRYTYPE': 'article', 'ID': 'first', 'title': 'A Title',
+          'journal': 'Journal of Things', 'year': '2020'}
+
+
+def test_entry_behaves_as_a_dict():
+    entry = Entry(FIELDS)
+    assert entry == FIELDS and FIELDS == entry
+    assert list(entry) == list(FIELDS)
+    assert len(entry) == 5 and 'title' in entry and 'pages' not in entry
+    assert entry.get('pages') is None and entry.get('pages', '') == ''
+
+    entry['pages'] = '1--9'
+    entry['year'] = '2021'
+    del entry['journal']
+    expected = dict(FIELDS, pages='1--9', year='2021')
+    del expected['journal']
+    assert entry == expected
+    assert list(entry.items()) == list(expected.items())
+    with pytest.raises(KeyError):
+        del entry['journal']
+
+    # The entries with the same fields share a layout, the copies are
+    # independent.
+    other = Entry(expected)
+    assert other._layout is entry._layout
+    copy = entry.copy()
+    copy['title'] = 'Another Title'
+    assert entry['title'] == 'A Title'
+    assert Entry(FIELDS, note='n') == dict(FIELDS, note='n')
+
+
+def test_entry_pickles():
+    entry = Entry(FIELDS)
+    entry['note'] = 'a note'
+    restored = pickle.loads(pickle.dumps(entry))
+    assert type(restored) is Entry
+    assert restored == entry and list(restored) == list(entry)
+
+
+def _add_pages(entry):
+    entry['pages'] = '1--9'
+    del entry['year']
+    return entry
+
+
+def test_entries_across_a_process_pool():
+    entries = [Entry(dict(FIELDS, ID='e%d' % i)) for i in range(4)]
+    with ProcessPoolExecutor(2) as pool:
+        results = list(pool.map(_add_pages, entries))
+    for entry, result in zip(entries, results):
+        expected = dict(entry, pages='1--9')
+        del expected['year']
+        assert type(result) is Entry and result == expected
+        assert list(result) == list(expected)
+
+
+def test_layouts_are_bounded(monkeypatch):
+    monkeypatch.setattr(entry_module, '_LAYOUTS', {})
+    monkeypatch.setattr(entry_module, 'MAX_LAYOUTS', 3)
+    entries = []
+    for i in range(10):
+        entry = Entry({'ID': 'e%d' % i})
+        entry['field%d' % i] = 'value'
+        entry['title'] = 'A Title'
+        entries.append(entry)
+    assert len(entry_module._LAYOUTS) == 3
+    for i, entry in enumerate(entries):
+        assert entry == {'ID': 'e%d' % i, 'field%d' % i: 'value',
+                         'title': 'A Title'}
+        del entry['field%d' % i]
+        assert entry == {'ID': 'e%d' % i, 'title': 'A Title'}
+    assert len(entry_module._LAYOUTS) == 3
@@ -0,0 +1,137 @@
+import shutil
+import subprocess
+
+import pytest
+
+from revise_bibtex.incremental import (
+    _hunk_spans, _line_offsets, _touched_blocks, lint_since
+)
+from revise_bibtex.stream import block_key, make_parser
+
+
+OLD = b'''@string{acm = "ACM"}
+
+@article{first,
+  title = {A First Title of a Paper},
+  year = {2020},
+}
+
+@article{second,
+  title = {A Second Title of a Paper},
+  year = {2020},
+}
+
+@article{third,
+  title = {A Third Title of a Paper},
+  year = {2020},
+}
+'''
+
+
+def keys(data, spans):
+    return [block_key(data, body)
+            for _, _, body in _touched_blocks(data, spans, make_parser())]
+
+
+def test_line_offsets():
+    data = b'a\nbb\nccc\n'
+    assert _line_offsets(data, [1, 2, 3, 4]) == {1: 0, 2: 2, 3: 5, 4: 9}
+    # Past the chunks that are skipped at once.
+    data = b'x' * 100000 + b'\n' + b'y\n' * 70000
+    assert _line_offsets(data, [2, 70001]) == \
+        {2: 100001, 70001: 100001 + 2 * 69999}
+
+
+def test_changed_line_touches_its_entry():
+    new = OLD.replace(b'{A Second', b'{The Second')
+    diff = b'@@ -9 +9 @@\n'
+    old_spans, new_spans = _hunk_spans(diff, OLD, new)
+    assert keys(OLD, old_spans) == ['second']
+    assert keys(new, new_spans) == ['second']
+
+
+def test_inserted_and_deleted_entries():
+    lines = OLD.split(b'\n')
+    # The third entry is removed, lines 13-17 and the blank line 12.
+    new = b'\n'.join(lines[:11] + lines[17:])
+    old_spans, new_spans = _hunk_spans(b'@@ -12,6 +11,0 @@\n', OLD, new)
+    assert keys(OLD, old_spans) == ['third']
+    assert keys(new, new_spans) == []
+    # Deleting a field inside an entry touches it in both versions.
+    new = b'\n'.join(lines[:4] + lines[5:])
+    old_spans, new_spans = _hunk_spans(b'@@ -5 +4,0 @@\n', OLD, new)
+    assert keys(OLD, old_spans) == ['first']
+    assert keys(new, new_spans) == ['first']
+
+
+def git(cwd, *args):
+    subprocess.run(['git'] + list(args), cwd=str(cwd), check=True,
+                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='needs git')
+def test_lint_since_counts_only_the_new_warnings(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    git(tmp_path, 'init', '-q')
+    git(tmp_path, 'config', 'user.email', 'a@b')
+    git(tmp_path, 'config', 'user.name', 'a')
+    bib = tmp_path / 'refs.bib'
+    bib.write_bytes(OLD)
+    git(tmp_path, 'add', 'refs.bib')
+    git(tmp_path, 'commit', '-q', '-m', 'refs')
+    cache = str(tmp_path / 'cache' / 'cache.sqlite')
+    assert lint_since(str(bib), 'HEAD', cache_file=cache) == 0
+
+    bib.write_bytes(OLD.replace(b'  year = {2020},\n', b'', 1) + b'''
+@article{copy,
+  title = {A Third Title of a Paper},
+  year = {2021},
+}
+''')
+    report = tmp_path / 'report.jsonl'
+    count = lint_since(str(bib), 'HEAD', report_file=str(report))
+    lines = report.read_text().splitlines()
+    assert count == len(lines) > 0
+    assert any('"first"' in line and '"year"' in line for line in lines)
+    assert any('"copy"' in line and 'third' in line for line in lines)
+    assert not any('"second"' in line for line in lines)
+    # The index of the other entries is kept next to the cache, or the
+    # default one.
+    assert len(list(
+        (tmp_path / 'xdg' / 'revise_bibtex' / 'since').iterdir())) == 1
+    assert lint_since(str(bib), 'HEAD', cache_file=cache) == count
+    assert len(list((tmp_path / 'cache' / 'since').iterdir())) == 1
+    with pytest.raises(ValueError):
+        lint_since(str(bib), 'no-such-revision')
+
+
+@pytest.mark.skipif(shutil.which('git') is None, reason='needs git')
+def test_lint_since_finds_the_duplicates_of_a_full_run(tmp_path,
+                                                       monkeypatch):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'xdg'))
+    git(tmp_path, 'init', '-q')
+    git(tmp_path, 'config', 'user.email', 'a@b')
+    git(tmp_path, 'config', 'user.name', 'a')
+    bib = tmp_path / 'refs.bib'
+    bib.write_bytes(OLD)
+    git(tmp_path, 'add', 'refs.bib')
+    git(tmp_path, 'commit', '-q', '-m', 'refs')
+    # The same normalized title as "first", but a title that is not close
+    # to it, and a close one to "second".
+    bib.write_bytes(OLD + b'''
+@article{braced,
+  title = {A {F}irst {T}itle: of a {P}aper!},
+  year = {2020},
+}
+
+@article{close,
+  title = {A Second Title of a Paper.},
+  year = {2020},
+}
+''')
+    report = tmp_path / 'report.jsonl'
+    lint_since(str(bib), 'HEAD', report_file=str(report))
+    lines = report.read_text().splitlines()
+    assert any('"close"' in line and 'second' in line for line in lines)
+    assert not any('"braced"' in line and 'first' in line
+                   for line in lines)
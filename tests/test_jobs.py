@@ -0,0 +1,29 @@
+from revise_bibtex.core import validate_bibs
+
+
+def make_bib(count):
+    entries = []
+    for number in range(count):
+        entries.append('''@article{key%d,
+  title = {A study of {LaTeX} thing number %d},
+  author = {M\\"uller, Ann and Smith, Bob},
+  journal = {Journal of Things},
+  year = {%d},
+  pages = {%d-%d},
+}
+''' % (number, number, 1990 + number % 30, number, number + 9))
+    return '\n'.join(entries)
+
+
+def test_jobs_write_the_same_file(tmp_path):
+    path = tmp_path / 'refs.bib'
+    # Several chunks of entries, validated by the workers in any order.
+    path.write_text(make_bib(300))
+    outputs = []
+    for jobs in (1, 4):
+        out = tmp_path / ('out-%d.bib' % jobs)
+        validate_bibs(str(path), None, str(out), skip=True, no_logs=True,
+                      jobs=jobs)
+        outputs.append(out.read_bytes())
+    assert outputs[1] == outputs[0]
+    assert outputs[0].count(b'@article{') == 300
@@ -0,0 +1,35 @@
+import pytest
+
+from revise_bibtex.latex import decode_latex, encode_latex
+
+
+@pytest.mark.parametrize('text', [
+    'Müller', 'Erdős', 'Dvořák', 'Åström', 'Øre', 'Łukasz', 'Nguyễn',
+    'Çelik', 'Straße', 'Brontë and Gödel', 'plain ascii',
+])
+def test_round_trip(text):
+    encoded = encode_latex(text)
+    assert encoded.isascii()
+    assert decode_latex(encoded) == text
+
+
+@pytest.mark.parametrize('variant', ['M\\"uller', 'M\\"{u}ller',
+                                     'M{\\"u}ller', 'M{\\"{u}}ller'])
+def test_decode_variants(variant):
+    assert decode_latex(variant) == 'Müller'
+
+
+@pytest.mark.parametrize('text, encoded', [
+    ('í', "{\\'\\i}"), ('ï', '{\\"\\i}'), ('ĭ', '{\\u{\\i}}'),
+    ('ǰ', '{\\v{\\j}}'), ('į', '{\\k{i}}'), ('Í', "{\\'I}"),
+])
+def test_dotless_i_and_j(text, encoded):
+    # An accent above an i or a j replaces its dot, not one under it.
+    assert encode_latex(text) == encoded
+    assert decode_latex(encoded) == text
+
+
+@pytest.mark.parametrize('variant', ["\\'\\i", "\\'{\\i}", "{\\'\\i}",
+                                     "{\\'{\\i}}", "\\'i", "{\\'i}"])
+def test_decode_dotless_variants(variant):
+    assert decode_latex(variant) == 'í'
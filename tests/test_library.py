@@ -0,0 +1,69 @@
+import gzip
+import json
+
+from revise_bibtex.core import validate_bibs
+from revise_bibtex.library import Library, build_library, normalize_title
+
+
+RECORDS = [
+    {'type': 'article', 'title': 'Learning Sparse Graphs.',
+     'authors': ['Jörg Müller', 'Ann Smith'],
+     'journal': 'Zeitschrift für Graphen', 'year': 2021, 'pages': '1 - 9'},
+    {'type': 'article', 'title': 'Learning Sparse Graphs',
+     'author': 'Jörg Müller', 'journal': 'CoRR', 'year': '2020'},
+    {'type': 'inproceedings', 'title': 'Counting Random Trees',
+     'booktitle': 'Proceedings of Trees', 'year': '2019'},
+    {'type': 'article', 'title': 'Counting Random Trees Again',
+     'journal': 'Journal of Trees', 'year': '2022'},
+]
+
+
+def library(tmp_path):
+    dump = tmp_path / 'dump.jsonl.gz'
+    with gzip.open(dump, 'wt') as fl:
+        for record in RECORDS:
+            fl.write(json.dumps(record) + '\n')
+    index = tmp_path / 'library.idx'
+    assert build_library(str(dump), str(index)) == 4
+    return Library(str(index))
+
+
+def test_normalize_title():
+    assert normalize_title('{BERT}: Pre-training of {G}\\"odel') == \
+        'bert pre training of godel'
+
+
+def test_search_and_match(tmp_path):
+    with library(tmp_path) as lib:
+        assert len(lib) == 4
+        found = [title for _, title in lib.search('learning sparse graph')]
+        assert found == ['learning sparse graphs'] * 2
+        assert lib.match('Counting {R}andom Trees')['booktitle'] == \
+            'Proceedings of Trees'
+        # The preprint is skipped, the fields are written in LaTeX.
+        assert lib.match('Learning sparse graphs') == {
+            'ENTRYTYPE': 'article', 'title': 'Learning Sparse Graphs.',
+            'author': 'J{\\"o}rg M{\\"u}ller and Ann Smith',
+            'journal': 'Zeitschrift f{\\"u}r Graphen', 'year': '2021',
+            'pages': '1--9',
+        }
+        assert lib.match('An Unrelated Title') is None
+
+
+def test_library_replaces_a_preprint(tmp_path):
+    lib = library(tmp_path)
+    lib.close()
+    bib = tmp_path / 'refs.bib'
+    bib.write_text('''@article{sparse,
+  title = {Learning Sparse Graphs},
+  author = {J{\\"o}rg M{\\"u}ller and Ann Smith},
+  journal = {arXiv preprint arXiv:2001.00001},
+  year = {2020},
+}
+''')
+    out = tmp_path / 'out.bib'
+    validate_bibs(str(bib), None, str(out), skip=True, no_logs=True,
+                  library_file=str(tmp_path / 'library.idx'))
+    text = out.read_text()
+    assert 'journal = {Zeitschrift f{\\"u}r Graphen}' in text
+    assert 'arXiv' not in text
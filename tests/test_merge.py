@@ -0,0 +1,146 @@
+from revise_bibtex.merge import MergeIndex, merge_bibs
+
+
+FIRST = '''@string{acm = "ACM"}
+
+@article{smith20,
+  title = {Learning Sparse Representations of Kernels},
+  year = {2020},
+  doi = {10.1/abc},
+}
+
+@proceedings{conf20,
+  title = {Proceedings of the Conference},
+  year = {2020},
+}
+
+@xdata{acm-data,
+  publisher = acm,
+}
+
+@xdata{extra,
+  note = {less},
+}
+'''
+
+SECOND = '''@string{acm = "ACM"}
+
+@inproceedings{paper,
+  title = {Another Paper},
+  crossref = {conf21},
+  xdata = {acm-data, extra},
+}
+
+@article{smith20,
+  title = {Learning sparse representations of kernels},
+  year = {2021},
+  doi = {https://doi.org/10.1/ABC},
+}
+
+@article{other,
+  title = {Learning Sparse Representation of Kernels},
+  year = {2020},
+}
+
+@article{conf20,
+  title = {A Different Paper of the Same Key},
+}
+
+@proceedings{conf21,
+  title = {Proceedings of the Conference},
+  year = {2020},
+}
+
+@xdata{acm-data,
+  publisher = acm,
+}
+
+@xdata{extra,
+  note = {more},
+}
+'''
+
+
+def _merge(tmp_path, *texts):
+    paths = []
+    for number, text in enumerate(texts):
+        path = tmp_path / ('%d.bib' % number)
+        path.write_text(text)
+        paths.append(str(path))
+    out = tmp_path / 'merged.bib'
+    keys = tmp_path / 'keys.tsv'
+    rows = merge_bibs(paths, str(out), str(keys))
+    return paths, rows, out.read_text(), keys.read_text()
+
+
+def test_merge_bibs(tmp_path):
+    paths, rows, merged, keys = _merge(tmp_path, FIRST, SECOND)
+    assert rows == [
+        (paths[1], 'smith20', 'smith20', 'same', 'year'),
+        (paths[1], 'other', 'smith20', 'duplicate', ''),
+        (paths[1], 'conf20', 'conf20-2', 'conflict', ''),
+        (paths[1], 'conf21', 'conf20', 'duplicate', ''),
+        (paths[1], 'acm-data', 'acm-data', 'same', ''),
+        (paths[1], 'extra', 'extra-2', 'conflict', ''),
+    ]
+    assert keys.splitlines()[0] == \
+        'file\tkey\tmerged key\treason\tconflicting fields'
+    assert merged.count('@string') == 1
+    assert merged.count('@xdata{acm-data') == 1
+    assert '@article{conf20-2,' in merged
+    # The crossref and xdata fields follow the merged IDs.
+    assert 'crossref = {conf20},' in merged
+    assert 'xdata = {acm-data, extra-2},' in merged
+
+
+def test_merge_bibs_follows_the_entries_of_other_files(tmp_path):
+    # "paper" refers to the proceedings of the next file, which are a
+    # duplicate of those of the first one.
+    third = '''@inproceedings{paper,
+  title = {Another Paper},
+  crossref = {conf21},
+}
+'''
+    fourth = '''@proceedings{conf21,
+  title = {Proceedings of the Conference},
+}
+'''
+    _, _, merged, _ = _merge(tmp_path, FIRST, third, fourth)
+    assert 'crossref = {conf20},' in merged
+    assert '@proceedings{conf21' not in merged
+
+
+def test_merge_index_finds_close_titles():
+    index = MergeIndex()
+    index.add('a', 'learning sparse representations of kernels', None)
+    assert index.find('learning sparse representations of kernels',
+                      None) == 'a'
+    assert index.find('learning sparse representation of kernels',
+                      None) == 'a'
+    assert index.find('learning sparse representations of kernels',
+                      '10.1/x') == 'a'
+    assert index.find('learning dense representations of graphs',
+                      None) is None
+    index.add('b', 'another title', '10.1/x')
+    assert index.find('a third title', '10.1/x') == 'b'
+
+
+def test_merge_bibs_finds_titles_differing_in_several_words(tmp_path):
+    first = '''@comment{jabref-meta: databaseType:bibtex;}
+
+@article{a,
+  title = {Scalable Graph Networks for Federated Privacy Embeddings in
+           Distributed Stochastic Optimization Systems},
+}
+'''
+    second = '''@comment{jabref-meta: databaseType:bibtex;}
+
+@article{b,
+  title = {Scalable Graph Network for Federated Privacy Embedding in
+           Distributed Stochastic Optimization Systems},
+}
+'''
+    paths, rows, merged, _ = _merge(tmp_path, first, second)
+    assert rows == [(paths[1], 'b', 'a', 'duplicate', '')]
+    assert merged.count('@comment{jabref-meta') == 1
+    assert '@article{b,' not in merged
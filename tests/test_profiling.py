@@ -0,0 +1,50 @@
+from revise_bibtex import core, profiling
+from revise_bibtex.core import validate_bibs
+
+
+BIB = '''@article{first,
+  title = {A First Title},
+  author = {Ann Smith},
+  journal = {Journal of Things},
+  year = {2020},
+}
+
+@article{second,
+  title = {A Second Title},
+  author = {Bob Smith},
+  year = {2021},
+}
+'''
+
+
+def test_timer_summary():
+    timer = profiling.Timer(keep=2)
+    for number, elapsed in enumerate([0.1, 0.4, 0.2, 0.3]):
+        timer.add(elapsed, 'e%d' % number)
+    summary = timer.summary()
+    assert summary['count'] == 4
+    assert abs(summary['total'] - 1.0) < 1e-9
+    assert summary['max'] == 0.4
+    assert [item['label'] for item in summary['slowest']] == ['e1', 'e3']
+
+
+def test_profile_a_run(tmp_path):
+    path = tmp_path / 'refs.bib'
+    path.write_text(BIB)
+    original = getattr(core, core.VALIDATORS[0])
+    profiler = profiling.enable()
+    try:
+        validate_bibs(str(path), None, str(tmp_path / 'out.bib'), skip=True,
+                      no_logs=True)
+        summary = profiler.summary()
+    finally:
+        profiling.disable()
+    # The phases and each validator are timed, with the IDs of the slowest
+    # entries, and the validators are restored.
+    assert {'load', 'write'} <= set(summary)
+    validator = summary[core.VALIDATORS[0]]
+    assert validator['count'] == 2
+    assert {item['label'] for item in validator['slowest']} == \
+        {'first', 'second'}
+    assert getattr(core, core.VALIDATORS[0]) is original
+    assert profiling.profiler is None
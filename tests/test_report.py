@@ -0,0 +1,77 @@
+import json
+
+from revise_bibtex.core import validate_bibs
+
+
+BIB = '''@string{j = {Journal of Graphs}}
+
+@article{first,
+  title = {Learning Sparse Graphs},
+  author = {Ann Smith},
+  journal = j,
+  year = {2020},
+}
+
+@article{second,
+  title = {Learning sparse graph},
+  author = {Ann Smith},
+  year = {2020},
+}
+'''
+
+
+def run(tmp_path, report_format):
+    bib = tmp_path / 'refs.bib'
+    bib.write_text(BIB)
+    aux = tmp_path / 'main.aux'
+    aux.write_text('\\citation{first}\n\\citation{second}\n'
+                   '\\citation{gone}\n')
+    report = tmp_path / ('report.' + report_format)
+    validate_bibs(str(bib), str(aux), str(tmp_path / 'out.bib'), skip=True,
+                  no_logs=True, report_file=str(report),
+                  report_format=report_format)
+    return report
+
+
+def test_jsonl_report(tmp_path):
+    with open(run(tmp_path, 'jsonl')) as fl:
+        records = [json.loads(line) for line in fl]
+    assert all(set(record) == {'id', 'rule', 'field', 'message'}
+               for record in records)
+    assert {'id': 'second', 'rule': 'empty-field', 'field': 'journal',
+            'message': '"journal" is empty'} in records
+    assert {'id': 'second', 'rule': 'duplicate', 'field': 'title',
+            'message': 'seems to be the same citation as first'} in records
+    assert records[-1] == {'id': 'gone', 'rule': 'not-found', 'field': None,
+                           'message': 'cited but not found in the bib file'}
+
+
+def test_sarif_report(tmp_path):
+    with open(run(tmp_path, 'sarif')) as fl:
+        log = json.load(fl)
+    assert log['version'] == '2.1.0'
+    assert log['$schema'].endswith('sarif-2.1.0.json')
+    [run_log] = log['runs']
+    driver = run_log['tool']['driver']
+    assert driver['name'] == 'revise-bibtex'
+    rules = [rule['id'] for rule in driver['rules']]
+    assert rules == sorted(set(rules))
+    assert {'duplicate', 'empty-field', 'not-found'} <= set(rules)
+    results = {}
+    for result in run_log['results']:
+        assert set(result) == {'ruleId', 'ruleIndex', 'level', 'message',
+                               'locations'}
+        assert rules[result['ruleIndex']] == result['ruleId']
+        assert result['level'] == 'warning'
+        assert result['message']['text']
+        [location] = result['locations']
+        assert location['physicalLocation']['artifactLocation'][
+            'uri'].endswith('refs.bib')
+        [logical] = location['logicalLocations']
+        results[result['ruleId'], logical['fullyQualifiedName']] = \
+            location['physicalLocation'].get('region')
+    # The regions are the lines of the entries, the missing entry has none.
+    assert results['empty-field', 'second.journal'] == {'startLine': 10}
+    assert results['duplicate', 'second.title'] == {'startLine': 10}
+    assert results['empty-field', 'first.pages'] == {'startLine': 3}
+    assert results['not-found', 'gone'] is None
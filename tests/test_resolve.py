@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from revise_bibtex.resolve import CrossrefBackend, Resolver
+
+
+WORKS = {
+    '10.1000/graph': {'DOI': '10.1000/graph', 'title': ['Graph Networks'],
+                      'type': 'journal-article', 'container-title': ['J'],
+                      'issued': {'date-parts': [[2020]]}, 'page': '1-9'},
+    '10.1000/trees': {'DOI': '10.1000/trees', 'title': ['Random Trees']},
+}
+
+
+class Stub(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, message, headers=()):
+        body = json.dumps({'message': message}).encode('utf-8')
+        self.send_response(status)
+        for header in headers:
+            self.send_header(*header)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((time.monotonic(), self.path))
+            server.in_flight += 1
+            server.most = max(server.most, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            self.answer()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def answer(self):
+        url = urlsplit(self.path)
+        if url.path == '/works':
+            title = parse_qs(url.query)['query.bibliographic'][0]
+            items = [work for work in WORKS.values()
+                     if work['title'][0].lower() == title]
+            self.send_json(200, {'items': items})
+            return
+        doi = url.path[len('/works/'):]
+        if doi == '10.1000/busy':
+            self.server.busy += 1
+            if self.server.busy == 1:
+                self.send_json(429, {}, [('Retry-After', '0')])
+                return
+            doi = '10.1000/trees'
+        if doi == '10.1000/bare':
+            # A status line without a reason phrase.
+            body = json.dumps({'message': WORKS['10.1000/trees']}).encode()
+            self.wfile.write(b'HTTP/1.1 200\r\nContent-Length: %d\r\n\r\n'
+                             % len(body) + body)
+            return
+        if doi in WORKS:
+            self.send_json(200, WORKS[doi])
+        elif doi.startswith('10.1000/slow'):
+            self.send_json(200, WORKS['10.1000/trees'])
+        else:
+            self.send_json(404, {})
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Stub)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.in_flight = server.most = server.busy = 0
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def resolver(server, **kwargs):
+    backend = CrossrefBackend('http://127.0.0.1:%d' % server.server_port)
+    kwargs.setdefault('rate', None)
+    return Resolver(backend, **kwargs)
+
+
+def test_doi_title_and_unknown_doi(server):
+    resolve = resolver(server)
+    try:
+        results = resolve.resolve([
+            ('Graph {N}etworks', '10.1000/graph'),
+            ('Random Trees', None),
+            ('Unknown', None),
+            ('Missing', '10.1000/missing'),
+            ('Graph Networks', '10.1000/trees'),
+        ])
+    finally:
+        resolve.close()
+    assert results[0] == ({'doi': '10.1000/graph', 'title': 'Graph Networks',
+                           'journal': 'J', 'year': '2020', 'pages': '1--9'},
+                          None)
+    assert results[1] == ({'doi': '10.1000/trees',
+                           'title': 'Random Trees'}, None)
+    assert results[2] == (None, None)
+    assert results[3] == (None, 'DOI "10.1000/missing" is not found')
+    assert results[4][0] is None
+    assert 'is of another work' in results[4][1]
+
+
+def test_retries_after_429_and_bare_status_line(server):
+    resolve = resolver(server)
+    try:
+        results = resolve.resolve([('Random Trees', '10.1000/busy'),
+                                   ('Random Trees', '10.1000/bare')])
+    finally:
+        resolve.close()
+    assert results == [({'doi': '10.1000/trees', 'title': 'Random Trees'},
+                        None)] * 2
+    assert server.busy == 2
+
+
+def test_concurrency_limit(server):
+    server.delay = 0.05
+    resolve = resolver(server, concurrency=2)
+    try:
+        results = resolve.resolve([('Random Trees', '10.1000/slow%d' % i)
+                                   for i in range(8)])
+    finally:
+        resolve.close()
+    assert all(problem is None for _, problem in results)
+    assert server.most == 2
+
+
+def test_rate_limit(server):
+    resolve = resolver(server, rate=20)
+    try:
+        resolve.resolve([('Random Trees', '10.1000/slow%d' % i)
+                         for i in range(6)])
+    finally:
+        resolve.close()
+    times = sorted(request[0] for request in server.requests)
+    # 6 requests at 20 per second span at least 5 intervals of 50 ms.
+    assert times[-1] - times[0] >= 0.2
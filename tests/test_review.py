@@ -0,0 +1,67 @@
+import os
+
+from revise_bibtex import review
+from revise_bibtex.core import validate_bibs
+
+
+BIB = '''@article{first,
+  title = {A First Title},
+  author = {Ann Smith},
+  year = {2020},
+}
+
+@article{second,
+  title = {A Second Title},
+  author = {Bob Smith},
+  year = {2021},
+}
+
+@article{third,
+  title = {A Third Title},
+  author = {Cid Smith},
+  year = {2022},
+}
+'''
+
+
+def reviewer(monkeypatch, answers):
+    # Answers the review, returns the IDs of the shown entries.
+    shown = []
+    answers = iter(answers)
+
+    def show(self, entry, warnings, position, total, ready):
+        shown.append(entry['ID'])
+        return next(answers) != 'q'
+
+    monkeypatch.setattr(review.ReviewQueue, 'show', show)
+    return shown
+
+
+def run(bib, checkpoint):
+    validate_bibs(str(bib), None, None, no_logs=True,
+                  review_file=str(checkpoint))
+
+
+def test_review_resumes_from_its_checkpoint(tmp_path, monkeypatch):
+    bib = tmp_path / 'refs.bib'
+    bib.write_text(BIB)
+    checkpoint = review.default_checkpoint(str(bib))
+    assert checkpoint == str(tmp_path / '.refs.bib.review.jsonl')
+
+    shown = reviewer(monkeypatch, ['', 'q'])
+    run(bib, checkpoint)
+    assert len(shown) == 2 and os.path.isfile(checkpoint)
+    reviewed = shown[0]
+
+    # Another bib file does not resume from it.
+    other = tmp_path / 'other.bib'
+    other.write_text(BIB)
+    shown = reviewer(monkeypatch, ['q'])
+    run(other, checkpoint)
+    assert shown[0] == reviewed
+
+    # The answered entry is skipped, the file is removed at the end.
+    shown = reviewer(monkeypatch, ['', ''])
+    run(bib, checkpoint)
+    assert sorted(shown + [reviewed]) == ['first', 'second', 'third']
+    assert not os.path.exists(checkpoint)
@@ -0,0 +1,40 @@
+import re
+
+import pytest
+
+from revise_bibtex.rules import FieldScanner, PatternRule
+
+
+ENTRY = {'title': 'The the Title', 'journal': 'Journal of Conf. Things',
+         'year': '2020'}
+
+
+def rules_of(scanner, keys=('title', 'journal')):
+    return sorted(set(w.rule for w in scanner.scan(ENTRY, list(keys), '2020',
+                                                   None)))
+
+
+def test_patterns_with_groups_are_searched_alone():
+    scanner = FieldScanner([
+        PatternRule('repeated-word', r'\b(\w+) \1\b', ignore_case=True),
+        PatternRule('conf', r'(?P<abbr>conf)\.', ignore_case=True),
+        PatternRule('things', r'(?P<abbr>Things)'),
+        PatternRule('global-flags', r'(?i)JOURNAL'),
+        PatternRule('plain', r'Title'),
+        PatternRule('absent', r'absent'),
+    ])
+    assert rules_of(scanner) == ['conf', 'global-flags', 'plain',
+                                 'repeated-word', 'things']
+
+
+def test_fields_of_a_rule():
+    scanner = FieldScanner([PatternRule('plain', r'Title',
+                                        fields=['journal'])])
+    assert rules_of(scanner) == []
+
+
+def test_invalid_pattern_fails_at_registration():
+    with pytest.raises(re.error):
+        PatternRule('bad', r'\1')
+    with pytest.raises(re.error):
+        PatternRule('bad', r'(?P<a>x)(?P<a>y)')
@@ -0,0 +1,95 @@
+from revise_bibtex.core import validate_bibs
+from revise_bibtex.stream import index_bib, iter_entries, rewrite_bib
+
+
+BIB = '''% a comment, kept as it is
+@article{first,
+ author = {Ann Smith},
+ title = {{A First Title}},
+ year = {2020}
+}
+
+@article{second,
+ title={A second   title},
+ year={2021}
+}
+'''
+
+
+def test_rewrite_bib_only_rewrites_changed_text(tmp_path):
+    path = tmp_path / 'refs.bib'
+    path.write_text(BIB)
+    _, _, spans = index_bib(str(path))
+    entries = {entry['ID']: entry for entry in iter_entries(str(path))}
+
+    # "first" is written as bibtexparser writes it, it is not rewritten,
+    # and the bib file is not written again.
+    before = path.stat().st_mtime_ns
+    assert rewrite_bib(str(path), str(path), spans,
+                       {'first': entries['first']}) == 0
+    assert path.stat().st_mtime_ns == before
+    assert path.read_text() == BIB
+
+    out = tmp_path / 'out.bib'
+    entries['second']['year'] = '2022'
+    assert rewrite_bib(str(path), str(out), spans, entries) == 1
+    text = out.read_text()
+    assert text.startswith(BIB[:BIB.index('@article{second')])
+    assert 'year = {2022}' in text
+
+
+SPECIAL = '''% free text
+@string{acm = {ACM}}
+
+@preamble{ "\\newcommand{\\x}{y}" }
+
+@comment{kept}
+
+@article{a,
+  title = {A Title of Something},
+  author = {Ann Smith},
+  journal = {Journal of Things},
+  publisher = acm,
+  year = {2020},
+  pages = {1--2},
+}
+'''
+
+
+def test_stream_writes_the_special_blocks(tmp_path):
+    path = tmp_path / 'refs.bib'
+    path.write_text(SPECIAL)
+    outputs = []
+    for stream in (False, True):
+        out = tmp_path / ('out-%s.bib' % stream)
+        validate_bibs(str(path), None, str(out), skip=True, no_logs=True,
+                      stream=stream)
+        outputs.append(out.read_text())
+    assert outputs[1] == outputs[0]
+    assert '@string{acm = {ACM}}' in outputs[1]
+    assert '@preamble{"\\newcommand{\\x}{y}"}' in outputs[1]
+    assert '@comment{kept}' in outputs[1]
+
+
+def test_minimal_rewrite_of_duplicated_ids(tmp_path):
+    path = tmp_path / 'refs.bib'
+    path.write_text('''@article{dup,
+  title = {Learning Sparse Graphs},
+  year = {2020},
+}
+
+@article{dup,
+  title = {Counting Trees},
+  year = {2021},
+}
+''')
+    _, _, spans = index_bib(str(path))
+    assert len(spans['dup']) == 2
+    out = tmp_path / 'out.bib'
+    validate_bibs(str(path), None, str(out), skip=True, no_logs=True,
+                  minimal_rewrite=True)
+    # Each entry is rewritten at its own span.
+    text = out.read_text()
+    assert text.index('Learning Sparse Graphs') < \
+        text.index('Counting Trees')
+    assert text.count('title = {{') == 2
@@ -0,0 +1,46 @@
+from revise_bibtex import titlecase
+from revise_bibtex.titlecase import (
+    protect_title, register_protected_terms, set_user_protected_terms
+)
+
+
+TITLES = [
+    'Bayesian inference with markov chain monte carlo',
+    'BERT: Pre-training of deep transformers for {L}anguage',
+    'Gaussians and $\\mathcal{O}(n)$ bounds on the iPhone',
+    'A study of Markov\'s inequality in pytorch.',
+    'Training foonet and barnet on CO2 data',
+]
+
+
+def uncached(monkeypatch):
+    # protect_title through the undecorated protect_word.
+    with monkeypatch.context() as patch:
+        patch.setattr(titlecase, 'protect_word',
+                      titlecase.protect_word.__wrapped__)
+        return [protect_title(title) for title in TITLES]
+
+
+def test_cached_words_are_protected_as_uncached_ones(monkeypatch):
+    titlecase.protect_word.cache_clear()
+    cached = [protect_title(title) for title in TITLES]
+    assert cached == [protect_title(title) for title in TITLES]
+    assert titlecase.protect_word.cache_info().hits > 0
+    assert cached == uncached(monkeypatch)
+    assert cached[0] == \
+        '{Bayesian} inference with {Markov} chain {Monte} {Carlo}'
+    assert cached[3] == 'A study of {Markov}\'s inequality in {PyTorch}.'
+
+
+def test_terms_registered_after_a_first_call(monkeypatch):
+    try:
+        before = [protect_title(title) for title in TITLES]
+        assert before[4] == 'Training foonet and barnet on {CO2} data'
+        register_protected_terms(['FooNet', 'BarNet'])
+        after = [protect_title(title) for title in TITLES]
+        assert after[4] == \
+            'Training {FooNet} and {BarNet} on {CO2} data'
+        assert after == uncached(monkeypatch)
+    finally:
+        set_user_protected_terms([])
+    assert [protect_title(title) for title in TITLES] == before
@@ -0,0 +1,55 @@
+from revise_bibtex import api
+from revise_bibtex.watch import Watcher
+
+
+BIB = '''@inproceedings{paper,
+  title = {A Paper About Things},
+  author = {Ann Smith},
+  crossref = {proc},
+  pages = {1--2},
+  year = {2020},
+}
+
+@proceedings{proc,
+  title = {Proceedings of the Conference},
+  publisher = {ACM},
+  year = {2020},
+}
+
+@article{other,
+  title = {A Paper About Things},
+  author = {Bob Smith},
+  journal = {Journal},
+  year = {2020},
+}
+'''
+
+
+def test_watcher_matches_a_full_run(tmp_path):
+    path = tmp_path / 'refs.bib'
+    path.write_text(BIB)
+    watcher = Watcher(str(path))
+    watcher.refresh()
+    result = api.revise(BIB)
+    assert watcher.summary() == {
+        key: [str(w) for w in warnings]
+        for key, warnings in result.warnings.items()
+    }
+    assert watcher.query('paper')['duplicates'] == ['other']
+    assert watcher.query('missing') == {'key': 'missing', 'found': False}
+
+
+def test_changed_parent_revalidates_its_children(tmp_path):
+    path = tmp_path / 'refs.bib'
+    path.write_text(BIB)
+    watcher = Watcher(str(path))
+    watcher.refresh()
+    assert '"publisher" is empty' not in watcher.query('paper')['warnings']
+    # Only the proceedings change, the paper inherits their publisher.
+    path.write_text(BIB.replace('  publisher = {ACM},\n', ''))
+    watcher.refresh([str(path)])
+    assert '"publisher" is empty' in watcher.query('paper')['warnings']
+    assert watcher.summary() == {
+        key: [str(w) for w in warnings]
+        for key, warnings in api.revise(path.read_text()).warnings.items()
+    }